@@ -0,0 +1,342 @@
+"""
+Ergebnis-Analyse
+Lädt beliebig viele Lauf-Ausgaben (*_results.csv, *_details.jsonl, *_details.parquet aus
+details_store.py oder *_scores.csv aus scoring.py; Cloud- und On-Premise-Schema)
+spaltenweise in NumPy-Arrays und berechnet:
+- je Lauf: Genauigkeit mit Bootstrap-Konfidenzintervall, Latenz-, Token- und Kosten-Perzentile
+- je Paar (Lauf gegen Basislauf, über gemeinsame Aufgaben-IDs): Genauigkeits-Differenz mit
+  gepaartem Bootstrap-KI, McNemar-Test, Median der Latenz-Differenz je Aufgabe mit KI
+Alle Bootstrap-Stichproben werden gebündelt gezogen, ohne Resampling-Matrix (Stichproben x n):
+Anteile über Binomial-/Multinomialverteilung, Perzentile über die Verteilung der Ordnungsstatistik.
+Damit bleiben auch Läufe mit 100k Aufgaben schnell.
+"""
+
+import argparse, csv, glob, json, math, os, time
+
+import numpy as np
+
+from latency_stats import PERCENTILES
+
+# ===================== KONFIGURATION =====================
+RESULTS_GLOB = "ergebnisse/*_results.csv"  # Standard-Eingabe ohne Pfadangabe
+BOOTSTRAP = 2000        # Anzahl Bootstrap-Stichproben
+CONFIDENCE = 0.95
+SEED = 42
+MCNEMAR_EXACT_BELOW = 25  # Exakter Binomialtest, wenn weniger diskordante Paare
+
+# Bekannte Spalten beider Schemata (fehlende Spalten werden zu NaN)
+CORRECT_COLUMNS = ("exact_correct", "strict_correct", "contains_correct", "token_match", "identifier_match")
+NUMERIC_COLUMNS = ("latency_s", "ttft_s", "input_tokens", "output_tokens", "total_tokens", "est_cost_usd")
+SCORE_COLUMNS = ("edit_sim", "edit_sim_best", "identifier_f1")  # Werte 0..1 aus scoring.py
+
+
+# ===================== LADEN =====================
+def _bool_column(values: list) -> np.ndarray:
+    """'True'/'False'/'' -> 1.0/0.0/NaN"""
+    arr = np.asarray(values, dtype=str)
+    out = np.where(arr == "True", 1.0, 0.0)
+    out[(arr == "") | (arr == "None")] = np.nan
+    return out
+
+
+def _float_column(values: list) -> np.ndarray:
+    arr = np.asarray(values, dtype=str)
+    # np.where statt Zuweisung: eine nur leere Spalte (z. B. ttft_s ohne Streaming) hat Breite 1
+    return np.where((arr == "") | (arr == "None"), "nan", arr).astype(float)
+
+
+def read_csv(path: str) -> dict:
+    """Ergebnis-CSV spaltenweise: {Spalte: Liste von Strings}"""
+    with open(path, "r", newline="", encoding="utf-8") as f:
+        reader = csv.reader(f)
+        header = next(reader, [])
+        rows = list(reader)
+    columns = list(zip(*rows)) if rows else [()] * len(header)
+    return {name: list(col) for name, col in zip(header, columns)}
+
+
+def read_details(path: str) -> dict:
+    """Details-JSONL spaltenweise (usage.* und scores.* werden flach übernommen, wie in der CSV)"""
+    names = ("id", "error") + CORRECT_COLUMNS + NUMERIC_COLUMNS + SCORE_COLUMNS
+    cols = {name: [] for name in names}
+    with open(path, "r", encoding="utf-8") as f:
+        for line in f:
+            try:
+                rec = json.loads(line)
+            except json.JSONDecodeError:
+                continue  # unvollständige letzte Zeile
+            flat = {**(rec.get("usage") or {}), **(rec.get("scores") or {}), **rec}
+            for name in names:
+                v = flat.get(name)
+                cols[name].append("" if v is None else str(v))
+    return {name: col for name, col in cols.items() if any(col)}
+
+
+def read_parquet_columns(path: str) -> dict:
+    """Parquet-Export (details_store.py): nur die benötigten Spalten lesen, usage.*/scores.* wie in der CSV"""
+    from details_store import read_parquet
+
+    names = ("id", "error") + CORRECT_COLUMNS + NUMERIC_COLUMNS + SCORE_COLUMNS
+    wanted = {f"{prefix}{name}": name for name in names for prefix in ("", "usage.", "scores.")}
+    data = read_parquet(path, list(wanted))
+    return {wanted[c]: ["" if v is None else str(v) for v in values] for c, values in data.items()}
+
+
+def load_run(path: str, label: str = None) -> dict:
+    """Lauf als {"label", "path", "id", "error", Spalte: ndarray}; nach ID sortiert, letzte Zeile je ID gilt"""
+    if path.endswith(".parquet"):
+        raw = read_parquet_columns(path)
+    elif path.endswith(".jsonl"):
+        raw = read_details(path)
+    else:
+        raw = read_csv(path)
+    if "id" not in raw:
+        raise ValueError(f"{path}: Spalte 'id' fehlt")
+    ids = np.asarray(raw["id"], dtype=np.int64)
+    # Duplikate (z. B. nach Fortsetzung): letzte Zeile behalten, dann nach ID sortieren
+    _, last = np.unique(ids[::-1], return_index=True)
+    keep = len(ids) - 1 - last
+    run = {
+        "label": label or run_label(path),
+        "path": path,
+        "id": ids[keep],
+        "error": np.asarray(raw.get("error", [""] * len(ids)), dtype=str)[keep] != "",
+    }
+    for name in CORRECT_COLUMNS:
+        if name in raw:
+            run[name] = _bool_column(raw[name])[keep]
+    for name in NUMERIC_COLUMNS + SCORE_COLUMNS:
+        if name in raw:
+            run[name] = _float_column(raw[name])[keep]
+    return run
+
+
+def run_label(path: str) -> str:
+    """cloud_gpt5mini_results.csv -> cloud_gpt5mini"""
+    name = os.path.basename(path)
+    for suffix in ("_results.csv", "_details.jsonl", "_details.parquet", "_scores.csv", ".csv", ".jsonl", ".parquet"):
+        if name.endswith(suffix):
+            return name[: -len(suffix)]
+    return name
+
+
+# ===================== BOOTSTRAP =====================
+def ci_bounds(stats: np.ndarray, confidence: float = CONFIDENCE) -> list:
+    """Perzentil-Konfidenzintervall aus Bootstrap-Statistiken"""
+    alpha = (1 - confidence) / 2 * 100
+    lo, hi = np.percentile(stats, [alpha, 100 - alpha])
+    return [round(float(lo), 4), round(float(hi), 4)]
+
+
+def bootstrap_percentile(x: np.ndarray, q: float, n_boot: int, rng) -> np.ndarray:
+    """
+    Bootstrap eines Perzentils (lineare Interpolation wie np.percentile).
+    Die k-te Ordnungsstatistik einer Stichprobe mit Zurücklegen ist sorted[floor(n * U)] mit
+    U ~ Beta(k, n + 1 - k) (k-te von n gleichverteilten Zahlen); gezogen wird nur U.
+    """
+    xs = np.sort(x)
+    n = len(xs)
+    h = (n - 1) * q / 100.0
+    lo = int(h)
+    u_lo = rng.beta(lo + 1, n - lo, size=n_boot)
+    v_lo = xs[np.minimum((n * u_lo).astype(np.int64), n - 1)]
+    if lo + 1 >= n or h == lo:
+        return v_lo
+    # Nächste Ordnungsstatistik: Abstand zum Rest (1 - U) ist Beta(1, n - k)-verteilt
+    u_hi = u_lo + (1 - u_lo) * rng.beta(1, n - lo - 1, size=n_boot)
+    v_hi = xs[np.minimum((n * u_hi).astype(np.int64), n - 1)]
+    return v_lo + (h - lo) * (v_hi - v_lo)
+
+
+def bootstrap_rate(x: np.ndarray, n_boot: int, rng) -> np.ndarray:
+    """Bootstrap eines Anteils (0/1-Werte): Anzahl Treffer je Stichprobe ist binomialverteilt"""
+    n = len(x)
+    return rng.binomial(n, x.mean(), size=n_boot) / n
+
+
+def bootstrap_paired_delta(a: np.ndarray, b: np.ndarray, n_boot: int, rng) -> np.ndarray:
+    """Gepaarter Bootstrap der Differenz zweier Anteile über die Multinomialverteilung der Paar-Typen"""
+    n = len(a)
+    probs = np.array([np.sum((a == 1) & (b == 0)), np.sum((a == 0) & (b == 1))]) / n
+    counts = rng.multinomial(n, [probs[0], probs[1], 1 - probs.sum()], size=n_boot)
+    return (counts[:, 1] - counts[:, 0]) / n
+
+
+# ===================== TESTS =====================
+def mcnemar(a: np.ndarray, b: np.ndarray) -> dict:
+    """McNemar-Test für gepaarte 0/1-Werte (exakt bei wenigen diskordanten Paaren, sonst Chi² mit Korrektur)"""
+    only_a = int(np.sum((a == 1) & (b == 0)))
+    only_b = int(np.sum((a == 0) & (b == 1)))
+    n = only_a + only_b
+    if n == 0:
+        return {"only_a": 0, "only_b": 0, "statistic": 0.0, "p_value": 1.0, "method": "exact"}
+    if n < MCNEMAR_EXACT_BELOW:
+        k = min(only_a, only_b)
+        p = min(1.0, 2 * sum(math.comb(n, i) for i in range(k + 1)) / 2 ** n)
+        return {"only_a": only_a, "only_b": only_b, "statistic": float(k), "p_value": p, "method": "exact"}
+    chi2 = (abs(only_a - only_b) - 1) ** 2 / n
+    p = math.erfc(math.sqrt(chi2 / 2))  # Chi²-Verteilung mit 1 Freiheitsgrad
+    return {"only_a": only_a, "only_b": only_b, "statistic": round(chi2, 4), "p_value": p, "method": "chi2"}
+
+
+# ===================== KENNZAHLEN =====================
+def distribution(x: np.ndarray) -> dict:
+    """n, mean, Perzentile und max der gültigen Werte (wie latency_stats.summarize, vektorisiert)"""
+    x = x[np.isfinite(x)]
+    if not len(x):
+        return {"n": 0}
+    out = {"n": int(len(x)), "mean": round(float(x.mean()), 4)}
+    for p, v in zip(PERCENTILES, np.percentile(x, PERCENTILES)):
+        out[f"p{p}"] = round(float(v), 4)
+    out["max"] = round(float(x.max()), 4)
+    return out
+
+
+def run_metrics(run: dict, n_boot: int = BOOTSTRAP, rng=None) -> dict:
+    """Kennzahlen eines Laufs"""
+    rng = rng or np.random.default_rng(SEED)
+    out = {"label": run["label"], "path": run["path"], "items": int(len(run["id"])), "errors": int(run["error"].sum())}
+    for name in CORRECT_COLUMNS:
+        if name in run:
+            x = run[name][~np.isnan(run[name])]
+            if len(x):
+                out[name] = {"rate": round(float(x.mean()), 4), "ci": ci_bounds(bootstrap_rate(x, n_boot, rng))}
+    if "latency_s" in run:
+        lat = run["latency_s"][np.isfinite(run["latency_s"])]
+        out["latency_s"] = distribution(lat)
+        if len(lat):
+            out["latency_s"]["p50_ci"] = ci_bounds(bootstrap_percentile(lat, 50, n_boot, rng))
+    for name in ("ttft_s", "input_tokens", "output_tokens", "total_tokens") + SCORE_COLUMNS:
+        if name in run and np.isfinite(run[name]).any():
+            out[name] = distribution(run[name])
+    if "est_cost_usd" in run and np.isfinite(run["est_cost_usd"]).any():
+        cost = run["est_cost_usd"]
+        out["est_cost_usd"] = {**distribution(cost), "sum": round(float(np.nansum(cost)), 6)}
+    return out
+
+
+def paired_metrics(base: dict, other: dict, n_boot: int = BOOTSTRAP, rng=None) -> dict:
+    """Vergleich `other` gegen `base` über die gemeinsamen Aufgaben-IDs"""
+    rng = rng or np.random.default_rng(SEED)
+    ids, ia, ib = np.intersect1d(base["id"], other["id"], assume_unique=True, return_indices=True)
+    out = {"base": base["label"], "other": other["label"], "common_items": int(len(ids))}
+    for name in CORRECT_COLUMNS:
+        if name not in base or name not in other:
+            continue
+        a, b = base[name][ia], other[name][ib]
+        valid = ~np.isnan(a) & ~np.isnan(b)
+        a, b = a[valid], b[valid]
+        if not len(a):
+            continue
+        out[name] = {
+            "n": int(len(a)),
+            "base_rate": round(float(a.mean()), 4),
+            "other_rate": round(float(b.mean()), 4),
+            "delta": round(float(b.mean() - a.mean()), 4),
+            "delta_ci": ci_bounds(bootstrap_paired_delta(a, b, n_boot, rng)),
+            "mcnemar": mcnemar(a, b),
+        }
+    if "latency_s" in base and "latency_s" in other:
+        a, b = base["latency_s"][ia], other["latency_s"][ib]
+        valid = np.isfinite(a) & np.isfinite(b)
+        a, b = a[valid], b[valid]
+        if len(a):
+            diff = b - a  # gepaart: Latenz-Differenz je Aufgabe
+            out["latency_s"] = {
+                "n": int(len(a)),
+                "base_p50": round(float(np.median(a)), 4),
+                "other_p50": round(float(np.median(b)), 4),
+                "median_delta": round(float(np.median(diff)), 4),
+                "median_delta_ci": ci_bounds(bootstrap_percentile(diff, 50, n_boot, rng)),
+                "other_faster_share": round(float(np.mean(b < a)), 4),
+            }
+    return out
+
+
+def analyze(runs: list, baseline: int = 0, n_boot: int = BOOTSTRAP, seed: int = SEED) -> dict:
+    """Kennzahlen aller Läufe und Vergleiche gegen den Basislauf"""
+    rng = np.random.default_rng(seed)
+    base = runs[baseline]
+    return {
+        "bootstrap": n_boot,
+        "confidence": CONFIDENCE,
+        "seed": seed,
+        "runs": [run_metrics(r, n_boot, rng) for r in runs],
+        "comparisons": [paired_metrics(base, r, n_boot, rng) for r in runs if r is not base],
+    }
+
+
+# ===================== AUSGABE =====================
+def _fmt_ci(ci: list, scale: float = 1.0, fmt: str = ".3f") -> str:
+    """Konfidenzintervall; Sekunden mit .3f, Prozentwerte (scale=100) mit .1f"""
+    return f"[{ci[0] * scale:{fmt}}, {ci[1] * scale:{fmt}}]"
+
+
+def print_report(report: dict):
+    pct = int(report["confidence"] * 100)
+    print(f"=== Läufe (Bootstrap {report['bootstrap']}x, {pct}%-KI) ===")
+    for m in report["runs"]:
+        print(f"\n{m['label']}  ({m['items']} Aufgaben, {m['errors']} Fehler)")
+        for name in CORRECT_COLUMNS:
+            if name in m:
+                print(f"  {name:<17} {m[name]['rate'] * 100:5.1f} %  KI {_fmt_ci(m[name]['ci'], 100, '.1f')}")
+        lat = m.get("latency_s")
+        if lat and lat["n"]:
+            print(f"  latency_s         p50 {lat['p50']:.3f} KI {_fmt_ci(lat['p50_ci'])}  "
+                  f"p90 {lat['p90']:.3f}  p95 {lat['p95']:.3f}  p99 {lat['p99']:.3f}")
+        for name in SCORE_COLUMNS:
+            if name in m and m[name]["n"]:
+                print(f"  {name:<17} mean {m[name]['mean']:.3f}  p50 {m[name]['p50']:.3f}")
+        cost = m.get("est_cost_usd")
+        if cost:
+            print(f"  est_cost_usd      Summe {cost['sum']:.4f}  p50 {cost['p50']:.6f}  p95 {cost['p95']:.6f}")
+    for c in report["comparisons"]:
+        print(f"\n=== {c['other']} gegen {c['base']} ({c['common_items']} gemeinsame Aufgaben) ===")
+        for name in CORRECT_COLUMNS:
+            if name in c:
+                d = c[name]
+                mc = d["mcnemar"]
+                print(f"  {name:<17} {d['base_rate'] * 100:5.1f} % -> {d['other_rate'] * 100:5.1f} %  "
+                      f"Δ {d['delta'] * 100:+5.1f} pp KI {_fmt_ci(d['delta_ci'], 100, '.1f')}  "
+                      f"McNemar {mc['only_a']}/{mc['only_b']} p={mc['p_value']:.4g}")
+        lat = c.get("latency_s")
+        if lat:
+            print(f"  latency_s         p50 {lat['base_p50']:.3f} -> {lat['other_p50']:.3f}  "
+                  f"Δ je Aufgabe (Median) {lat['median_delta']:+.3f} s KI {_fmt_ci(lat['median_delta_ci'])}  "
+                  f"schneller in {lat['other_faster_share'] * 100:.0f} %")
+
+
+def main(argv=None):
+    ap = argparse.ArgumentParser(description="Analyse und Vergleich von Lauf-Ergebnissen (CSV oder Details-JSONL)")
+    ap.add_argument("paths", nargs="*", help=f"Ergebnisdateien (Standard: {RESULTS_GLOB})")
+    ap.add_argument("--label", action="append", default=[], help="Name je Lauf (in Reihenfolge der Pfade)")
+    ap.add_argument("--baseline", type=int, default=0, help="Index des Basislaufs für Vergleiche (Standard: erster)")
+    ap.add_argument("--bootstrap", type=int, default=BOOTSTRAP, help="Anzahl Bootstrap-Stichproben")
+    ap.add_argument("--seed", type=int, default=SEED)
+    ap.add_argument("--json", default=None, help="Ergebnis zusätzlich als JSON speichern")
+    args = ap.parse_args(argv)
+
+    paths = args.paths or sorted(glob.glob(RESULTS_GLOB))
+    if not paths:
+        raise SystemExit(f"Keine Ergebnisdateien gefunden ({RESULTS_GLOB})")
+    labels = args.label + [None] * (len(paths) - len(args.label))
+
+    t0 = time.perf_counter()
+    runs = [load_run(p, label) for p, label in zip(paths, labels)]
+    # Gleiche Dateinamen (z. B. Zellen von sweep.py): Ordnername voranstellen
+    names = [r["label"] for r in runs]
+    for run in runs:
+        if names.count(run["label"]) > 1:
+            run["label"] = f"{os.path.basename(os.path.dirname(os.path.abspath(run['path'])))}/{run['label']}"
+    report = analyze(runs, args.baseline, args.bootstrap, args.seed)
+    print_report(report)
+    print(f"\n({time.perf_counter() - t0:.2f} s)")
+
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as f:
+            json.dump(report, f, ensure_ascii=False, indent=2)
+        print("Saved:", args.json)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,64 @@
+"""
+Async-Ausführungsengine
+Führt Benchmark-Aufgaben mit begrenzter Parallelität aus (gemeinsam für Cloud- und Lokal-Test)
+"""
+
+import asyncio
+
+
+async def run_ordered(items, worker, on_result, concurrency: int, window: int = 0):
+    """
+    Verarbeitet alle Aufgaben mit höchstens `concurrency` gleichzeitigen Anfragen.
+
+    - worker(item): Coroutine, die das Ergebnis für eine Aufgabe liefert
+    - on_result(result): wird strikt in Datensatz-Reihenfolge aufgerufen
+    - window: max. Anzahl gestarteter, aber noch nicht geschriebener Aufgaben
+      (begrenzt den Puffer, falls eine frühe Aufgabe sehr lange dauert)
+    """
+    concurrency = max(1, int(concurrency))
+    window = max(concurrency, int(window or concurrency * 4))
+    sem = asyncio.Semaphore(concurrency)
+
+    async def run_one(idx, item):
+        async with sem:
+            return idx, await worker(item)
+
+    source = iter(items)
+    exhausted = False
+    in_flight = set()
+    finished = {}  # Index -> Ergebnis (wartet auf Vorgänger)
+    next_in = 0
+    next_out = 0
+
+    try:
+        while True:
+            # Fenster auffüllen
+            while not exhausted and next_in - next_out < window:
+                try:
+                    item = next(source)
+                except StopIteration:
+                    exhausted = True
+                    break
+                in_flight.add(asyncio.ensure_future(run_one(next_in, item)))
+                next_in += 1
+
+            if not in_flight:
+                break
+
+            done, in_flight = await asyncio.wait(
+                in_flight, return_when=asyncio.FIRST_COMPLETED
+            )
+            for task in done:
+                idx, result = task.result()
+                finished[idx] = result
+
+            # Ergebnisse in Reihenfolge ausgeben
+            while next_out in finished:
+                on_result(finished.pop(next_out))
+                next_out += 1
+    except BaseException:
+        # Bei Fehler/Abbruch laufende Anfragen beenden, bevor die Ausnahme weiterläuft
+        for task in in_flight:
+            task.cancel()
+        await asyncio.gather(*in_flight, return_exceptions=True)
+        raise
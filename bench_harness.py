@@ -0,0 +1,147 @@
+"""
+Harness-Benchmark
+Misst den Eigen-Overhead der Testskripte (Aufgaben/s) gegen den lokalen Mock-Server,
+ohne echte API oder NUC. Jedes Szenario startet einen eigenen Mock-Server (separater
+Prozess, damit er nicht mit dem Harness um den GIL konkurriert) und führt
+run_cloud_test bzw. run_local_test vollständig aus (Journal, Sink, Scoring, Meta).
+"""
+
+import argparse, asyncio, contextlib, io, json, os, shutil, tempfile, time
+
+import run_cloud_test
+import run_local_test
+from mock_server import server_stats, start_process
+
+# ===================== KONFIGURATION =====================
+DATASET = "repobench_200.jsonl"
+ITEMS = 1000  # Aufgaben pro Szenario (Datensatz wird zyklisch wiederholt)
+
+# Szenarien: Testskript, Einstellungen des Skripts, Einstellungen des Mock-Servers
+SCENARIOS = [
+    ("local-native-seq", run_local_test, {"CONCURRENCY": 1}, {}),
+    ("local-native-c32", run_local_test, {"CONCURRENCY": 32}, {}),
+    ("local-native-c32-stream", run_local_test, {"CONCURRENCY": 32, "STREAM": True}, {}),
+    ("local-openai-c32", run_local_test, {"CONCURRENCY": 32, "OLLAMA_NATIVE_API": False}, {}),
+    ("cloud-seq", run_cloud_test, {"CONCURRENCY": 1}, {}),
+    ("cloud-c32", run_cloud_test, {"CONCURRENCY": 32}, {}),
+    ("cloud-c32-stream", run_cloud_test, {"CONCURRENCY": 32, "STREAM": True}, {}),
+    ("cloud-c32-ttft50ms", run_cloud_test, {"CONCURRENCY": 32}, {"ttft": "const:0.05"}),
+    ("cloud-c32-2pct-errors", run_cloud_test, {"CONCURRENCY": 32}, {"error_rate": 0.02}),
+    ("cloud-c32-5pct-429", run_cloud_test, {"CONCURRENCY": 32}, {"rate_limit_rate": 0.05, "retry_after": 0.2}),
+    ("cloud-c32-heavytail", run_cloud_test, {"CONCURRENCY": 32}, {"ttft": "lognormal:-3,1.2"}),
+    ("cloud-c32-heavytail-hedge", run_cloud_test, {"CONCURRENCY": 32, "HEDGE": True}, {"ttft": "lognormal:-3,1.2"}),
+]
+
+
+# ===================== HILFSFUNKTIONEN =====================
+def make_dataset(src: str, dst: str, n: int):
+    """Schreibt n Aufgaben (zyklisch aus src) nach dst"""
+    with open(src, "r", encoding="utf-8") as f:
+        lines = [l if l.endswith("\n") else l + "\n" for l in f if l.strip()]
+    with open(dst, "w", encoding="utf-8") as f:
+        for i in range(n):
+            f.write(lines[i % len(lines)])
+
+
+@contextlib.contextmanager
+def configured(module, **overrides):
+    """Setzt Modul-Konstanten eines Testskripts temporär"""
+    old = {k: getattr(module, k) for k in overrides}
+    for k, v in overrides.items():
+        setattr(module, k, v)
+    try:
+        yield module
+    finally:
+        for k, v in old.items():
+            setattr(module, k, v)
+
+
+def run_scenario(name, module, settings, server_cfg, dataset, workdir) -> dict:
+    """Führt ein Szenario aus und liefert Durchsatz und Kennzahlen"""
+    proc, url = start_process(dataset, **server_cfg)
+    out = os.path.join(workdir, name)
+    os.makedirs(out)
+
+    paths = {
+        "DATASET": dataset,
+        "OUT_CSV": os.path.join(out, "results.csv"),
+        "OUT_JSONL": os.path.join(out, "details.jsonl"),
+        "OUT_META": os.path.join(out, "meta.json"),
+        "OUT_JOURNAL": os.path.join(out, "journal.jsonl"),
+        "OUT_PROMPTS": os.path.join(out, "prompts.jsonl"),
+        "USE_CACHE": False,
+    }
+    if module is run_local_test:
+        paths["OLLAMA_URL"] = url
+        paths["BASE_URL"] = url + "/v1"
+    else:
+        paths["RPM_LIMIT"] = paths["TPM_LIMIT"] = 0  # Mock hat keine Kontingente
+    # Cloud-Backend gegen den Mock: URL und (beliebiger) API-Key aus der Umgebung
+    env = {"OPENAI_BASE_URL": url + "/v1", "OPENAI_API_KEY": os.environ.get("OPENAI_API_KEY") or "mock"}
+    old_env = {k: os.environ.get(k) for k in env}
+    os.environ.update(env)
+
+    try:
+        with configured(module, **paths, **settings):
+            t0 = time.perf_counter()
+            with contextlib.redirect_stdout(io.StringIO()):
+                asyncio.run(module.run())
+            wall = time.perf_counter() - t0
+        stats = server_stats(url)
+    finally:
+        proc.terminate()
+        proc.wait()
+        for k, v in old_env.items():
+            if v is None:
+                os.environ.pop(k, None)
+            else:
+                os.environ[k] = v
+
+    with open(paths["OUT_META"], "r", encoding="utf-8") as f:
+        meta = json.load(f)
+    n = meta["completed_items"]
+    return {
+        "scenario": name,
+        "items": n,
+        "wall_s": round(wall, 3),
+        "items_per_s": round(n / wall, 1) if wall else 0.0,
+        "strict_accuracy": meta["strict_accuracy"],
+        "p95_latency_s": meta["latency_percentiles_s"].get("p95"),
+        "server": stats,
+    }
+
+
+# ===================== HAUPTFUNKTION =====================
+def main(argv=None):
+    ap = argparse.ArgumentParser(description="Benchmark des Harness-Overheads gegen den Mock-Server")
+    ap.add_argument("--items", type=int, default=ITEMS, help="Aufgaben pro Szenario")
+    ap.add_argument("--only", default="", help="Nur Szenarien, deren Name diesen Text enthält")
+    ap.add_argument("--json", default="", help="Ergebnisse zusätzlich als JSON speichern")
+    args = ap.parse_args(argv)
+
+    workdir = tempfile.mkdtemp(prefix="bench_harness_")
+    dataset = os.path.join(workdir, "dataset.jsonl")
+    make_dataset(DATASET, dataset, args.items)
+
+    results = []
+    try:
+        print(f"{'Szenario':<26}{'Aufgaben':>9}{'Zeit [s]':>10}{'Aufg./s':>10}{'strict':>8}{'p95 [s]':>9}")
+        for name, module, settings, server_cfg in SCENARIOS:
+            if args.only and args.only not in name:
+                continue
+            r = run_scenario(name, module, settings, server_cfg, dataset, workdir)
+            results.append(r)
+            print(
+                f"{r['scenario']:<26}{r['items']:>9}{r['wall_s']:>10}{r['items_per_s']:>10}"
+                f"{r['strict_accuracy']:>8.3f}{r['p95_latency_s']:>9}"
+            )
+    finally:
+        shutil.rmtree(workdir, ignore_errors=True)
+
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as f:
+            json.dump(results, f, ensure_ascii=False, indent=2)
+
+
+if __name__ == "__main__":
+    main()
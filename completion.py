@@ -0,0 +1,227 @@
+"""
+Completion-Aufruf
+Einheitlicher API-Aufruf (normal oder Streaming mit frühem Abbruch) für Cloud- und Lokal-Test
+"""
+
+import json
+import time
+
+
+def usage_to_dict(usage) -> dict:
+    """Wandelt das Usage-Objekt der API in ein serialisierbares Dict um"""
+    if not usage:
+        return None
+    if isinstance(usage, dict):
+        return dict(usage)
+    return {
+        "prompt_tokens": int(
+            getattr(usage, "prompt_tokens", 0)
+            or getattr(usage, "input_tokens", 0)
+            or 0
+        ),
+        "completion_tokens": int(
+            getattr(usage, "completion_tokens", 0)
+            or getattr(usage, "output_tokens", 0)
+            or 0
+        ),
+        "total_tokens": int(getattr(usage, "total_tokens", 0) or 0),
+    }
+
+
+def count_complete_lines(pending: str, delta: str):
+    """
+    Hängt ein Stream-Fragment an und zählt neu abgeschlossene, nicht-leere Zeilen.
+    Gibt (Anzahl neuer Zeilen, verbleibender unvollständiger Zeilenrest) zurück.
+    """
+    pending += delta.replace("\r\n", "\n").replace("\r", "\n")
+    found = 0
+    while "\n" in pending:
+        line, pending = pending.split("\n", 1)
+        if line.strip() != "":
+            found += 1
+    return found, pending
+
+
+async def complete(client, stream: bool = False, extra_lines: int = 0, **kwargs) -> dict:
+    """
+    Führt einen Chat-Completion-Aufruf aus und liefert ein einheitliches Ergebnis:
+    text, finish_reason, usage, ttft_s, early_stop, chunks.
+
+    Im Streaming-Modus wird die Anfrage beendet, sobald eine vollständige
+    nicht-leere Zeile (plus `extra_lines` weitere für Contains-Scoring) vorliegt.
+    """
+    t0 = time.time()
+
+    if not stream:
+        resp = await client.chat.completions.create(**kwargs)
+        out = {
+            "text": resp.choices[0].message.content or "",
+            "finish_reason": getattr(resp.choices[0], "finish_reason", "") or "",
+            "usage": usage_to_dict(getattr(resp, "usage", None)),
+            "ttft_s": None,
+            "early_stop": False,
+            "chunks": 0,
+        }
+        if len(resp.choices) > 1:
+            # Mehrere Antworten (Parameter n): alle Auswahlen für pass@k
+            out["choices"] = [
+                {"text": c.message.content or "", "finish_reason": getattr(c, "finish_reason", "") or ""}
+                for c in resp.choices
+            ]
+        return out
+
+    parts = []
+    pending = ""
+    lines_done = 0
+    ttft = None
+    finish_reason = ""
+    usage = None
+    chunks = 0
+    early_stop = False
+
+    resp = await client.chat.completions.create(
+        stream=True, stream_options={"include_usage": True}, **kwargs
+    )
+    try:
+        async for chunk in resp:
+            if getattr(chunk, "usage", None):
+                usage = chunk.usage
+            if not chunk.choices:
+                continue
+            choice = chunk.choices[0]
+            delta = getattr(choice.delta, "content", None) if choice.delta else None
+            if delta:
+                if ttft is None:
+                    ttft = time.time() - t0  # Time-to-first-token
+                chunks += 1
+                parts.append(delta)
+                found, pending = count_complete_lines(pending, delta)
+                lines_done += found
+                if lines_done >= 1 + extra_lines:
+                    # Genug Zeilen für die Bewertung: Generierung abbrechen
+                    early_stop = True
+                    finish_reason = "early_stop"
+                    break
+            if choice.finish_reason:
+                finish_reason = choice.finish_reason
+    finally:
+        # Schließt die Verbindung; der Server bricht die Generierung ab
+        await resp.close()
+
+    return {
+        "text": "".join(parts),
+        "finish_reason": finish_reason,
+        "usage": usage_to_dict(usage),
+        "ttft_s": round(ttft, 3) if ttft is not None else None,
+        "early_stop": early_stop,
+        "chunks": chunks,
+    }
+
+
+# ===================== OLLAMA-NATIVE API =====================
+NS = 1_000_000_000  # Ollama liefert Dauern in Nanosekunden
+
+
+def ollama_usage(data: dict) -> dict:
+    """Token-Zählung aus der Ollama-Antwort (prompt_eval_count / eval_count)"""
+    if "eval_count" not in data and "prompt_eval_count" not in data:
+        return None
+    prompt = int(data.get("prompt_eval_count") or 0)
+    completion = int(data.get("eval_count") or 0)
+    return {
+        "prompt_tokens": prompt,
+        "completion_tokens": completion,
+        "total_tokens": prompt + completion,
+    }
+
+
+def ollama_timings(data: dict) -> dict:
+    """Server-seitige Zeiten: Modell-Laden, Prompt-Auswertung, Token-Generierung (Sekunden)"""
+    if "total_duration" not in data:
+        return None
+    return {
+        "total_s": round((data.get("total_duration") or 0) / NS, 4),
+        "load_s": round((data.get("load_duration") or 0) / NS, 4),
+        "prompt_eval_count": int(data.get("prompt_eval_count") or 0),
+        "prompt_eval_s": round((data.get("prompt_eval_duration") or 0) / NS, 4),
+        "eval_count": int(data.get("eval_count") or 0),
+        "eval_s": round((data.get("eval_duration") or 0) / NS, 4),
+    }
+
+
+async def complete_ollama(
+    http,
+    stream: bool = False,
+    extra_lines: int = 0,
+    model=None,
+    messages=None,
+    keep_alive=None,
+    **options,
+) -> dict:
+    """
+    Wie complete(), aber über Ollamas native /api/chat-Schnittstelle (http: httpx.AsyncClient).
+    Liefert zusätzlich `ollama` mit Prompt-Eval- und Eval-Dauern des Servers.
+    `keep_alive` (z. B. "30m") hält das Modell nach der Anfrage im Speicher.
+    """
+    payload = {"model": model, "messages": messages, "stream": stream}
+    if keep_alive is not None:
+        payload["keep_alive"] = keep_alive
+    if options:
+        payload["options"] = options
+    t0 = time.time()
+
+    if not stream:
+        r = await http.post("/api/chat", json=payload)
+        r.raise_for_status()
+        data = r.json()
+        return {
+            "text": (data.get("message") or {}).get("content") or "",
+            "finish_reason": data.get("done_reason") or "stop",
+            "usage": ollama_usage(data),
+            "ttft_s": None,
+            "early_stop": False,
+            "chunks": 0,
+            "ollama": ollama_timings(data),
+        }
+
+    parts = []
+    pending = ""
+    lines_done = 0
+    ttft = None
+    finish_reason = ""
+    final = {}
+    chunks = 0
+    early_stop = False
+
+    # Verlassen des Kontexts schließt die Verbindung; Ollama bricht dann ab
+    async with http.stream("POST", "/api/chat", json=payload) as r:
+        r.raise_for_status()
+        async for line in r.aiter_lines():
+            if not line.strip():
+                continue
+            data = json.loads(line)
+            delta = (data.get("message") or {}).get("content")
+            if delta:
+                if ttft is None:
+                    ttft = time.time() - t0  # Time-to-first-token
+                chunks += 1
+                parts.append(delta)
+                found, pending = count_complete_lines(pending, delta)
+                lines_done += found
+                if lines_done >= 1 + extra_lines:
+                    early_stop = True
+                    finish_reason = "early_stop"
+                    break
+            if data.get("done"):
+                finish_reason = data.get("done_reason") or "stop"
+                final = data
+
+    return {
+        "text": "".join(parts),
+        "finish_reason": finish_reason,
+        "usage": ollama_usage(final),
+        "ttft_s": round(ttft, 3) if ttft is not None else None,
+        "early_stop": early_stop,
+        "chunks": chunks,
+        "ollama": ollama_timings(final),
+    }
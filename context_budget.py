@@ -0,0 +1,159 @@
+"""
+Kontext-Budget
+Kürzt RepoBench-Prompts auf ein Token-Budget: Anweisung bleibt, Code-Zeilen werden von der
+Vervollständigungsstelle (Prompt-Ende) rückwärts behalten, Imports nur, wenn der behaltene
+Code sie verwendet (übrige Imports, falls noch Budget frei ist).
+Token-Zählung lokal: "approx" (~4 Zeichen pro Token, ohne Abhängigkeiten),
+"tiktoken:<encoding>" (pip install tiktoken) oder "hf:<modell>" (pip install transformers).
+"""
+
+import re
+
+# Anweisung am Prompt-Anfang (einzige Definition, make_repobench_200.build_record setzt sie vor den Code)
+HEADER = "Output ONLY the next line of Java code. No markdown, no explanation.\n\n"
+
+IMPORT_RE = re.compile(r"^\s*(import|package)\s")
+IDENT_RE = re.compile(r"[A-Za-z_$][\w$]*")
+
+
+# ===================== TOKENIZER =====================
+def load_tokenizer(spec: str = "approx"):
+    """Liefert eine Zählfunktion text -> Anzahl Tokens"""
+    kind, _, name = spec.partition(":")
+    if kind == "approx":
+        return lambda text: (len(text) + 3) // 4
+    if kind == "tiktoken":
+        try:
+            import tiktoken
+        except ImportError:
+            raise RuntimeError("Tokenizer 'tiktoken' nicht installiert: pip install tiktoken")
+        enc = tiktoken.get_encoding(name or "o200k_base")
+        return lambda text: len(enc.encode(text, disallowed_special=()))
+    if kind == "hf":
+        try:
+            from transformers import AutoTokenizer
+        except ImportError:
+            raise RuntimeError("Tokenizer 'hf' benötigt transformers: pip install transformers")
+        tok = AutoTokenizer.from_pretrained(name)
+        return lambda text: len(tok.encode(text, add_special_tokens=False))
+    raise ValueError(f"Unbekannter Tokenizer: {spec} (approx, tiktoken:<enc>, hf:<modell>)")
+
+
+# ===================== PROMPT-ZERLEGUNG =====================
+def split_prompt(text: str):
+    """Zerlegt einen Prompt in (Anweisung, Import-Zeilen, Code-Zeilen)"""
+    header = HEADER if text.startswith(HEADER) else ""
+    lines = text[len(header):].split("\n")
+    imports = []
+    i = 0
+    while i < len(lines):
+        if IMPORT_RE.match(lines[i]):
+            imports.append(lines[i])
+            i += 1
+            continue
+        # Leerzeilen zwischen Import-Gruppen überspringen, vor dem Code nicht
+        j = i
+        while j < len(lines) and not lines[j].strip():
+            j += 1
+        if imports and j > i and j < len(lines) and IMPORT_RE.match(lines[j]):
+            i = j
+            continue
+        break
+    return header, imports, lines[i:]
+
+
+def import_name(line: str) -> str:
+    """Verwendeter Name eines Imports ("import a.b.C;" -> "C", "import a.b.*;" -> "*")"""
+    return line.strip().rstrip(";").split(".")[-1].split()[-1]
+
+
+def join_prompt(header: str, imports: list, code: list) -> str:
+    """Gegenstück zu split_prompt (Format wie make_repobench_200.build_record)"""
+    return header + "\n".join(imports) + "\n" + "\n".join(code)
+
+
+# ===================== KÜRZUNG =====================
+def trim_prompt(text: str, budget: int, count) -> tuple:
+    """
+    Kürzt `text` auf höchstens `budget` Tokens (gezählt mit `count`).
+    Liefert (gekürzter Text, Info mit Token-Zahlen vorher/nachher und behaltenen Zeilen).
+    """
+    before = count(text)
+    header, imports, code = split_prompt(text)
+    info = {
+        "context_budget": budget,
+        "prompt_tokens_before": before,
+        "prompt_tokens": before,
+        "trimmed": False,
+        "code_lines": len(code),
+        "code_lines_total": len(code),
+        "imports": len(imports),
+        "imports_total": len(imports),
+    }
+    if before <= budget:
+        return text, info
+
+    # Tokens je Zeile (inkl. Zeilenumbruch); Summe ≈ Tokens des Blocks
+    code_cost = [count(line + "\n") for line in code]
+    imp_cost = [count(line + "\n") for line in imports]
+    imp_names = [import_name(line) for line in imports]
+    packages = {j for j, line in enumerate(imports) if line.lstrip().startswith("package")}
+
+    avail = budget - count(header)
+    kept_imports = set(packages)
+    used = sum(imp_cost[j] for j in kept_imports)
+    idents = set()
+    start = len(code)
+
+    # Code rückwärts ab der Vervollständigungsstelle; benötigte Imports kommen mit
+    while start > 0:
+        line = code[start - 1]
+        new_idents = set(IDENT_RE.findall(line)) - idents
+        needed = {j for j, name in enumerate(imp_names) if name in new_idents} - kept_imports
+        cost = code_cost[start - 1] + sum(imp_cost[j] for j in needed)
+        if used + cost > avail:
+            break
+        used += cost
+        idents |= new_idents
+        kept_imports |= needed
+        start -= 1
+
+    # Restbudget: übrige Imports (z. B. Wildcards) in Originalreihenfolge
+    for j in range(len(imports)):
+        if j not in kept_imports and used + imp_cost[j] <= avail:
+            kept_imports.add(j)
+            used += imp_cost[j]
+
+    kept_code = code[start:]
+    result = join_prompt(header, [imports[j] for j in sorted(kept_imports)], kept_code)
+
+    # Zeilenweise Summen sind nur näherungsweise additiv: ggf. weitere Zeilen entfernen
+    while kept_code and count(result) > budget:
+        kept_code = kept_code[1:]
+        result = join_prompt(header, [imports[j] for j in sorted(kept_imports)], kept_code)
+
+    info.update(
+        prompt_tokens=count(result),
+        trimmed=True,
+        code_lines=len(kept_code),
+        imports=len(kept_imports),
+    )
+    return result, info
+
+
+def trim_messages(messages: list, budget: int, count) -> tuple:
+    """Kürzt den (letzten) User-Prompt einer Messages-Liste; liefert (Messages, Info)"""
+    messages = [dict(m) for m in messages]
+    for m in reversed(messages):
+        if m.get("role") == "user":
+            m["content"], info = trim_prompt(str(m.get("content", "")), budget, count)
+            return messages, info
+    return messages, None
+
+
+def trim_record(rec: dict, budget: int, count) -> dict:
+    """Datensatz-Eintrag mit gekürztem Prompt; Kürzungs-Info unter "context" """
+    inp = rec.get("input")
+    messages = inp if isinstance(inp, list) else [{"role": "user", "content": str(inp)}]
+    messages, info = trim_messages(messages, budget, count)
+    return {**rec, "input": messages, "context": info}
@@ -0,0 +1,102 @@
+"""
+Datensatz-Loader
+Lazy-Laden von JSONL-Benchmarkdateien über einen Byte-Offset-Index (Sidecar-Datei <datensatz>.idx)
+"""
+
+import json
+import os
+from array import array
+
+
+def index_path(path: str) -> str:
+    """Pfad der Index-Sidecar-Datei"""
+    return path + ".idx"
+
+
+def build_index(path: str) -> array:
+    """
+    Liest den Datensatz einmal sequenziell und speichert die Byte-Offsets aller
+    nicht-leeren Zeilen. Kopf der Sidecar-Datei: Dateigröße und mtime (ns) des
+    Datensatzes, damit ein veralteter Index erkannt wird.
+    """
+    st = os.stat(path)
+    offsets = array("Q")
+    pos = 0
+    with open(path, "rb") as f:
+        for line in f:
+            if line.strip():
+                offsets.append(pos)
+            pos += len(line)
+
+    idx = index_path(path)
+    try:
+        with open(idx + ".tmp", "wb") as f:
+            array("Q", [st.st_size, st.st_mtime_ns]).tofile(f)
+            offsets.tofile(f)
+        os.replace(idx + ".tmp", idx)
+    except OSError:
+        pass  # z. B. schreibgeschütztes Verzeichnis: Index nur im Speicher
+    return offsets
+
+
+def load_index(path: str) -> array:
+    """Lädt den Offset-Index; baut ihn neu, falls er fehlt oder veraltet ist"""
+    st = os.stat(path)
+    try:
+        with open(index_path(path), "rb") as f:
+            raw = f.read()
+        data = array("Q")
+        data.frombytes(raw)
+        if len(data) >= 2 and data[0] == st.st_size and data[1] == st.st_mtime_ns:
+            return data[2:]
+    except (OSError, ValueError):
+        pass
+    return build_index(path)
+
+
+def read_item(path: str, offsets: array, i: int) -> dict:
+    """Liest genau eine Aufgabe (0-basierter Index) per Seek"""
+    with open(path, "rb") as f:
+        f.seek(offsets[i])
+        return json.loads(f.readline())
+
+
+def iter_items(path: str, offsets: array, start: int = 0, skip=None, order=None):
+    """
+    Generator über (Index, Datensatz) ab Position `start`.
+    `skip(i)` -> True überspringt eine Aufgabe, ohne sie zu lesen oder zu parsen.
+    `order`: abweichende Reihenfolge der Indizes (z. B. aus prefix_order); `start` entfällt dann.
+    Speicherbedarf ist unabhängig von der Datensatzgröße (nur der Offset-Index).
+    """
+    indices = order if order is not None else range(start, len(offsets))
+    with open(path, "rb") as f:
+        for i in indices:
+            if skip and skip(i):
+                continue
+            if f.tell() != offsets[i]:
+                f.seek(offsets[i])
+            yield i, json.loads(f.readline())
+
+
+def prefix_order(path: str, offsets: array, key, key_chars: int = 4096) -> list:
+    """
+    Indizes so sortiert, dass Aufgaben mit gemeinsamem Prompt-Präfix direkt aufeinander
+    folgen (lexikografisch nach den ersten `key_chars` Zeichen von key(rec); bei gleichem
+    Präfix bleibt die Datensatz-Reihenfolge). Gespeichert werden nur die Präfixe.
+    """
+    keys = [(key(rec)[:key_chars], i) for i, rec in iter_items(path, offsets)]
+    keys.sort()
+    return [i for _, i in keys]
+
+
+def shared_prefix_chars(path: str, offsets: array, key, order=None, key_chars: int = 4096) -> float:
+    """Mittlere Länge des gemeinsamen Präfixes aufeinanderfolgender Prompts (Zeichen)"""
+    prev = None
+    total = n = 0
+    for _, rec in iter_items(path, offsets, order=order):
+        cur = key(rec)[:key_chars]
+        if prev is not None:
+            total += len(os.path.commonprefix([prev, cur]))
+            n += 1
+        prev = cur
+    return round(total / n, 1) if n else 0.0
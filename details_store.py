@@ -0,0 +1,193 @@
+"""
+Details-Speicher
+Kompaktes Details-Format: Records verweisen über Aufgaben-ID und Inhalts-Hash ("prompt_hash")
+auf ihren Prompt, die Prompts selbst stehen einmalig im Prompt-Store (JSONL, eine Zeile pro Hash).
+Optional spaltenweiser Export nach Parquet (zstd-komprimiert, pip install pyarrow), aus dem die
+Analyse nur die benötigten Spalten liest.
+
+    python details_store.py compact cloud_gpt5mini_details.jsonl --store cloud_gpt5mini_prompts.jsonl
+    python details_store.py expand cloud_gpt5mini_details.jsonl --store cloud_gpt5mini_prompts.jsonl
+    python details_store.py parquet cloud_gpt5mini_details.jsonl
+"""
+
+import argparse, hashlib, json, os
+
+HASH_CHARS = 16  # Präfix des SHA-256 (64 Bit, für Datensätze dieser Größe kollisionsfrei)
+
+
+def prompt_hash(messages) -> str:
+    """Inhalts-Hash der Messages (kanonisches JSON)"""
+    raw = json.dumps(messages, ensure_ascii=False, sort_keys=True, separators=(",", ":"))
+    return hashlib.sha256(raw.encode("utf-8")).hexdigest()[:HASH_CHARS]
+
+
+def read_jsonl(path: str):
+    """JSON-Zeilen einer Datei; unvollständige Zeilen (Absturz) werden übersprungen"""
+    with open(path, "r", encoding="utf-8") as f:
+        for line in f:
+            try:
+                yield json.loads(line)
+            except json.JSONDecodeError:
+                continue
+
+
+def load_prompts(path: str) -> dict:
+    """Prompt-Store lesen: {Hash: Messages}"""
+    if not os.path.exists(path):
+        return {}
+    return {entry["hash"]: entry["messages"] for entry in read_jsonl(path)}
+
+
+class PromptStore:
+    """
+    Append-only Prompt-Store: jeder Prompt wird beim ersten Auftreten angehängt,
+    danach nur noch per Hash referenziert (auch über fortgesetzte Läufe hinweg).
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        self.hashes = set(load_prompts(path))
+        self._f = None
+
+    def add(self, messages) -> str:
+        """Speichert die Messages (falls neu) und liefert ihren Hash"""
+        h = prompt_hash(messages)
+        if h not in self.hashes:
+            if self._f is None:
+                self._f = open(self.path, "a", encoding="utf-8")
+            self._f.write(json.dumps({"hash": h, "messages": messages}, ensure_ascii=False) + "\n")
+            self._f.flush()
+            self.hashes.add(h)
+        return h
+
+    def compact(self, rec: dict) -> dict:
+        """Record ohne "messages", stattdessen "prompt_hash" an gleicher Stelle"""
+        if "messages" not in rec:
+            return rec
+        return {
+            ("prompt_hash" if k == "messages" else k): (self.add(v) if k == "messages" else v)
+            for k, v in rec.items()
+        }
+
+    def close(self):
+        if self._f:
+            self._f.close()
+            self._f = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+def expand(rec: dict, prompts: dict) -> dict:
+    """Gegenstück zu PromptStore.compact: "messages" aus dem Store wieder einsetzen"""
+    if "prompt_hash" not in rec:
+        return rec
+    return {
+        ("messages" if k == "prompt_hash" else k): (prompts.get(v) if k == "prompt_hash" else v)
+        for k, v in rec.items()
+    }
+
+
+def merge_stores(paths: list, out_path: str) -> int:
+    """Mehrere Prompt-Stores (z. B. je Shard) in einen zusammenführen; liefert die Anzahl Prompts"""
+    with PromptStore(out_path) as store:
+        for path in paths:
+            for messages in load_prompts(path).values():
+                store.add(messages)
+        return len(store.hashes)
+
+
+def store_path_for(details_path: str) -> str:
+    """cloud_gpt5mini_details.jsonl -> cloud_gpt5mini_prompts.jsonl (auch mit .shard-/.budget-Zusatz)"""
+    head, sep, tail = details_path.rpartition("_details")
+    if sep:
+        return head + "_prompts" + tail
+    root, ext = os.path.splitext(details_path)
+    return root + "_prompts" + ext
+
+
+# ===================== UMWANDLUNG =====================
+def _rewrite(path: str, records):
+    """Schreibt Records atomar (temporäre Datei, dann ersetzen)"""
+    tmp = path + ".tmp"
+    with open(tmp, "w", encoding="utf-8") as f:
+        for rec in records:
+            f.write(json.dumps(rec, ensure_ascii=False) + "\n")
+    os.replace(tmp, path)
+
+
+def compact_file(path: str, store_path: str):
+    """Details-JSONL ins kompakte Format umschreiben (Prompts in den Store)"""
+    with PromptStore(store_path) as store:
+        _rewrite(path, [store.compact(rec) for rec in read_jsonl(path)])
+
+
+def expand_file(path: str, store_path: str, out_path: str):
+    """Kompakte Details-JSONL mit vollständigen Messages schreiben"""
+    prompts = load_prompts(store_path)
+    _rewrite(out_path, [expand(rec, prompts) for rec in read_jsonl(path)])
+
+
+def flatten(rec: dict, prefix: str = "") -> dict:
+    """Verschachtelte Felder als Spalten "usage.input_tokens"; Listen (Messages) entfallen"""
+    out = {}
+    for k, v in rec.items():
+        if isinstance(v, dict):
+            out.update(flatten(v, f"{prefix}{k}."))
+        elif not isinstance(v, list):
+            out[prefix + k] = v
+    return out
+
+
+def export_parquet(path: str, out_path: str = None) -> str:
+    """Details-JSONL spaltenweise als Parquet (zstd) speichern"""
+    try:
+        import pyarrow as pa
+        import pyarrow.parquet as pq
+    except ImportError:
+        raise RuntimeError("Parquet-Export benötigt pyarrow: pip install pyarrow")
+    rows = [flatten(rec) for rec in read_jsonl(path)]
+    columns = list(dict.fromkeys(k for row in rows for k in row))
+    table = pa.table({c: [row.get(c) for row in rows] for c in columns})
+    out_path = out_path or os.path.splitext(path)[0] + ".parquet"
+    pq.write_table(table, out_path, compression="zstd")
+    return out_path
+
+
+def read_parquet(path: str, columns: list) -> dict:
+    """Nur die gewünschten (vorhandenen) Spalten lesen: {Spalte: Liste}"""
+    import pyarrow.parquet as pq
+
+    available = set(pq.read_schema(path).names)
+    table = pq.read_table(path, columns=[c for c in columns if c in available])
+    return table.to_pydict()
+
+
+def main(argv=None):
+    ap = argparse.ArgumentParser(description="Details-JSONL kompakt/vollständig umwandeln oder als Parquet exportieren")
+    ap.add_argument("command", choices=("compact", "expand", "parquet"))
+    ap.add_argument("paths", nargs="+", help="*_details.jsonl")
+    ap.add_argument("--store", default=None, help="Prompt-Store (Standard: <name>_prompts.jsonl neben der Datei)")
+    ap.add_argument("--out", default=None, help="Ausgabedatei (expand/parquet, nur bei einer Eingabedatei)")
+    args = ap.parse_args(argv)
+
+    for path in args.paths:
+        store = args.store or store_path_for(path)
+        before = os.path.getsize(path)
+        if args.command == "compact":
+            compact_file(path, store)
+            print(f"{path}: {before / 1e6:.2f} MB -> {os.path.getsize(path) / 1e6:.2f} MB (Prompts in {store})")
+        elif args.command == "expand":
+            out = args.out or os.path.splitext(path)[0] + ".full.jsonl"
+            expand_file(path, store, out)
+            print(f"{path} -> {out}")
+        else:
+            out = export_parquet(path, args.out)
+            print(f"{path}: {before / 1e6:.2f} MB -> {out} {os.path.getsize(out) / 1e6:.2f} MB")
+
+
+if __name__ == "__main__":
+    main()
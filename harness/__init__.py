@@ -0,0 +1,11 @@
+"""
+Benchmark-Harness
+Gemeinsamer Kern der Testskripte: Backend-Schnittstelle (OpenAI, Ollama, Mock), ein Lauf
+für alle Backends (engine) und ein einheitliches Ergebnis-Schema (schema). Die Testskripte
+run_cloud_test.py und run_local_test.py liefern nur noch Konfiguration und Backend;
+`python -m harness` führt mehrere Backends gleichzeitig auf demselben Datensatz aus.
+"""
+
+from harness.backends import Backend, MockBackend, OllamaBackend, OpenAIBackend
+from harness.engine import apply_budget, apply_settings, apply_shard, rebuild_outputs, run_benchmark, snapshot
+from harness.schema import CSV_COLUMNS, aggregate, evaluate
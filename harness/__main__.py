@@ -0,0 +1,121 @@
+"""
+Multi-Backend-CLI
+Führt mehrere Backends gleichzeitig auf demselben Datensatz aus (ein Prozess, ein Event-Loop,
+ein gemeinsamer Datensatz-Index); jedes Backend hat eigene Parallelität, eigenes Journal und
+eigene Ausgabedateien wie das jeweilige Testskript. Am Ende steht eine Vergleichstabelle.
+    python -m harness local cloud
+    python -m harness local mock --set CONCURRENCY=8 --set mock.SAMPLES=5
+Ziele:
+- cloud: Konstanten aus run_cloud_test.py (OpenAIBackend)
+- local: Konstanten aus run_local_test.py (OllamaBackend)
+- mock:  Konstanten aus run_local_test.py gegen einen eigenen mock_server.py-Prozess
+         (MockBackend, Ausgabedateien mock_*)
+"""
+
+import argparse
+import asyncio
+import json
+import os
+
+import run_cloud_test
+import run_local_test
+from dataset_loader import load_index
+
+from harness.backends import MockBackend
+from harness.engine import OUT_FILES, apply_budget, apply_settings, apply_shard, run_benchmark, snapshot
+
+TARGETS = {"cloud": run_cloud_test, "local": run_local_test, "mock": run_local_test}
+MOCK_PREFIX = "mock"  # Ausgabedateien des Mock-Ziels: local_qwen25coder7b_results.csv -> mock_qwen25coder7b_results.csv
+
+
+def mock_paths(cfg):
+    """Eigene Ausgabedateien für das Mock-Ziel (gleiche Vorlage wie "local")"""
+    for name in OUT_FILES:
+        head, base = os.path.split(getattr(cfg, name))
+        setattr(cfg, name, os.path.join(head, f"{MOCK_PREFIX}_{base.partition('_')[2] or base}"))
+
+
+def configure(names: list, args) -> dict:
+    """Konfiguration je Ziel: Kopie der Skript-Konstanten, dann --dataset, --set, --budget, --shard"""
+    configs = {}
+    for name in names:
+        cfg = snapshot(TARGETS[name])
+        if name == "mock":
+            mock_paths(cfg)
+            cfg.TOKENIZER = "approx"  # Mock-Server ohne echtes Modell: kein HF-Tokenizer nötig
+        if args.dataset:
+            cfg.DATASET = args.dataset
+        configs[name] = cfg
+
+    # --set NAME=WERT gilt für alle Ziele, die NAME kennen; --set ziel.NAME=WERT nur für eines
+    for spec in args.set:
+        key, _, value = spec.partition("=")
+        target, _, name = key.rpartition(".")
+        if target and target not in configs:
+            raise SystemExit(f"Unbekanntes Ziel in --set: {target}")
+        chosen = [configs[target]] if target else [c for c in configs.values() if hasattr(c, name)]
+        if not chosen:
+            raise SystemExit(f"Unbekannte Einstellung: {name}")
+        for cfg in chosen:
+            apply_settings(cfg, [f"{name}={value}"])
+
+    for cfg in configs.values():
+        if args.budget or cfg.CONTEXT_BUDGET:
+            apply_budget(cfg, args.budget or cfg.CONTEXT_BUDGET)
+        if args.shard or cfg.SHARD:
+            apply_shard(cfg, args.shard or cfg.SHARD)
+    return configs
+
+
+def make_backend(name: str, cfg, mock_server: dict):
+    if name == "mock":
+        return run_local_test.make_backend(cfg, MockBackend, dataset=cfg.DATASET, server=mock_server)
+    return TARGETS[name].make_backend(cfg)
+
+
+async def run_all(configs: dict, mock_server: dict) -> dict:
+    """Alle Ziele gleichzeitig; der Datensatz-Index wird einmal geladen und geteilt"""
+    datasets = {cfg.DATASET for cfg in configs.values()}
+    if len(datasets) > 1:
+        raise SystemExit(f"Ziele mit unterschiedlichen Datensätzen ({sorted(datasets)}), bitte --dataset angeben")
+    offsets = load_index(datasets.pop())
+    backends = {name: make_backend(name, cfg, mock_server) for name, cfg in configs.items()}
+    tag = len(backends) > 1
+    metas = await asyncio.gather(*(
+        run_benchmark(configs[name], backend, offsets, tag=f"[{name}] " if tag else "")
+        for name, backend in backends.items()
+    ))
+    return dict(zip(backends, metas))
+
+
+def print_comparison(metas: dict):
+    """Vergleichstabelle der Ziele (alle Kennzahlen stehen in den Meta-Dateien)"""
+    print(f"\n{'Ziel':<8}{'Aufgaben':>9}{'exact':>8}{'strict':>8}{'contains':>10}{'p50 [s]':>9}{'p95 [s]':>9}"
+          f"{'Out-Tokens':>12}{'Kosten [$]':>12}{'Zeit [s]':>10}")
+    for name, m in metas.items():
+        lat = m["latency_percentiles_s"]
+        print(f"{name:<8}{m['completed_items']:>9}{m['exact_accuracy']:>8.3f}{m['strict_accuracy']:>8.3f}"
+              f"{m['contains_accuracy']:>10.3f}{lat.get('p50', '-'):>9}{lat.get('p95', '-'):>9}"
+              f"{m['sum_output_tokens']:>12}{m['est_total_cost_usd']:>12.4f}{m['total_time_s']:>10}")
+
+
+def main(argv=None):
+    ap = argparse.ArgumentParser(prog="python -m harness",
+                                 description="Mehrere Backends gleichzeitig auf demselben Datensatz evaluieren")
+    ap.add_argument("targets", nargs="+", choices=sorted(TARGETS), help="Ziele, z. B. local cloud")
+    ap.add_argument("--dataset", default=None, help="Datensatz für alle Ziele (Standard: aus den Testskripten)")
+    ap.add_argument("--set", action="append", default=[], metavar="[ZIEL.]NAME=WERT",
+                    help="Konstante überschreiben, z. B. --set CONCURRENCY=8 --set cloud.MODEL=gpt-5-nano")
+    ap.add_argument("--budget", type=int, default=None, help="Prompt auf N Tokens kürzen (alle Ziele)")
+    ap.add_argument("--shard", default=None, help="Nur Shard k/N bearbeiten (alle Ziele)")
+    ap.add_argument("--mock-server", default="{}", metavar="JSON",
+                    help='Einstellungen des Mock-Servers, z. B. \'{"accuracy": 0.7, "ttft": "const:0.05"}\'')
+    args = ap.parse_args(argv)
+
+    names = list(dict.fromkeys(args.targets))
+    metas = asyncio.run(run_all(configure(names, args), json.loads(args.mock_server)))
+    print_comparison(metas)
+
+
+if __name__ == "__main__":
+    main()
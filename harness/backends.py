@@ -0,0 +1,340 @@
+"""
+Backends
+Schnittstelle zwischen Engine und Modell-API. Ein Backend kapselt Clients, Routing und
+Sampling-Parameter; Retries, Hedging, Cache und Bewertung übernimmt die Engine für alle gleich.
+- OpenAIBackend: OpenAI-API (Cloud) bzw. jede OpenAI-kompatible API
+- OllamaBackend: Ollama über die native API (/api/chat) oder OpenAI-kompatibel, mit Host-Pool
+- MockBackend: OllamaBackend gegen einen eigenen mock_server.py-Prozess (ohne GPU/API-Key)
+"""
+
+import asyncio
+import time
+
+import httpx
+from openai import AsyncOpenAI
+
+import mock_server
+from completion import complete, complete_ollama
+from host_pool import HostPool
+from telemetry import pool_collector
+
+
+class Backend:
+    """
+    Basisklasse; Unterklassen implementieren mindestens request().
+    - name: Kurzname (Konsole, Telemetrie-Label, "✅ <NAME> FINISHED")
+    - supports_n: mehrere Antworten in einer Anfrage (Parameter n) für pass@k
+    - sample_temperature: Temperatur der Stichproben (None = wie Hauptanfrage)
+    - est_output_tokens: Reserve für die Antwort im Tokens/min-Budget des Schedulers
+    """
+
+    name = "backend"
+    supports_n = False
+    sample_temperature = None
+    est_output_tokens = 0
+
+    def __init__(self, model: str, stream: bool = False, extra_lines: int = 0):
+        self.model = model
+        self.stream = stream
+        self.extra_lines = extra_lines
+
+    def describe(self) -> str:
+        """Kurzbeschreibung für die Startzeile"""
+        return self.model
+
+    def cache_fields(self, samples: int = 1) -> dict:
+        """Alles (außer Messages/Streaming), was die Antwort beeinflusst -> Cache-Schlüssel"""
+        return {"model": self.model}
+
+    def record_fields(self) -> dict:
+        """Zusätzliche Felder jedes Details-Records (z. B. Endpunkt)"""
+        return {}
+
+    def meta(self, total_time: float) -> dict:
+        """Backend-spezifische Felder der Meta-Datei"""
+        return {}
+
+    def collectors(self) -> list:
+        """Zusätzliche Telemetrie-Kennzahlen (siehe telemetry.py)"""
+        return []
+
+    def cost(self, input_tokens: int, output_tokens: int) -> float:
+        """Geschätzte Kosten in USD (RQ3)"""
+        return 0.0
+
+    async def start(self):
+        pass
+
+    async def stop(self):
+        pass
+
+    async def warm_up(self, messages) -> dict:
+        """Ungezählte Anfrage vor dem Lauf (None = nicht unterstützt)"""
+        return None
+
+    async def request(self, messages, n: int = 1, temperature=None, hedge: bool = False) -> dict:
+        """Ein Versuch ohne Retry; Ergebnis wie completion.complete (hedge: Duplikat einer Anfrage)"""
+        raise NotImplementedError
+
+
+# ===================== OPENAI (CLOUD) =====================
+class OpenAIBackend(Backend):
+    """
+    OpenAI-API; base_url=None nutzt OPENAI_BASE_URL bzw. api.openai.com.
+    - temperature/max_tokens: None = API-Standard (gpt-5-Modelle erlauben nur diesen)
+    - n_api: Stichproben als eine Anfrage mit n (ohne Streaming)
+    - hedge_base_url: alternatives Backend für Hedge-Duplikate (None = gleiches)
+    """
+
+    name = "cloud"
+
+    def __init__(
+        self,
+        model: str,
+        api_key: str,
+        base_url: str = None,
+        stream: bool = False,
+        extra_lines: int = 0,
+        temperature: float = None,
+        max_tokens: int = None,
+        n_api: bool = True,
+        in_price_per_1m: float = 0.0,
+        out_price_per_1m: float = 0.0,
+        est_output_tokens: int = 256,
+        hedge_base_url: str = None,
+        name: str = None,
+    ):
+        super().__init__(model, stream, extra_lines)
+        self.name = name or self.name
+        self.temperature = temperature
+        self.max_tokens = max_tokens
+        self.supports_n = n_api and not stream
+        self.prices = (in_price_per_1m, out_price_per_1m)
+        self.est_output_tokens = est_output_tokens
+        # Retries übernimmt der Scheduler (SDK-interne Retries würden 429 verdecken)
+        self.client = AsyncOpenAI(api_key=api_key, base_url=base_url, max_retries=0)
+        self.hedge_client = (
+            AsyncOpenAI(api_key=api_key, base_url=hedge_base_url, max_retries=0)
+            if hedge_base_url
+            else None
+        )
+
+    def sampling_params(self) -> dict:
+        """Optionale Sampling-Parameter jeder Anfrage (nur gesetzte, sonst gilt der API-Standard)"""
+        params = {}
+        if self.temperature is not None:
+            params["temperature"] = self.temperature
+        if self.max_tokens:
+            params["max_completion_tokens"] = self.max_tokens
+        return params
+
+    def cache_fields(self, samples: int = 1) -> dict:
+        return {"model": self.model, "base_url": str(self.client.base_url), **self.sampling_params()}
+
+    def record_fields(self) -> dict:
+        return {"base_url": str(self.client.base_url)}
+
+    def meta(self, total_time: float) -> dict:
+        return {"base_url": str(self.client.base_url)}
+
+    def cost(self, input_tokens: int, output_tokens: int) -> float:
+        return (input_tokens / 1_000_000) * self.prices[0] + (output_tokens / 1_000_000) * self.prices[1]
+
+    async def stop(self):
+        await self.client.close()
+        if self.hedge_client:
+            await self.hedge_client.close()
+
+    async def request(self, messages, n: int = 1, temperature=None, hedge: bool = False) -> dict:
+        extra = self.sampling_params()
+        if temperature is not None:
+            extra["temperature"] = temperature
+        if n > 1:
+            extra["n"] = n
+        client = self.hedge_client if hedge and self.hedge_client else self.client
+        return await complete(
+            client,
+            stream=self.stream,
+            extra_lines=self.extra_lines,
+            model=self.model,
+            messages=messages,
+            **extra,
+        )
+
+
+# ===================== OLLAMA (ON-PREMISE) =====================
+class OllamaBackend(Backend):
+    """
+    Ollama mit Host-Pool (url + hosts, alle mit demselben Modell).
+    - native: native API (/api/chat, liefert Token-Zahlen und Server-Zeiten) statt /v1
+    - base_url: OpenAI-kompatible URL des ersten Hosts (Cache-Schlüssel, Records)
+    - temperature: Standard 0 (deterministisch); sample_temperature für pass@k-Stichproben
+    - keep_alive: Modell so lange im Speicher halten (nur native API)
+    - host_wait_s: max. Wartezeit auf einen freien Host, danach Fehler der Aufgabe (0 = unbegrenzt)
+    """
+
+    name = "local"
+
+    def __init__(
+        self,
+        model: str,
+        url: str,
+        hosts=(),
+        native: bool = True,
+        base_url: str = None,
+        stream: bool = False,
+        extra_lines: int = 0,
+        temperature: float = 0,
+        sample_temperature: float = 0.8,
+        max_tokens: int = None,
+        keep_alive: str = "30m",
+        routing: str = "least_outstanding",
+        per_host_concurrency: int = 0,
+        health_check_s: float = 30,
+        host_wait_s: float = 120,
+        name: str = None,
+    ):
+        super().__init__(model, stream, extra_lines)
+        self.name = name or self.name
+        self.native = native
+        self.base_url = base_url or url.rstrip("/") + "/v1"
+        self.temperature = temperature
+        self.sample_temperature = sample_temperature
+        self.max_tokens = max_tokens
+        self.keep_alive = keep_alive
+        self.routing = routing
+        urls = [(url.rstrip("/"), self.base_url)] + [(h.rstrip("/"), h.rstrip("/") + "/v1") for h in hosts]
+        self.pool = HostPool(
+            [(u, self.make_client(u if native else v), u + "/api/tags") for u, v in urls],
+            strategy=routing,
+            max_per_host=per_host_concurrency,
+            health_interval_s=health_check_s,
+            lease_timeout_s=host_wait_s or None,
+        )
+
+    def make_client(self, url: str):
+        """Client für native Ollama-API (httpx) oder OpenAI-kompatible API (kein echter API-Key nötig)"""
+        if self.native:
+            return httpx.AsyncClient(base_url=url, timeout=httpx.Timeout(600.0))
+        # Retries übernimmt der Scheduler, nicht das SDK
+        return AsyncOpenAI(base_url=url, api_key="ollama", max_retries=0)
+
+    def api_options(self) -> dict:
+        """Gemeinsame Parameter jeder Anfrage (keep_alive nur über die native API, Token-Limit je API)"""
+        options = {"keep_alive": self.keep_alive} if self.native else {}
+        if self.max_tokens:
+            options["num_predict" if self.native else "max_tokens"] = self.max_tokens
+        return options
+
+    def describe(self) -> str:
+        return f"{self.model} @ {', '.join(h.name for h in self.pool.hosts)} (Routing: {self.routing})"
+
+    def cache_fields(self, samples: int = 1) -> dict:
+        # Alle Hosts im Pool bedienen dasselbe Modell, daher nur die URL des ersten
+        return {
+            "model": self.model,
+            "base_url": self.base_url,
+            "temperature": self.sample_temperature if samples > 1 else self.temperature,
+            "native_api": self.native,
+            **({"max_tokens": self.max_tokens} if self.max_tokens else {}),
+        }
+
+    def record_fields(self) -> dict:
+        return {"base_url": self.base_url}  # Wichtig: Lokale Infrastruktur
+
+    def meta(self, total_time: float) -> dict:
+        return {
+            "base_url": self.base_url,
+            "native_api": self.native,
+            "routing": self.routing,
+            # Pro Host: bediente Aufgaben, Fehler, Aufgaben/h dieser Sitzung
+            "host_pool": self.pool.summary(total_time),
+        }
+
+    def collectors(self) -> list:
+        return [pool_collector(self.pool)]
+
+    async def start(self):
+        await self.pool.start()
+
+    async def stop(self):
+        await self.pool.stop()
+        for host in self.pool.hosts:
+            await (host.client.aclose() if self.native else host.client.close())
+
+    async def warm_up(self, messages) -> dict:
+        """
+        Ungezählte Anfrage je Host vor dem Lauf: lädt das Modell und legt den gemeinsamen
+        Prompt-Präfix in den KV-Cache. Liefert Dauer (und Ladezeit des Modells) je Host.
+        """
+        async def one(host):
+            t0 = time.time()
+            try:
+                if self.native:
+                    resp = await complete_ollama(host.client, model=self.model, messages=messages,
+                                                 keep_alive=self.keep_alive, temperature=0, num_predict=1)
+                else:
+                    resp = await complete(host.client, model=self.model, messages=messages,
+                                          temperature=0, max_tokens=1)
+            except Exception as e:
+                return {"error": str(e)}
+            timings = resp.get("ollama") or {}
+            return {"warmup_s": round(time.time() - t0, 3), "load_s": timings.get("load_s")}
+
+        hosts = [h for h in self.pool.hosts if h.healthy]
+        results = await asyncio.gather(*(one(h) for h in hosts))
+        return {h.name: r for h, r in zip(hosts, results)}
+
+    async def request(self, messages, n: int = 1, temperature=None, hedge: bool = False) -> dict:
+        # Jeder Versuch (auch ein Hedge-Duplikat) wird neu geroutet
+        async with self.pool.lease() as host:
+            resp = await (complete_ollama if self.native else complete)(
+                host.client,
+                stream=self.stream,
+                extra_lines=self.extra_lines,
+                model=self.model,
+                messages=messages,
+                temperature=self.temperature if temperature is None else temperature,
+                **self.api_options(),
+            )
+        resp["host"] = host.name
+        return resp
+
+
+# ===================== MOCK =====================
+class MockBackend(OllamaBackend):
+    """
+    OllamaBackend gegen einen eigenen mock_server.py-Prozess (gestartet in start(), beendet
+    in stop(); der Port steht schon beim Erzeugen fest); server: Einstellungen des
+    Mock-Servers, z. B. {"accuracy": 0.7}.
+    """
+
+    name = "mock"
+
+    def __init__(self, dataset: str, server: dict = None, name: str = None, **kwargs):
+        self.dataset = dataset
+        self.port = mock_server.free_port()
+        self.proc = None
+        self.server_config = server or {}
+        self.server_stats = None
+        url = f"http://{mock_server.HOST}:{self.port}"
+        kwargs.update(url=url, base_url=url + "/v1", hosts=())
+        super().__init__(name=name or self.name, **kwargs)
+
+    def meta(self, total_time: float) -> dict:
+        return {**super().meta(total_time), "mock_server": {"config": self.server_config, "stats": self.server_stats}}
+
+    async def start(self):
+        self.proc, _ = mock_server.start_process(self.dataset, port=self.port, **self.server_config)
+        await super().start()
+
+    async def stop(self):
+        if self.proc:
+            try:
+                self.server_stats = mock_server.server_stats(self.pool.hosts[0].name)
+            except OSError:
+                pass
+        await super().stop()
+        if self.proc:
+            self.proc.terminate()
+            self.proc.wait()
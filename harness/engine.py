@@ -0,0 +1,460 @@
+"""
+Engine
+Ein Lauf für beliebige Backends: Journal (Fortsetzen), Sharding, Kontext-Budget, Cache,
+Scheduler (Rate-Limits, Retries), Hedging, Stichproben (pass@k), Bewertung, Telemetrie,
+CSV/JSONL/Meta. Einstellungen kommen aus einer Konfiguration mit den Konstanten der
+Testskripte (Modul oder Namespace, fehlende optionale Werte siehe DEFAULTS).
+"""
+
+import contextlib
+import json
+import os
+import time
+import types
+
+from async_engine import run_ordered
+from context_budget import load_tokenizer, trim_record
+from dataset_loader import iter_items, load_index, prefix_order, read_item, shared_prefix_chars
+from details_store import PromptStore
+from hedging import Hedger, hedge_extra_tokens
+from latency_stats import tokens_per_second
+from output_sink import OutputSink
+from request_scheduler import RequestScheduler, estimate_tokens
+from response_cache import ResponseCache, cache_key
+from run_journal import RunJournal
+from sampling import from_choices, gather_samples, merge_retry, merge_samples, score_samples
+from scoring import DEFAULT_METRICS, score
+from sharding import in_shard, parse_shard, shard_count, shard_path, tagged_path
+from telemetry import RunTelemetry, scheduler_collector
+
+from harness.schema import (
+    aggregate, csv_row, ensure_header, evaluate, normalize_line, now_iso, prompt_messages, prompt_text,
+)
+
+OUT_FILES = ("OUT_CSV", "OUT_JSONL", "OUT_META", "OUT_JOURNAL", "OUT_PROMPTS")
+
+# Optionale Einstellungen (nicht jedes Testskript definiert alle)
+DEFAULTS = {
+    "SHARD": None,
+    "CONTEXT_BUDGET": None,
+    "TOKENIZER": "approx",
+    "DETAILS_FORMAT": "compact",
+    "SCORES": DEFAULT_METRICS,
+    "SAMPLES": 1,
+    "PASS_K": (1, 5, 10),
+    "TEMPERATURE": None,
+    "MAX_TOKENS": None,
+    "USE_CACHE": True,
+    "CACHE_DIR": ".cache/responses",
+    "CACHE_MAX_MB": 512,
+    "RPM_LIMIT": 0,
+    "TPM_LIMIT": 0,
+    "MAX_TRIES": 5,
+    "BACKOFF_BASE_S": 1.0,
+    "BACKOFF_MAX_S": 30.0,
+    "HEDGE": False,
+    "HEDGE_PERCENTILE": 95,
+    "HEDGE_MAX_RATIO": 0.1,
+    "ORDER": "file",
+    "WARMUP": False,
+    "COLD_LOAD_S": 0.5,
+    "METRICS_PORT": None,
+}
+
+
+# ===================== KONFIGURATION =====================
+def setting(cfg, name: str):
+    """Konstante der Konfiguration, sonst Standardwert aus DEFAULTS"""
+    return getattr(cfg, name, DEFAULTS.get(name))
+
+
+def snapshot(module, **overrides) -> types.SimpleNamespace:
+    """Unabhängige Kopie der Konstanten eines Testskripts (mehrere Läufe derselben Vorlage)"""
+    values = {k: v for k, v in vars(module).items() if k.isupper()}
+    return types.SimpleNamespace(**{**values, **overrides})
+
+
+def apply_settings(cfg, specs: list):
+    """Konstanten überschreiben, je "NAME=WERT" (WERT als JSON, sonst als Text)"""
+    for spec in specs:
+        name, _, raw = spec.partition("=")
+        if not name.isupper() or not hasattr(cfg, name):
+            raise SystemExit(f"Unbekannte Einstellung: {name}")
+        try:
+            setattr(cfg, name, json.loads(raw))
+        except ValueError:
+            setattr(cfg, name, raw)
+
+
+def apply_shard(cfg, spec: str):
+    """Nur Shard k/N bearbeiten; Ausgabedateien erhalten das Suffix .shard-k-of-N"""
+    shard = parse_shard(spec)
+    cfg.SHARD = spec
+    for name in OUT_FILES:
+        setattr(cfg, name, shard_path(getattr(cfg, name), shard))
+
+
+def apply_budget(cfg, budget: int):
+    """Prompts auf `budget` Tokens kürzen; Ausgabedateien erhalten das Suffix .budget-<N>"""
+    cfg.CONTEXT_BUDGET = budget
+    for name in OUT_FILES:
+        setattr(cfg, name, tagged_path(getattr(cfg, name), f"budget-{budget}"))
+
+
+def make_scheduler(cfg) -> RequestScheduler:
+    """Gemeinsamer Scheduler (Rate-Limits, Backoff, Circuit Breaker) für alle Worker"""
+    return RequestScheduler(
+        rpm=setting(cfg, "RPM_LIMIT"),
+        tpm=setting(cfg, "TPM_LIMIT"),
+        max_tries=setting(cfg, "MAX_TRIES"),
+        base_delay=setting(cfg, "BACKOFF_BASE_S"),
+        max_delay=setting(cfg, "BACKOFF_MAX_S"),
+    )
+
+
+# ===================== API-AUFRUF =====================
+async def call_with_retry(backend, messages, scheduler, hedger=None, n: int = 1, temperature=None):
+    """Aufruf über den Scheduler (optional gehedgt); liefert (Antwort, Retry-Info, Hedge-Info)"""
+    est = estimate_tokens(messages, backend.est_output_tokens * n)
+
+    def attempt(hedge: bool):
+        return lambda: scheduler.call(
+            lambda: backend.request(messages, n=n, temperature=temperature, hedge=hedge), est_tokens=est
+        )
+
+    if hedger is None:
+        resp, retry = await attempt(False)()
+        return resp, retry, None
+    (resp, retry), hedge = await hedger.run(attempt(False), attempt(True))
+    return resp, retry, hedge
+
+
+async def call_samples(backend, messages, scheduler, hedger, samples: int):
+    """`samples` Antworten für pass@k: eine Anfrage mit n (falls unterstützt) oder parallele Anfragen"""
+    if backend.supports_n:
+        t0 = time.time()
+        resp, retry, hedge = await call_with_retry(backend, messages, scheduler, hedger, n=samples)
+        return from_choices(resp, round(time.time() - t0, 2)), retry, hedge
+    results = await gather_samples(
+        lambda: call_with_retry(backend, messages, scheduler, hedger, temperature=backend.sample_temperature),
+        samples,
+    )
+    return merge_samples([r[0] for r in results]), merge_retry([r[1] for r in results]), results[0][2]
+
+
+# ===================== AUFGABENVERARBEITUNG =====================
+async def process_item(backend, cfg, item_id: int, rec: dict, scheduler, cache=None, hedger=None) -> dict:
+    """Führt eine Aufgabe aus (API-Aufruf + Evaluierung) und liefert das Ergebnis"""
+    samples = setting(cfg, "SAMPLES")
+    messages = prompt_messages(rec)
+    ideal_raw = normalize_line(rec.get("ideal", ""))
+
+    # API-Aufruf mit Zeitmessung (RQ2)
+    t0 = time.time()
+    resp = None
+    output_text = ""
+    finish_reason = ""
+    error_msg = ""
+    in_tok = out_tok = tot_tok = 0
+    est_cost = 0.0
+    ttft = None
+    early_stop = False
+    usage_estimated = False
+    timings = None
+    cache_hit = False
+    retry = {"retries": 0, "backoff_s": 0.0, "throttle_s": 0.0}
+    hedge = None
+    hedge_extra = {"input_tokens": 0, "output_tokens": 0}
+
+    # Cache-Schlüssel: alles, was die Antwort des Modells beeinflusst
+    key = cache_key(
+        messages=messages,
+        stream=backend.stream,
+        extra_lines=backend.extra_lines,
+        **({"samples": samples} if samples > 1 else {}),
+        **backend.cache_fields(samples),
+    )
+
+    try:
+        resp = cache.get(key) if cache else None
+        if resp is not None:
+            cache_hit = True
+        else:
+            if samples > 1:
+                resp, retry, hedge = await call_samples(backend, messages, scheduler, hedger, samples)
+            else:
+                resp, retry, hedge = await call_with_retry(backend, messages, scheduler, hedger)
+            resp["latency_s"] = round(time.time() - t0, 2)
+            if cache:
+                cache.put(key, resp)
+        output_text = resp["text"]
+        finish_reason = resp["finish_reason"]
+        ttft = resp["ttft_s"]
+        early_stop = resp["early_stop"]
+        timings = resp.get("ollama")  # Server-Zeiten (nur Ollama, native API)
+
+        # Token-Verbrauch (RQ3; OpenAI und Ollama liefern usage)
+        usage = resp["usage"]
+        if usage:
+            in_tok = int(usage.get("prompt_tokens") or 0)
+            out_tok = int(usage.get("completion_tokens") or 0)
+            tot_tok = int(usage.get("total_tokens") or (in_tok + out_tok))
+        elif early_stop:
+            # Abgebrochener Stream liefert keine Usage: Input grob aus dem Prompt (der größte
+            # Kostenanteil), Output ≈ Anzahl Chunks
+            in_tok = estimate_tokens(messages)
+            out_tok = resp["chunks"]
+            tot_tok = in_tok + out_tok
+            usage_estimated = True
+        est_cost = backend.cost(in_tok, out_tok)
+
+        # Abgebrochene Hedge-Anfrage kostet zusätzlich (geschätzt) und zählt zu den Kosten
+        if hedge:
+            hedge_extra = hedge_extra_tokens(usage or {"prompt_tokens": in_tok, "completion_tokens": out_tok}, hedge, time.time() - t0)
+            est_cost += backend.cost(hedge_extra["input_tokens"], hedge_extra["output_tokens"])
+    except Exception as e:
+        error_msg = str(e)
+        retry = getattr(e, "retry_info", retry)
+
+    # Latenz berechnen (RQ2); bei Cache-Treffer gilt die ursprünglich gemessene Latenz
+    latency = resp["latency_s"] if cache_hit else round(time.time() - t0, 2)
+
+    # Durchsatz: Output-Tokens/s (bei nativer Ollama-API aus der reinen Eval-Zeit des Servers)
+    if timings and timings["eval_s"] > 0:
+        tok_per_s = round(timings["eval_count"] / timings["eval_s"], 2)
+    else:
+        tok_per_s = tokens_per_second(out_tok, latency, ttft)
+
+    # ========== EVALUIERUNG (RQ1: QUALITÄT) ==========
+    evaluation = evaluate(ideal_raw, output_text)
+
+    # Mehrfach-Stichproben: jede Antwort bewerten, pass@k je Aufgabe
+    sampled = score_samples(ideal_raw, resp["samples"], setting(cfg, "PASS_K")) if resp and resp.get("samples") else {}
+
+    return {
+        "id": item_id,
+        "ts_utc": now_iso(),
+        "backend": backend.name,
+        "model": backend.model,
+        **backend.record_fields(),
+        "host": resp.get("host") if resp else None,  # Bedienender Host (Host-Pool)
+        "messages": messages,
+        "ideal": ideal_raw,
+        **evaluation,  # ideal_norm, output_first_line(_norm), exact/strict/contains_correct
+        "output_full": output_text,
+        "scores": score(ideal_raw, output_text, setting(cfg, "SCORES")),  # Edit-Ähnlichkeit, Token-/Bezeichner-Match
+        "samples": sampled.get("samples"),  # Alle Stichproben (Text, Latenz, Tokens, Bewertung)
+        "pass_at_k": sampled.get("pass_at_k"),
+        "latency_s": latency,
+        "ttft_s": ttft,  # RQ2: Time-to-first-token (nur Streaming)
+        "early_stop": early_stop,
+        "output_tokens_per_s": tok_per_s,
+        "usage": {"input_tokens": in_tok, "output_tokens": out_tok, "total_tokens": tot_tok},
+        "usage_estimated": usage_estimated,
+        "ollama": timings,  # Laden / Prompt-Eval / Eval (Sekunden)
+        "cold_start": bool(timings and timings["load_s"] >= setting(cfg, "COLD_LOAD_S")),  # Modell musste geladen werden
+        "cache_hit": cache_hit,
+        "est_cost_usd": est_cost,
+        "finish_reason": finish_reason,
+        "retries": retry["retries"],  # Wiederholte Versuche (429, Timeouts, 5xx)
+        "backoff_s": retry["backoff_s"],  # Wartezeit durch Backoff
+        "throttle_s": retry.get("throttle_s", 0.0),  # Wartezeit durch Rate-Limits
+        "hedged": bool(hedge and hedge["hedged"]),  # Duplikat gesendet?
+        "hedge_winner": hedge["winner"] if hedge and hedge["hedged"] else None,
+        "hedge_extra_tokens": hedge_extra,  # Geschätzter Verbrauch der abgebrochenen Anfrage
+        "context": rec.get("context"),  # Kontext-Budget und Prompt-Tokens (lokal gezählt)
+        "error": error_msg,
+    }
+
+
+# ===================== AUSGABE =====================
+def open_sink(cfg) -> OutputSink:
+    """Öffnet den gepufferten Schreiber für CSV und JSONL"""
+    return OutputSink(cfg.OUT_CSV, cfg.OUT_JSONL, csv_row)
+
+
+def rebuild_outputs(cfg, records: list):
+    """Erzeugt CSV und JSONL neu aus dem Journal (konsistent, nach ID sortiert)"""
+    for path in (cfg.OUT_CSV, cfg.OUT_JSONL):
+        if os.path.exists(path):
+            os.remove(path)
+    ensure_header(cfg.OUT_CSV)
+    with open_sink(cfg) as sink:
+        for res in records:
+            sink.put(res)
+
+
+# ===================== LAUF =====================
+async def run_benchmark(cfg, backend, offsets=None, tag: str = "") -> dict:
+    """
+    Führt einen vollständigen Lauf aus und schreibt CSV, JSONL und Meta; liefert die Meta.
+    - offsets: bereits geladener Datensatz-Index (mehrere Backends, ein Datensatz)
+    - tag: Präfix der Konsolenausgabe (mehrere Backends gleichzeitig)
+    """
+    scheduler = make_scheduler(cfg)
+    hedger = None
+    if setting(cfg, "HEDGE"):
+        hedger = Hedger(setting(cfg, "HEDGE_PERCENTILE"), max_ratio=setting(cfg, "HEDGE_MAX_RATIO"))
+    cache = None
+    if setting(cfg, "USE_CACHE"):
+        cache = ResponseCache(setting(cfg, "CACHE_DIR"), setting(cfg, "CACHE_MAX_MB") * 1024 * 1024)
+    budget = setting(cfg, "CONTEXT_BUDGET")
+    details_format = setting(cfg, "DETAILS_FORMAT")
+    concurrency = cfg.CONCURRENCY
+
+    # Alle Ressourcen im Stack: backend.stop() (beendet z. B. den Mock-Server) läuft auch,
+    # wenn schon die Vorbereitung scheitert (Journal, Tokenizer, Prompt-Store, Telemetrie)
+    async with contextlib.AsyncExitStack() as stack:
+        stack.push_async_callback(backend.stop)
+        # Fortsetzungslogik: abgeschlossene Aufgaben-IDs aus dem Journal
+        # (ältere Läufe ohne Journal werden aus der Details-JSONL übernommen)
+        journal = RunJournal(cfg.OUT_JOURNAL)
+        stack.callback(journal.close)
+        journal.seed_from(cfg.OUT_JSONL)
+        done = len(journal.records)
+
+        # CSV und JSONL aus dem Journal neu aufbauen, damit beide übereinstimmen
+        rebuild_outputs(cfg, journal.sorted_records())
+        print(f"{tag}{backend.name}: {backend.describe()} (Parallelität: {concurrency}, Streaming: {backend.stream})")
+        print(f"{tag}Fortsetzen: {done} Aufgaben bereits abgeschlossen")
+        if setting(cfg, "SHARD"):
+            print(f"{tag}Shard {cfg.SHARD}: Ausgabe nach {cfg.OUT_JSONL}")
+
+        # Datensatz-Index laden (Byte-Offsets; Aufgaben werden erst bei Bedarf gelesen)
+        if offsets is None:
+            offsets = load_index(cfg.DATASET)
+
+        total = len(offsets)
+        shard = parse_shard(setting(cfg, "SHARD"))
+        start_epoch = int(time.time())
+        start_total = time.time()
+
+        # Offene Aufgaben (Lücken möglich, da parallel abgeschlossen)
+        def skip(i):
+            return journal.is_done(i + 1) or not in_shard(i + 1, shard)
+
+        first = next((i for i in range(total) if not skip(i)), total)
+        has_gaps = any(item_id > first + 1 for item_id in journal.records)
+
+        # Präfix-Reihenfolge: Ausgabe während des Laufs nicht nach ID, daher am Ende neu aufbauen
+        order = prefix_order(cfg.DATASET, offsets, prompt_text) if setting(cfg, "ORDER") == "prefix" else None
+        if order is not None:
+            has_gaps = True
+            print(f"{tag}Präfix-Reihenfolge: Ø gemeinsamer Präfix "
+                  f"{shared_prefix_chars(cfg.DATASET, offsets, prompt_text)} -> "
+                  f"{shared_prefix_chars(cfg.DATASET, offsets, prompt_text, order)} Zeichen")
+        pending = iter_items(cfg.DATASET, offsets, start=first, skip=skip, order=order)
+
+        # Kontext-Budget: Prompt vor dem Senden kürzen (Tokenizer wird nur dann geladen;
+        # fehlt das Paket, wird wie in plan_run näherungsweise gezählt)
+        tokenizer = setting(cfg, "TOKENIZER") if budget else None
+        count = None
+        if budget:
+            try:
+                count = load_tokenizer(tokenizer)
+            except (RuntimeError, ImportError, OSError) as e:
+                print(f"{tag}⚠️  {e} – zähle näherungsweise (approx)")
+                count, tokenizer = load_tokenizer("approx"), "approx"
+
+        # Kompaktes Details-Format: Prompts einmalig im Store, Records nur mit Hash
+        prompts = PromptStore(cfg.OUT_PROMPTS) if details_format == "compact" else None
+        if prompts:
+            stack.callback(prompts.close)
+
+        # Live-Telemetrie (Durchsatz, ETA; optional Prometheus-Endpunkt)
+        telemetry = RunTelemetry(shard_count(total, shard), done, concurrency,
+                                 labels={"model": backend.model, "run": os.path.basename(cfg.OUT_JSONL)})
+        stack.callback(telemetry.close)
+        telemetry.collectors += [scheduler_collector(scheduler), *backend.collectors()]
+        if setting(cfg, "METRICS_PORT") is not None:
+            # Ein Endpunkt je Port und Prozess (mehrere Läufe teilen ihn); ist der Port
+            # von einem anderen Prozess belegt, läuft der Lauf ohne Endpunkt weiter
+            try:
+                print(f"{tag}Metriken: {telemetry.serve(cfg.METRICS_PORT).url}")
+            except OSError as e:
+                print(f"{tag}⚠️  Metriken-Endpunkt auf Port {cfg.METRICS_PORT} nicht verfügbar ({e}), weiter ohne")
+
+        async def worker(item):
+            i, rec = item
+            if count:
+                rec = trim_record(rec, budget, count)
+            telemetry.started()
+            res = await process_item(backend, cfg, i + 1, rec, scheduler, cache, hedger)
+            telemetry.finished(res)
+            if prompts:
+                res = prompts.compact(res)
+            journal.append(res)  # sofort, unabhängig von der Reihenfolge
+            return res
+
+        # Ein Schreiber für CSV (Tabelle) und JSONL (Details) während des Laufs
+        sink = open_sink(cfg)
+        stack.callback(sink.close)
+
+        def on_result(res):
+            # ========== ERGEBNISSPEICHERUNG ==========
+            sink.put(res)
+
+            # Fortschrittsausgabe mit allen drei Accuracy-Metriken
+            print(f"{tag}{res['id']}/{total} exact={res['exact_correct']} strict={res['strict_correct']} "
+                  f"contains={res['contains_correct']} time={res['latency_s']}s {telemetry.progress()}")
+
+        # Hauptschleife: parallele Verarbeitung, Ausgabe in Datensatz-Reihenfolge
+        warmup = None
+        await backend.start()
+        # Warm-up mit dem ersten offenen Prompt (nicht gewertet, nicht im Journal)
+        next_i = next((i for i in (order if order is not None else range(first, total)) if not skip(i)), None)
+        if setting(cfg, "WARMUP") and next_i is not None:
+            warmup = await backend.warm_up(prompt_messages(read_item(cfg.DATASET, offsets, next_i)))
+            if warmup is not None:
+                print(f"{tag}Warm-up: {warmup}")
+        await run_ordered(pending, worker, on_result, concurrency)
+
+    # Nach Lückenfüllung CSV/JSONL wieder in ID-Reihenfolge bringen
+    records = journal.sorted_records()
+    if has_gaps:
+        rebuild_outputs(cfg, records)
+
+    # ========== ABSCHLUSS UND METADATEN ==========
+    end_epoch = int(time.time())
+    total_time = round(time.time() - start_total, 2)
+    samples = setting(cfg, "SAMPLES")
+    temperature = setting(cfg, "TEMPERATURE")
+    if samples > 1 and backend.sample_temperature is not None:
+        temperature = backend.sample_temperature
+
+    # Aggregierte Metriken für Meta-Datei (aus dem Journal, inkl. früherer Sitzungen)
+    meta = {
+        "backend": backend.name,
+        "model": backend.model,
+        "dataset": cfg.DATASET,
+        "items": shard_count(total, shard),
+        "shard": setting(cfg, "SHARD"),
+        "details_format": details_format,
+        "samples": samples,
+        "temperature": temperature,
+        "max_tokens": setting(cfg, "MAX_TOKENS"),
+        "context_budget": budget,
+        "tokenizer": tokenizer,  # tatsächlich verwendeter Tokenizer (approx bei fehlendem Paket)
+        "concurrency": concurrency,
+        "stream": backend.stream,
+        "extra_lines": backend.extra_lines,
+        "start_epoch": start_epoch,
+        "end_epoch": end_epoch,
+        "total_time_s": total_time,  # RQ2: Gesamtlaufzeit (diese Sitzung)
+        **aggregate(records, setting(cfg, "PASS_K")),
+        "cache_hits": cache.hits if cache else 0,
+        "scheduler": scheduler.summary(),  # Retries/Wartezeiten dieser Sitzung
+        "hedging": hedger.summary() if hedger else None,
+        "order": setting(cfg, "ORDER"),
+        "warmup": warmup,  # Kaltstart je Host (nicht in den Latenzen enthalten)
+        **backend.meta(total_time),
+    }
+
+    with open(cfg.OUT_META, "w", encoding="utf-8") as fmeta:
+        json.dump(meta, fmeta, ensure_ascii=False, indent=2)
+
+    print(f"\n{tag}✅ {backend.name.upper()} FINISHED")
+    print(f"{tag}Saved:")
+    for path in (cfg.OUT_CSV, cfg.OUT_JSONL, cfg.OUT_META) + ((cfg.OUT_PROMPTS,) if prompts else ()):
+        print(f"{tag} -", path)
+    return meta
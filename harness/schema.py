@@ -0,0 +1,179 @@
+"""
+Ergebnis-Schema
+Gemeinsame Bewertung (exact/strict/contains), CSV-Spalten und aggregierte Metriken für alle
+Backends. Cloud und On-Premise schreiben dieselben Felder: lokale Läufe enthalten Tokens
+(Ollama zählt Prompt- und Output-Tokens), Cloud-Läufe `exact_correct`, lokale Kosten sind 0.
+"""
+
+import csv
+import os
+from datetime import datetime
+
+from latency_stats import histogram, summarize
+from sampling import aggregate_samples
+from scoring import mean_scores
+
+# Spalten der Ergebnis-CSV (eine Zeile je Aufgabe)
+CSV_COLUMNS = (
+    "id",                # Aufgaben-ID
+    "exact_correct",     # RQ1: Exakte Zeichen-Übereinstimmung
+    "strict_correct",    # RQ1: Exakte Übereinstimmung (normalisiert)
+    "contains_correct",  # RQ1: Inhaltliche Übereinstimmung
+    "latency_s",         # RQ2: Antwortzeit
+    "ttft_s",            # RQ2: Time-to-first-token (nur Streaming)
+    "input_tokens",      # RQ3: Input-Tokens
+    "output_tokens",     # RQ3: Output-Tokens
+    "total_tokens",      # RQ3: Gesamt-Tokens
+    "est_cost_usd",      # RQ3: Geschätzte Kosten (lokal 0)
+    "finish_reason",     # API-Abschlussgrund
+    "error",             # Fehlermeldung
+)
+
+
+# ===================== NORMALISIERUNG =====================
+def now_iso():
+    """Gibt aktuellen UTC-Zeitstempel im ISO-Format zurück"""
+    return datetime.utcnow().isoformat() + "Z"
+
+
+def normalize_line(s: str) -> str:
+    """Entfernt Zeilenumbrüche am Ende, behält Einrückung bei"""
+    return (s or "").rstrip("\r\n")
+
+
+def norm_for_eval(s: str) -> str:
+    """Normalisiert Whitespace für fairen Code-Vergleich (RQ1)"""
+    return normalize_line(s).expandtabs(4).strip()
+
+
+def first_nonempty_line(text: str) -> str:
+    """Findet erste nicht-leere Zeile in Modellantwort"""
+    text = (text or "").replace("\r\n", "\n").replace("\r", "\n")
+    for line in text.split("\n"):
+        if line.strip() != "":
+            return line
+    return ""
+
+
+def prompt_messages(rec: dict) -> list:
+    """Prompt als Messages-Liste"""
+    inp = rec.get("input")
+    return inp if isinstance(inp, list) else [{"role": "user", "content": str(inp)}]
+
+
+def prompt_text(rec: dict) -> str:
+    """Gesamter Prompt-Text (Schlüssel für die Präfix-Sortierung)"""
+    return "\n".join(str(m.get("content", "")) for m in prompt_messages(rec))
+
+
+# ===================== BEWERTUNG (RQ1) =====================
+def evaluate(ideal_raw: str, output_text: str) -> dict:
+    """Erste nicht-leere Zeile gegen die Ground Truth: exakt, normalisiert, in irgendeiner Zeile"""
+    ideal_eval = norm_for_eval(ideal_raw)
+    out_first_raw = normalize_line(first_nonempty_line(output_text))
+    out_first_eval = norm_for_eval(out_first_raw)
+    out_lines = (output_text or "").replace("\r\n", "\n").replace("\r", "\n").split("\n")
+    return {
+        "ideal_norm": ideal_eval,
+        "output_first_line": out_first_raw,
+        "output_first_line_norm": out_first_eval,
+        "exact_correct": out_first_raw == ideal_raw,       # Exakte Zeichen-Übereinstimmung
+        "strict_correct": out_first_eval == ideal_eval,    # Normalisierte Übereinstimmung
+        "contains_correct": any(                           # Ground Truth in irgendeiner Zeile
+            norm_for_eval(line) == ideal_eval for line in out_lines if line.strip() != ""
+        ),
+    }
+
+
+# ===================== CSV =====================
+def ensure_header(csv_path: str):
+    """Erstellt CSV-Datei mit Kopfzeile"""
+    if not os.path.exists(csv_path):
+        with open(csv_path, "w", newline="", encoding="utf-8") as f:
+            csv.writer(f).writerow(CSV_COLUMNS)
+
+
+def csv_row(res: dict) -> list:
+    """CSV-Zeile (tabellarische Metriken) für ein Aufgaben-Ergebnis"""
+    usage = res.get("usage") or {}
+    return [
+        res["id"],
+        res.get("exact_correct"),
+        res["strict_correct"],
+        res["contains_correct"],
+        res["latency_s"],
+        res.get("ttft_s"),
+        usage.get("input_tokens", 0),
+        usage.get("output_tokens", 0),
+        usage.get("total_tokens", 0),
+        round(res.get("est_cost_usd") or 0.0, 8),
+        res["finish_reason"],
+        res["error"],
+    ]
+
+
+# ===================== AGGREGATION =====================
+def aggregate(records: list, pass_k=(1, 5, 10)) -> dict:
+    """Berechnet aggregierte Metriken aus allen abgeschlossenen Aufgaben"""
+    n = len(records)
+    latencies = [r["latency_s"] for r in records]
+    ttfts = [r["ttft_s"] for r in records if r.get("ttft_s") is not None]
+    timings = [r["ollama"] for r in records if r.get("ollama")]
+
+    def rate(field):
+        return sum(bool(r.get(field)) for r in records) / n if n else 0.0
+
+    return {
+        "completed_items": n,
+        "exact_accuracy": rate("exact_correct"),        # RQ1
+        "strict_accuracy": rate("strict_correct"),      # RQ1
+        "contains_accuracy": rate("contains_correct"),  # RQ1
+        "scores": mean_scores(records),                 # RQ1: Mittelwerte der zusätzlichen Metriken
+        "sampling": aggregate_samples(records, pass_k),  # RQ1: pass@k, Streuung über Stichproben
+        "avg_latency_s": sum(latencies) / n if n else 0.0,  # RQ2
+        "avg_ttft_s": sum(ttfts) / len(ttfts) if ttfts else None,  # RQ2
+        # Verteilungen (RQ2): Tail-Latenz statt nur Mittelwert
+        "latency_percentiles_s": summarize(latencies),
+        "latency_histogram_s": histogram(latencies),
+        "ttft_percentiles_s": summarize(ttfts),
+        "output_tokens_per_s": summarize(r.get("output_tokens_per_s") for r in records),
+        "sum_input_tokens": sum((r.get("usage") or {}).get("input_tokens", 0) for r in records),  # RQ3
+        "sum_output_tokens": sum((r.get("usage") or {}).get("output_tokens", 0) for r in records),  # RQ3
+        "est_total_cost_usd": sum(r.get("est_cost_usd") or 0.0 for r in records),  # RQ3
+        # Aufgaben mit geschätzten Tokens (abgebrochener Stream ohne Usage): Summen und Kosten teils geschätzt
+        "usage_estimated_items": sum(1 for r in records if r.get("usage_estimated")),
+        # Ollama-Serverzeiten: Modell-Laden vs. Prompt-Auswertung vs. Generierung (nur native API)
+        "ollama_load_s": summarize(t["load_s"] for t in timings),
+        "ollama_prompt_eval_s": summarize(t["prompt_eval_s"] for t in timings),
+        "ollama_eval_s": summarize(t["eval_s"] for t in timings),
+        # Kaltstart (Modell-Laden während der Aufgabe) getrennt vom eingeschwungenen Zustand
+        "cold_start_items": sum(1 for r in records if r.get("cold_start")),
+        "cold_latency_s": summarize(r["latency_s"] for r in records if r.get("cold_start")),
+        "steady_latency_s": summarize(r["latency_s"] for r in records if not r.get("cold_start")),
+        "items_with_retries": sum(1 for r in records if r.get("retries")),
+        "sum_retries": sum(r.get("retries", 0) for r in records),
+        "sum_backoff_s": round(sum(r.get("backoff_s", 0.0) for r in records), 3),
+        "hedged_items": sum(1 for r in records if r.get("hedged")),
+        "hedge_wins": sum(1 for r in records if r.get("hedge_winner") == "hedge"),
+        "sum_hedge_extra_tokens": sum(sum((r.get("hedge_extra_tokens") or {}).values()) for r in records),
+        "trimmed_items": sum(1 for r in records if (r.get("context") or {}).get("trimmed")),
+        "prompt_tokens_local": summarize((r.get("context") or {}).get("prompt_tokens") for r in records),
+        "per_host": per_host(records),
+    }
+
+
+def per_host(records: list) -> dict:
+    """Latenz und Durchsatz je Host (Vergleich der Inferenz-Boxen)"""
+    groups = {}
+    for r in records:
+        if r.get("host"):
+            groups.setdefault(r["host"], []).append(r)
+    return {
+        host: {
+            "items": len(rs),
+            "errors": sum(1 for r in rs if r["error"]),
+            "latency_s": summarize(r["latency_s"] for r in rs),
+            "output_tokens_per_s": summarize(r.get("output_tokens_per_s") for r in rs),
+        }
+        for host, rs in sorted(groups.items())
+    }
@@ -0,0 +1,119 @@
+"""
+Hedged Requests
+Gegen lange Latenz-Ausreißer: Ist eine Anfrage nach dem p-ten Perzentil der bisher
+beobachteten Latenzen noch offen, wird ein Duplikat gesendet (gleiches oder alternatives
+Backend). Die erste Antwort gewinnt, die andere Anfrage wird abgebrochen.
+"""
+
+import asyncio
+import bisect
+import time
+from collections import deque
+
+from latency_stats import percentile
+
+
+class Hedger:
+    """
+    - percentile: Perzentil der beobachteten Latenzen, ab dem ein Duplikat gesendet wird
+    - min_samples: erst ab so vielen Messwerten wird gehedgt (vorher keine Schwelle)
+    - max_ratio: höchstens dieser Anteil der Anfragen wird dupliziert (Lastbegrenzung)
+    - window: Anzahl der letzten Latenzen, aus denen die Schwelle berechnet wird
+    """
+
+    def __init__(self, percentile: float = 95, min_samples: int = 20, max_ratio: float = 0.1, window: int = 500):
+        self.percentile = percentile
+        self.min_samples = min_samples
+        self.max_ratio = max_ratio
+        self._recent = deque(maxlen=window)  # Reihenfolge des Eintreffens
+        self._sorted = []  # dieselben Werte, sortiert
+        self.requests = 0
+        self.hedged = 0
+        self.hedge_wins = 0
+
+    def observe(self, latency: float):
+        """Nimmt eine Latenz in das gleitende Fenster auf"""
+        if len(self._recent) == self._recent.maxlen:
+            old = self._recent[0]
+            del self._sorted[bisect.bisect_left(self._sorted, old)]
+        self._recent.append(latency)
+        bisect.insort(self._sorted, latency)
+
+    def threshold(self):
+        """Aktuelle Hedge-Schwelle in Sekunden (None = noch zu wenige Messwerte)"""
+        if len(self._sorted) < self.min_samples:
+            return None
+        return percentile(self._sorted, self.percentile)
+
+    def _budget_left(self) -> bool:
+        return self.hedged < self.max_ratio * self.requests
+
+    async def run(self, primary, hedge):
+        """
+        Führt `await primary()` aus; nach Überschreiten der Schwelle zusätzlich `await hedge()`.
+        Liefert (Ergebnis, Info) mit hedged, winner ("primary"/"hedge"), hedge_after_s
+        und loser_runtime_s (Laufzeit der abgebrochenen Anfrage, für die Kostenschätzung).
+        """
+        self.requests += 1
+        info = {"hedged": False, "winner": "primary", "hedge_after_s": None, "loser_runtime_s": 0.0}
+        t0 = time.monotonic()
+        first = asyncio.ensure_future(primary())
+        delay = self.threshold()
+        tasks = {first: "primary"}
+        try:
+            if delay is not None:
+                done, _ = await asyncio.wait({first}, timeout=delay)
+                if not done and self._budget_left():
+                    self.hedged += 1
+                    info["hedged"] = True
+                    info["hedge_after_s"] = round(time.monotonic() - t0, 3)
+                    tasks[asyncio.ensure_future(hedge())] = "hedge"
+
+            # Erste erfolgreiche Antwort gewinnt; Fehler nur, wenn alle scheitern
+            pending = set(tasks)
+            error = None
+            while pending:
+                done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+                for task in done:
+                    if task.exception() is not None:
+                        if tasks[task] == "primary" or error is None:
+                            error = task.exception()
+                        continue
+                    elapsed = time.monotonic() - t0
+                    info["winner"] = tasks[task]
+                    if info["hedged"]:
+                        # Verlierer ist das Duplikat (ab hedge_after_s) oder die ursprüngliche Anfrage
+                        started = info["hedge_after_s"] if info["winner"] == "primary" else 0.0
+                        info["loser_runtime_s"] = round(elapsed - started, 3)
+                    self.hedge_wins += info["winner"] == "hedge"
+                    self.observe(elapsed)
+                    return task.result(), info
+            raise error
+        finally:
+            for task in tasks:
+                if not task.done():
+                    task.cancel()
+            await asyncio.gather(*tasks, return_exceptions=True)
+
+    def summary(self) -> dict:
+        """Kennzahlen für die Meta-Datei"""
+        t = self.threshold()
+        return {
+            "percentile": self.percentile,
+            "requests": self.requests,
+            "hedged": self.hedged,
+            "hedge_wins": self.hedge_wins,
+            "last_threshold_s": round(t, 3) if t is not None else None,
+        }
+
+
+def hedge_extra_tokens(usage: dict, info: dict, latency: float) -> dict:
+    """
+    Geschätzter Zusatzverbrauch der abgebrochenen Anfrage: voller Prompt plus
+    Output-Tokens anteilig zu ihrer Laufzeit (höchstens so viele wie die Gewinner-Antwort).
+    """
+    if not info["hedged"] or not usage:
+        return {"input_tokens": 0, "output_tokens": 0}
+    out = int(usage.get("completion_tokens") or 0)
+    share = min(1.0, info["loser_runtime_s"] / latency) if latency else 1.0
+    return {"input_tokens": int(usage.get("prompt_tokens") or 0), "output_tokens": round(out * share)}
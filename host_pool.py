@@ -0,0 +1,197 @@
+"""
+Host-Pool
+Verteilt Anfragen auf mehrere On-Premise-Inferenz-Hosts (gleiches Modell auf jedem Host):
+Routing nach wenigsten offenen Anfragen oder nach Latenz, Health-Checks und Drainen
+ausgefallener Hosts, Statistik pro Host
+"""
+
+import asyncio
+import contextlib
+import time
+
+import httpx
+
+from request_scheduler import classify_error, status_of
+
+STRATEGIES = ("least_outstanding", "latency")
+# Überlast (Ollama: Warteschlange voll, Rate-Limit) ist kein Ausfall des Hosts
+OVERLOAD_STATUS = (429, 503)
+
+
+class NoHostAvailable(ConnectionError):
+    """Kein Host innerhalb der Wartezeit frei (scheduler: Kategorie "connection")"""
+
+
+class Host:
+    """Zustand eines Hosts im Pool"""
+
+    def __init__(self, name: str, client, health_url: str):
+        self.name = name
+        self.client = client
+        self.health_url = health_url
+        self.healthy = True
+        self.outstanding = 0  # offene Anfragen
+        self.served = 0
+        self.errors = 0
+        self.consecutive_errors = 0
+        self.drained = 0  # wie oft als ungesund markiert
+        self.drained_at = None  # Zeitpunkt des letzten Drains (time.monotonic)
+        self.busy_s = 0.0  # Summe der Anfragedauern
+        self.ewma_s = None  # geglättete Latenz
+
+    def summary(self, wall_s: float = None) -> dict:
+        out = {
+            "healthy": self.healthy,
+            "served": self.served,
+            "errors": self.errors,
+            "drained": self.drained,
+            "ewma_latency_s": round(self.ewma_s, 3) if self.ewma_s is not None else None,
+            "busy_s": round(self.busy_s, 2),
+        }
+        if wall_s:
+            out["items_per_h"] = round(self.served / wall_s * 3600, 1)
+        return out
+
+
+class HostPool:
+    """
+    - strategy: "least_outstanding" (wenigste offene Anfragen) oder
+      "latency" (kleinste erwartete Wartezeit = (offen + 1) * geglättete Latenz)
+    - max_per_host: max. gleichzeitige Anfragen je Host (0 = unbegrenzt), z. B. OLLAMA_NUM_PARALLEL
+    - fail_threshold: Fehler in Folge, nach denen ein Host gedraint wird (nie der letzte gesunde)
+    - health_interval_s: Abstand der aktiven Health-Checks; gedrainte Hosts kommen so zurück,
+      frühestens eine Health-Check-Periode nach dem Drain (/api/tags antwortet auch, wenn
+      die Inferenz scheitert)
+    - lease_timeout_s: max. Wartezeit auf einen freien Host, danach NoHostAvailable (None = unbegrenzt)
+    """
+
+    def __init__(
+        self,
+        hosts: list,
+        strategy: str = "least_outstanding",
+        max_per_host: int = 0,
+        fail_threshold: int = 3,
+        health_interval_s: float = 30.0,
+        lease_timeout_s: float = 120.0,
+        alpha: float = 0.2,
+    ):
+        if strategy not in STRATEGIES:
+            raise ValueError(f"Unbekannte Routing-Strategie: {strategy}")
+        self.hosts = [Host(*h) for h in hosts]
+        self.strategy = strategy
+        self.max_per_host = max_per_host
+        self.fail_threshold = fail_threshold
+        self.health_interval_s = health_interval_s
+        self.lease_timeout_s = lease_timeout_s
+        self.alpha = alpha
+        self._cond = asyncio.Condition()
+        self._health_task = None
+        self._http = None
+
+    # ---------- Routing ----------
+    def _score(self, host: Host):
+        if self.strategy == "latency":
+            # Unbekannte Hosts zuerst ausprobieren
+            return (host.outstanding + 1) * (host.ewma_s or 0.0), host.served
+        return host.outstanding, host.served
+
+    def _pick(self):
+        candidates = [
+            h for h in self.hosts
+            if h.healthy and (not self.max_per_host or h.outstanding < self.max_per_host)
+        ]
+        return min(candidates, key=self._score) if candidates else None
+
+    @contextlib.asynccontextmanager
+    async def lease(self):
+        """Reserviert einen Host für eine Anfrage (wartet, falls alle belegt oder gedraint)"""
+        async with self._cond:
+            try:
+                await asyncio.wait_for(self._cond.wait_for(lambda: self._pick() is not None), self.lease_timeout_s)
+            except asyncio.TimeoutError:
+                raise NoHostAvailable(f"Kein Host innerhalb von {self.lease_timeout_s:g} s verfügbar") from None
+            host = self._pick()
+            host.outstanding += 1
+        t0 = time.monotonic()
+        try:
+            yield host
+        except Exception as e:
+            # Nur Host-Probleme zählen (keine fehlerhaften Anfragen, keine Überlast)
+            if status_of(e) not in OVERLOAD_STATUS and classify_error(e) in ("timeout", "connection", "server"):
+                self._failure(host)
+            raise
+        else:
+            self._success(host, time.monotonic() - t0)
+        finally:
+            host.outstanding -= 1
+            host.busy_s += time.monotonic() - t0
+            async with self._cond:
+                self._cond.notify_all()
+
+    def _success(self, host: Host, latency: float):
+        host.served += 1
+        host.consecutive_errors = 0
+        host.ewma_s = latency if host.ewma_s is None else (1 - self.alpha) * host.ewma_s + self.alpha * latency
+
+    def _failure(self, host: Host):
+        host.errors += 1
+        host.consecutive_errors += 1
+        if host.healthy and host.consecutive_errors >= self.fail_threshold:
+            # Der letzte gesunde Host bleibt: Drainen würde nur alle Anfragen anhalten
+            if not any(h.healthy for h in self.hosts if h is not host):
+                return
+            self._set_health(host, False)
+
+    def _set_health(self, host: Host, healthy: bool):
+        if host.healthy and not healthy:
+            host.drained += 1
+            host.drained_at = time.monotonic()
+            print(f"⚠️  Host {host.name} gedraint")
+        elif healthy and not host.healthy:
+            print(f"✅ Host {host.name} wieder verfügbar")
+            host.consecutive_errors = 0
+        host.healthy = healthy
+
+    # ---------- Health-Checks ----------
+    async def check(self):
+        """Prüft alle Hosts einmal (GET auf health_url) und weckt wartende Anfragen"""
+        async def probe(host):
+            try:
+                r = await self._http.get(host.health_url)
+                return r.status_code == 200
+            except httpx.HTTPError:
+                return False
+
+        results = await asyncio.gather(*(probe(h) for h in self.hosts))
+        now = time.monotonic()
+        for host, ok in zip(self.hosts, results):
+            # Cool-down: ein wegen Fehlern gedrainter Host bleibt mindestens eine Periode draußen
+            if ok and not host.healthy and host.drained_at and now - host.drained_at < self.health_interval_s:
+                continue
+            self._set_health(host, ok)
+        async with self._cond:
+            self._cond.notify_all()
+
+    async def _health_loop(self):
+        while True:
+            await asyncio.sleep(self.health_interval_s)
+            await self.check()
+
+    async def start(self):
+        """Erster Health-Check und periodische Prüfung im Hintergrund"""
+        self._http = httpx.AsyncClient(timeout=httpx.Timeout(5.0))
+        await self.check()
+        if not any(h.healthy for h in self.hosts):
+            print("⚠️  Kein Host erreichbar, warte auf Health-Check")
+        self._health_task = asyncio.ensure_future(self._health_loop())
+
+    async def stop(self):
+        if self._health_task:
+            self._health_task.cancel()
+            await asyncio.gather(self._health_task, return_exceptions=True)
+        if self._http:
+            await self._http.aclose()
+
+    def summary(self, wall_s: float = None) -> dict:
+        """Kennzahlen pro Host für die Meta-Datei"""
+        return {h.name: h.summary(wall_s) for h in self.hosts}
@@ -0,0 +1,53 @@
+"""
+Latenz-Statistik
+Perzentile und Histogramm für Latenz-, TTFT- und Durchsatzwerte eines Laufs
+"""
+
+import math
+
+PERCENTILES = (50, 90, 95, 99)
+
+# Bucket-Obergrenzen in Sekunden (log-ähnlich, deckt Cloud- und NUC-Latenzen ab)
+HISTOGRAM_BOUNDS = (0.5, 1, 2, 5, 10, 20, 30, 60, 120, 300, 600, 1200)
+
+
+def percentile(sorted_values: list, p: float) -> float:
+    """Perzentil mit linearer Interpolation (wie numpy.percentile, Standardmodus)"""
+    if not sorted_values:
+        return None
+    k = (len(sorted_values) - 1) * p / 100.0
+    lo = math.floor(k)
+    hi = math.ceil(k)
+    if lo == hi:
+        return sorted_values[int(k)]
+    return sorted_values[lo] + (sorted_values[hi] - sorted_values[lo]) * (k - lo)
+
+
+def summarize(values) -> dict:
+    """Kennzahlen einer Verteilung: n, mean, p50/p90/p95/p99, max (None-Werte werden ignoriert)"""
+    vals = sorted(v for v in values if v is not None)
+    if not vals:
+        return {"n": 0}
+    out = {"n": len(vals), "mean": round(sum(vals) / len(vals), 4)}
+    for p in PERCENTILES:
+        out[f"p{p}"] = round(percentile(vals, p), 4)
+    out["max"] = round(vals[-1], 4)
+    return out
+
+
+def histogram(values, bounds=HISTOGRAM_BOUNDS) -> dict:
+    """Anzahl Werte je Bucket ("<=Grenze"), letzter Bucket "+Inf" (kumulativ wie Prometheus)"""
+    vals = [v for v in values if v is not None]
+    out = {}
+    for b in bounds:
+        out[f"<={b}"] = sum(1 for v in vals if v <= b)
+    out["+Inf"] = len(vals)
+    return out
+
+
+def tokens_per_second(output_tokens: int, latency_s: float, ttft_s: float = None):
+    """Output-Tokens pro Sekunde Generierungszeit (ab dem ersten Token, falls TTFT bekannt)"""
+    gen_time = latency_s - ttft_s if ttft_s is not None else latency_s
+    if not output_tokens or not gen_time or gen_time <= 0:
+        return None
+    return round(output_tokens / gen_time, 2)
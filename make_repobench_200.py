@@ -6,37 +6,163 @@ Creates repobench_200.jsonl by sampling 200 items from RepoBench Java v1.1 (in_f
 Each line is a JSON object with:
 - input: OpenAI-style messages
 - ideal: the ground-truth next line from the dataset
+
+Sources (first match wins):
+- --parquet PATH: local Parquet file(s) or directory, no network needed
+- otherwise the Hugging Face dataset; a cached snapshot is reused if present
+  (--offline forbids any network access)
+
+Sampling:
+- shuffle (default): shuffle(seed).select(range(N)) on the full split,
+  identical to earlier versions of this script
+- reservoir: one pass over a streamed split with seeded reservoir sampling,
+  no full download or materialization; suitable for 1k/10k/100k item files
+
+Context budget (--budget TOKENS):
+- prompts longer than the budget keep the instruction, the code lines nearest
+  the completion point and the imports that code uses (see context_budget.py)
+- tokens are counted locally (--tokenizer approx | tiktoken:<enc> | hf:<model>)
+- each item records the budget and token counts under "context"
 """
 
-import os
+import argparse
 import json
+import os
+import random
 import sys
 
+from context_budget import HEADER
+
 # ✅ Disable Hugging Face checksum / metadata validation globally
 os.environ["HF_DATASETS_IGNORE_VERIFICATION"] = "1"
 os.environ["HF_DATASETS_IGNORE_CHECKSUMS"] = "1"
-os.environ["HF_DATASETS_OFFLINE"] = "0"
-
-from datasets import load_dataset
 
+DATASET_ID = "tianyang/repobench_java_v1.1"
+SPLIT = "in_file"
 N = 200
 SEED = 42
 OUTFILE = "repobench_200.jsonl"
 
 
-def main() -> int:
+def parse_args(argv=None):
+    ap = argparse.ArgumentParser(description="Build a RepoBench Java benchmark file.")
+    ap.add_argument("-n", type=int, default=N, help=f"number of items (default {N})")
+    ap.add_argument("--seed", type=int, default=SEED, help=f"sampling seed (default {SEED})")
+    ap.add_argument(
+        "--out",
+        default=None,
+        help=f"output file (default {OUTFILE} for n={N}, else repobench_<n>.jsonl)",
+    )
+    ap.add_argument(
+        "--sample",
+        choices=("shuffle", "reservoir"),
+        default="shuffle",
+        help="shuffle the full split or reservoir-sample a streamed split",
+    )
+    ap.add_argument("--parquet", default=None, help="local Parquet file, glob or directory")
+    ap.add_argument(
+        "--offline", action="store_true", help="never touch the network (cached snapshot only)"
+    )
+    ap.add_argument("--budget", type=int, default=None, help="max prompt tokens (default: no trimming)")
+    ap.add_argument(
+        "--tokenizer",
+        default="approx",
+        help="token counter for --budget: approx, tiktoken:<encoding> or hf:<model>",
+    )
+    return ap.parse_args(argv)
+
+
+def build_record(ex):
+    """Turns one dataset row into a benchmark item (None for unusable rows)."""
+    import_stmt = ex.get("import_statement") or ""
+    cropped_code = ex.get("cropped_code") or ""
+    next_line = ex.get("next_line")
+
+    if next_line is None:
+        return None  # skip weird rows
+
+    prompt = (
+        HEADER
+        + f"{import_stmt}\n"
+        f"{cropped_code}"
+    )
+    return {
+        "input": [{"role": "user", "content": prompt}],
+        "ideal": next_line,
+    }
+
+
+def load_source(args, streaming: bool):
+    """Loads the split from a local Parquet path or the (cached) Hugging Face dataset."""
+    from datasets import load_dataset
+
+    if args.parquet:
+        path = args.parquet
+        if os.path.isdir(path):
+            path = os.path.join(path, "**", "*.parquet")
+        return load_dataset("parquet", data_files=path, split="train", streaming=streaming)
+
+    # Reuse a cached snapshot if present; only downloads what is missing
+    return load_dataset(
+        DATASET_ID,
+        split=SPLIT,
+        streaming=streaming,
+        verification_mode="no_checks",
+    )
+
+
+def reservoir_sample(rows, n: int, seed: int):
+    """
+    Seeded reservoir sampling (Algorithm R) in a single pass.
+    Returns the sampled records in stream order, so the output is
+    deterministic for a given seed and source.
+    """
+    rng = random.Random(seed)
+    reservoir = []  # (stream position, record)
+    seen = 0
+    for ex in rows:
+        rec = build_record(ex)
+        if rec is None:
+            continue
+        if seen < n:
+            reservoir.append((seen, rec))
+        else:
+            j = rng.randint(0, seen)
+            if j < n:
+                reservoir[j] = (seen, rec)
+        seen += 1
+    reservoir.sort(key=lambda x: x[0])
+    return [rec for _, rec in reservoir], seen
+
+
+def main(argv=None) -> int:
+    args = parse_args(argv)
+    outfile = args.out or (OUTFILE if args.n == N else f"repobench_{args.n}.jsonl")
+    if args.budget and not args.out:
+        outfile = outfile.replace(".jsonl", f"_b{args.budget}.jsonl")
+
+    count = None
+    if args.budget:
+        from context_budget import load_tokenizer
+
+        try:
+            count = load_tokenizer(args.tokenizer)
+        except (RuntimeError, ValueError) as e:
+            print(str(e), file=sys.stderr)
+            return 1
+
+    if args.offline:
+        os.environ["HF_DATASETS_OFFLINE"] = "1"
+        os.environ["HF_HUB_OFFLINE"] = "1"
+
+    streaming = args.sample == "reservoir"
     try:
-        # Force re-download and skip verification
-        ds = load_dataset(
-            "tianyang/repobench_java_v1.1",
-            download_mode="force_redownload",
-            verification_mode="no_checks",
-        )["in_file"]
+        ds = load_source(args, streaming)
     except Exception as e:
         print(
             "Failed to load dataset.\n"
             "Fixes to try:\n"
-            "  1) Ensure you have internet access\n"
+            "  1) Ensure you have internet access, or pass --parquet with a local copy\n"
             "  2) Upgrade: python -m pip install -U datasets huggingface_hub\n"
             "  3) Delete cache: rm -rf ~/.cache/huggingface/datasets/tianyang___parquet\n",
             file=sys.stderr,
@@ -44,37 +170,33 @@ def main() -> int:
         print(str(e), file=sys.stderr)
         return 1
 
-    if len(ds) < N:
-        print(f"Dataset split has only {len(ds)} rows, cannot sample {N}.", file=sys.stderr)
-        return 1
-
-    ds = ds.shuffle(seed=SEED).select(range(N))
-
-    with open(OUTFILE, "w", encoding="utf-8") as f:
-        for ex in ds:
-            import_stmt = ex.get("import_statement") or ""
-            cropped_code = ex.get("cropped_code") or ""
-            next_line = ex.get("next_line")
-
-            if next_line is None:
-                continue  # skip weird rows
-
-            prompt = (
-                "Output ONLY the next line of Java code. No markdown, no explanation.\n\n"
-                f"{import_stmt}\n"
-                f"{cropped_code}"
-            )
-
-            rec = {
-                "input": [{"role": "user", "content": prompt}],
-                "ideal": next_line,
-            }
+    if streaming:
+        records, seen = reservoir_sample(ds, args.n, args.seed)
+        if seen < args.n:
+            print(f"Dataset split has only {seen} usable rows, cannot sample {args.n}.", file=sys.stderr)
+            return 1
+    else:
+        if len(ds) < args.n:
+            print(f"Dataset split has only {len(ds)} rows, cannot sample {args.n}.", file=sys.stderr)
+            return 1
+        ds = ds.shuffle(seed=args.seed).select(range(args.n))
+        records = [rec for rec in map(build_record, ds) if rec is not None]
+
+    if count:
+        from context_budget import trim_record
+
+        # Trim after sampling: the sample is identical for every budget level
+        records = [trim_record(rec, args.budget, count) for rec in records]
+        trimmed = sum(rec["context"]["trimmed"] for rec in records)
+        print(f"Trimmed {trimmed}/{len(records)} prompts to {args.budget} tokens ({args.tokenizer})")
+
+    with open(outfile, "w", encoding="utf-8") as f:
+        for rec in records:
             f.write(json.dumps(rec, ensure_ascii=False) + "\n")
 
-    print(f"✅ Wrote {N} samples to {OUTFILE}")
+    print(f"✅ Wrote {len(records)} samples to {outfile}")
     return 0
 
 
 if __name__ == "__main__":
     raise SystemExit(main())
-
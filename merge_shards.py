@@ -0,0 +1,117 @@
+"""
+Shard-Zusammenführung
+Führt die Shard-Ausgaben eines Laufs (run_cloud_test.py / run_local_test.py mit --shard k/N)
+zu einem Ergebnis zusammen: CSV und JSONL nach Aufgaben-ID sortiert, Meta-Kennzahlen
+(Genauigkeit, Latenz-Perzentile, Tokens, Kosten) exakt aus allen Records neu berechnet
+"""
+
+import argparse, json, os
+
+import run_cloud_test
+import run_local_test
+from details_store import merge_stores
+from sharding import find_shards, read_records, shard_path
+
+TARGETS = {"cloud": run_cloud_test, "local": run_local_test}
+
+# Lauf-Einstellungen, die in allen Shards übereinstimmen müssen: Modell, Datensatz, Dekodierung
+# (Streaming mit Early-Stop ändert Antworttext, Bewertung und Tokens), Stichproben, Budget, Details-Format
+RUN_KEYS = ("backend", "model", "dataset", "stream", "extra_lines", "temperature", "max_tokens", "samples",
+            "context_budget", "tokenizer", "details_format")
+
+# Sitzungswerte je Shard (nicht über Shards aggregierbar, werden pro Shard übernommen);
+# Endpunkt und API dürfen sich unterscheiden, z. B. ein Shard je Inferenz-Host
+SESSION_KEYS = ("concurrency", "start_epoch", "end_epoch", "total_time_s", "cache_hits",
+                "base_url", "native_api", "scheduler", "hedging", "routing", "host_pool")
+
+
+def load_meta(path: str) -> dict:
+    if not os.path.exists(path):
+        return {}
+    with open(path, "r", encoding="utf-8") as f:
+        return json.load(f)
+
+
+def merge(module, n: int = None, partial: bool = False) -> dict:
+    """Führt alle Shards zusammen, schreibt CSV/JSONL/Meta des Gesamtlaufs und liefert die Meta"""
+    shards = find_shards(module.OUT_JSONL, n)
+    if not shards:
+        raise SystemExit(f"Keine Shards zu {module.OUT_JSONL} gefunden")
+    counts = {shard[1] for shard, _ in shards}
+    if len(counts) > 1:
+        raise SystemExit(f"Shards mit unterschiedlichem N gefunden ({sorted(counts)}), bitte --shards angeben")
+    n = counts.pop()
+    missing = sorted(set(range(1, n + 1)) - {shard[0] for shard, _ in shards})
+    if missing and not partial:
+        raise SystemExit(f"Shards fehlen: {missing} von {n} (mit --partial trotzdem zusammenführen)")
+
+    # Records aller Shards, nach ID sortiert (bei Duplikaten gilt der letzte Eintrag)
+    by_id = {}
+    metas = {}
+    for shard, path in shards:
+        for rec in read_records(path):
+            by_id[rec["id"]] = rec
+        metas[f"{shard[0]}/{shard[1]}"] = load_meta(shard_path(module.OUT_META, shard))
+    records = [by_id[i] for i in sorted(by_id)]
+
+    # Lauf-Einstellungen müssen übereinstimmen, sonst sind die Ergebnisse nicht vergleichbar
+    known = [m for m in metas.values() if m]
+    for key in RUN_KEYS:
+        values = {json.dumps(m.get(key)) for m in known if key in m}
+        if len(values) > 1:
+            raise SystemExit(f"Shards unterscheiden sich in '{key}': {sorted(values)}")
+    first = known[0] if known else {}
+
+    module.rebuild_outputs(records)
+    # Prompt-Stores der Shards (kompaktes Details-Format) zusammenführen
+    stores = [shard_path(module.OUT_PROMPTS, shard) for shard, _ in shards]
+    stores = [p for p in stores if os.path.exists(p)]
+    if stores:
+        merge_stores(stores, module.OUT_PROMPTS)
+
+    starts = [m["start_epoch"] for m in known if "start_epoch" in m]
+    ends = [m["end_epoch"] for m in known if "end_epoch" in m]
+    meta = {
+        **{k: first[k] for k in RUN_KEYS if k in first},
+        "items": sum(m.get("items", 0) for m in known),
+        "shards": n,
+        "start_epoch": min(starts) if starts else None,
+        "end_epoch": max(ends) if ends else None,
+        "total_time_s": (max(ends) - min(starts)) if starts and ends else None,  # Wanduhrzeit über alle Shards
+        **module.aggregate(records),
+        "cache_hits": sum(m.get("cache_hits", 0) for m in known),
+        "shard_sessions": {
+            spec: {k: m[k] for k in SESSION_KEYS if k in m} for spec, m in metas.items()
+        },
+    }
+    with open(module.OUT_META, "w", encoding="utf-8") as fmeta:
+        json.dump(meta, fmeta, ensure_ascii=False, indent=2)
+    return meta
+
+
+def main(argv=None):
+    ap = argparse.ArgumentParser(description="Shard-Ergebnisse zu einem Gesamtergebnis zusammenführen")
+    ap.add_argument("--target", choices=sorted(TARGETS), required=True)
+    ap.add_argument("--shards", type=int, default=None, help="N der Shard-Angabe k/N (Standard: automatisch)")
+    ap.add_argument("--partial", action="store_true", help="Auch zusammenführen, wenn Shards fehlen")
+    ap.add_argument("--budget", type=int, default=None, help="Kontext-Budget der Shards (wie beim Lauf)")
+    args = ap.parse_args(argv)
+
+    module = TARGETS[args.target]
+    if args.budget:
+        module.use_budget(args.budget)
+    meta = merge(module, args.shards, args.partial)
+
+    print(f"✅ {meta['shards']} Shards zusammengeführt: {meta['completed_items']}/{meta['items']} Aufgaben")
+    if meta["completed_items"] < meta["items"]:
+        print(f"⚠️  {meta['items'] - meta['completed_items']} Aufgaben noch offen")
+    print("Saved:")
+    print(" -", module.OUT_CSV)
+    print(" -", module.OUT_JSONL)
+    print(" -", module.OUT_META)
+    if os.path.exists(module.OUT_PROMPTS):
+        print(" -", module.OUT_PROMPTS)
+
+
+if __name__ == "__main__":
+    main()
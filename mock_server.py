@@ -0,0 +1,455 @@
+"""
+Mock-Server
+Lokaler Ersatz für OpenAI- bzw. Ollama-Endpunkte zum deterministischen Testen des Harness
+(Overhead, Retry-Pfade, Parallelität) ohne echte API oder NUC.
+
+Unterstützt:
+- POST /v1/chat/completions (OpenAI-kompatibel, normal und Streaming per SSE)
+- POST /api/chat (Ollama-nativ, normal und Streaming per NDJSON, inkl. Server-Zeiten)
+- Antworten aus dem `ideal`-Feld des Datensatzes, realistische `usage`-Felder
+- Konfigurierbare Latenzverteilungen sowie Fehler- und 429-Injektion
+- Optional Ollama-Verhalten: Modell-Laden bei Kaltstart (mit keep_alive) und Prompt-Auswertung
+  mit Wiederverwendung des gemeinsamen Präfixes der vorherigen Anfrage (KV-Cache, ein Slot)
+"""
+
+import argparse
+import hashlib
+import json
+import math
+import os
+import random
+import socket
+import subprocess
+import sys
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.request import urlopen
+
+# ===================== KONFIGURATION =====================
+DATASET = "repobench_200.jsonl"
+HOST = "127.0.0.1"
+PORT = 18080
+
+DEFAULTS = {
+    "ttft": "const:0",  # Zeit bis zum ersten Token (Verteilung, Sekunden)
+    "token_delay": 0.0,  # Sekunden pro weiterem Token
+    "accuracy": 1.0,  # Anteil Antworten, die exakt `ideal` liefern
+    "extra_lines": 2,  # Zusätzliche Zeilen nach der Antwort (simuliert "Geschwätzigkeit")
+    "error_rate": 0.0,  # Anteil HTTP 500
+    "rate_limit_rate": 0.0,  # Anteil HTTP 429
+    "retry_after": 1.0,  # Retry-After-Header bei 429 (Sekunden)
+    "load_time": 0.0,  # Modell-Laden bei Kaltstart (Sekunden)
+    "keep_alive": 300.0,  # Standard-Verweildauer des Modells nach einer Anfrage (Sekunden)
+    "prompt_rate": 0.0,  # Prompt-Tokens/s ohne Cache (0 = Prompt-Auswertung kostenlos)
+    "seed": 42,
+}
+
+
+# ===================== HILFSFUNKTIONEN =====================
+def parse_dist(spec: str):
+    """
+    Latenzverteilung aus Text, z. B. "const:0.5", "uniform:0.1,0.5",
+    "exp:2.0" (Mittelwert) oder "lognormal:1.5,0.6" (mu, sigma des Logarithmus).
+    Liefert eine Funktion rng -> Sekunden.
+    """
+    kind, _, args = spec.partition(":")
+    vals = [float(x) for x in args.split(",") if x]
+    if kind == "const":
+        return lambda rng: vals[0] if vals else 0.0
+    if kind == "uniform":
+        return lambda rng: rng.uniform(vals[0], vals[1])
+    if kind == "exp":
+        return lambda rng: rng.expovariate(1.0 / vals[0]) if vals[0] > 0 else 0.0
+    if kind == "lognormal":
+        return lambda rng: rng.lognormvariate(vals[0], vals[1])
+    raise ValueError(f"Unbekannte Verteilung: {spec}")
+
+
+def prompt_hash(messages) -> str:
+    """Schlüssel für die Zuordnung Prompt -> erwartete Antwort"""
+    raw = json.dumps(messages, sort_keys=True, ensure_ascii=False)
+    return hashlib.sha256(raw.encode("utf-8")).hexdigest()
+
+
+def load_answers(path: str) -> dict:
+    """Liest Prompts und `ideal`-Antworten aus dem Benchmark-Datensatz"""
+    answers = {}
+    try:
+        with open(path, "r", encoding="utf-8") as f:
+            for line in f:
+                if not line.strip():
+                    continue
+                rec = json.loads(line)
+                inp = rec.get("input")
+                messages = inp if isinstance(inp, list) else [{"role": "user", "content": str(inp)}]
+                answers[prompt_hash(messages)] = rec.get("ideal", "")
+    except OSError:
+        pass
+    return answers
+
+
+def tokenize(text: str) -> list:
+    """Grobe Tokenisierung (~4 Zeichen pro Token) für Streaming-Chunks und Usage"""
+    return [text[i : i + 4] for i in range(0, len(text), 4)] or [""]
+
+
+def count_prompt_tokens(messages) -> int:
+    return sum(math.ceil(len(str(m.get("content", ""))) / 4) + 4 for m in messages)
+
+
+def parse_keep_alive(value, default: float) -> float:
+    """Ollama-keep_alive ("30m", "1h", "90s", Sekunden; negativ = unbegrenzt) in Sekunden"""
+    if value is None or value == "":
+        return default
+    if isinstance(value, (int, float)):
+        secs = float(value)
+    else:
+        units = {"s": 1, "m": 60, "h": 3600}
+        value = str(value).strip()
+        secs = float(value[:-1]) * units[value[-1]] if value[-1] in units else float(value)
+    return math.inf if secs < 0 else secs
+
+
+# ===================== SERVER =====================
+class MockState:
+    """Gemeinsamer Zustand aller Request-Threads (Konfiguration, Zufall, Zähler)"""
+
+    def __init__(self, config: dict, answers: dict):
+        self.config = {**DEFAULTS, **config}
+        self.answers = answers
+        self.ttft = parse_dist(str(self.config["ttft"]))
+        self._rng = random.Random(self.config["seed"])
+        self._lock = threading.Lock()
+        self.stats = {"requests": 0, "errors": 0, "rate_limited": 0, "aborted": 0, "model_loads": 0}
+        self._load_lock = threading.Lock()
+        self._loaded_until = 0.0
+        self._last_prompt = ""
+
+    def draw(self):
+        """Zieht Zufallswerte threadsicher: (Fehler-Art, TTFT, korrekt?)"""
+        c = self.config
+        with self._lock:
+            self.stats["requests"] += 1
+            u = self._rng.random()
+            ttft = self.ttft(self._rng)
+            correct = self._rng.random() < c["accuracy"]
+            if u < c["rate_limit_rate"]:
+                self.stats["rate_limited"] += 1
+                return 429, ttft, correct
+            if u < c["rate_limit_rate"] + c["error_rate"]:
+                self.stats["errors"] += 1
+                return 500, ttft, correct
+        return 200, ttft, correct
+
+    def draw_correct(self) -> bool:
+        """Weitere Antwort derselben Anfrage (Parameter n): nur richtig/falsch ziehen"""
+        with self._lock:
+            return self._rng.random() < self.config["accuracy"]
+
+    def load_model(self, keep_alive) -> float:
+        """Lädt das Modell, falls keep_alive abgelaufen ist (blockiert alle Anfragen); liefert Ladezeit"""
+        load_s = 0.0
+        with self._load_lock:
+            if time.time() >= self._loaded_until:
+                load_s = float(self.config["load_time"])
+                time.sleep(load_s)
+                self.stats["model_loads"] += 1
+            ka = parse_keep_alive(keep_alive, float(self.config["keep_alive"]))
+            self._loaded_until = max(self._loaded_until, time.time() + ka)
+        return load_s
+
+    def prompt_eval(self, messages):
+        """
+        Prompt-Auswertung mit KV-Cache (ein Slot wie Ollama mit NUM_PARALLEL=1): nur der Teil
+        nach dem gemeinsamen Präfix mit dem vorherigen Prompt kostet Zeit.
+        Liefert (ausgewertete Tokens, Sekunden).
+        """
+        total = count_prompt_tokens(messages)
+        rate = float(self.config["prompt_rate"])
+        if rate <= 0:
+            return total, 0.0
+        text = "\n".join(str(m.get("content", "")) for m in messages)
+        with self._lock:
+            shared = len(os.path.commonprefix([self._last_prompt, text]))
+            self._last_prompt = text
+        evaluated = max(1, total - shared // 4)
+        return evaluated, evaluated / rate
+
+    def count(self, key: str):
+        with self._lock:
+            self.stats[key] += 1
+
+    def answer_for(self, messages, correct: bool) -> str:
+        ideal = self.answers.get(prompt_hash(messages), "return null;")
+        first = ideal if correct else "// TODO"
+        extra = ["    // weitere Zeile"] * int(self.config["extra_lines"])
+        return "\n".join([first] + extra)
+
+
+class MockHTTPServer(ThreadingHTTPServer):
+    daemon_threads = True
+    request_queue_size = 512  # Standard 5 führt bei hoher Parallelität zu SYN-Wiederholungen (1 s)
+
+
+class MockHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+    state = None  # wird in make_server gesetzt
+
+    def setup(self):
+        super().setup()
+        # Kleine Antworten sofort senden (kein Nagle/Delayed-ACK-Versatz von ~40 ms)
+        self.connection.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+
+    def log_message(self, *args):
+        pass
+
+    # ---------- Hilfen ----------
+    def _json(self, status: int, payload: dict, headers=None):
+        body = json.dumps(payload).encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        for k, v in (headers or {}).items():
+            self.send_header(k, v)
+        self.end_headers()
+        self.wfile.write(body)
+
+    def _start_chunked(self, content_type: str):
+        self.send_response(200)
+        self.send_header("Content-Type", content_type)
+        self.send_header("Transfer-Encoding", "chunked")
+        self.end_headers()
+
+    def _chunk(self, data: bytes):
+        self.wfile.write(b"%x\r\n%s\r\n" % (len(data), data))
+        self.wfile.flush()
+
+    def _end_chunked(self):
+        self.wfile.write(b"0\r\n\r\n")
+        self.wfile.flush()
+
+    def _fail(self, status: int, ollama: bool):
+        st = self.state
+        if status == 429:
+            msg = "Rate limit reached (mock)"
+            headers = {"Retry-After": str(st.config["retry_after"])}
+        else:
+            msg = "Internal server error (mock)"
+            headers = {}
+        if ollama:
+            self._json(status, {"error": msg}, headers)
+        else:
+            self._json(status, {"error": {"message": msg, "type": "mock_error", "code": status}}, headers)
+
+    # ---------- Routing ----------
+    def do_GET(self):
+        if self.path in ("/health", "/api/tags", "/v1/models"):
+            self._json(200, {"status": "ok", "stats": self.state.stats, "models": [], "data": []})
+        else:
+            self._json(404, {"error": "not found"})
+
+    def do_POST(self):
+        length = int(self.headers.get("Content-Length") or 0)
+        body = json.loads(self.rfile.read(length) or b"{}")
+        if self.path.rstrip("/").endswith("/chat/completions"):
+            self._chat(body, ollama=False)
+        elif self.path == "/api/chat":
+            self._chat(body, ollama=True)
+        else:
+            self._json(404, {"error": "not found"})
+
+    def _chat(self, body: dict, ollama: bool):
+        st = self.state
+        status, ttft, correct = st.draw()
+        if status != 200:
+            self._fail(status, ollama)
+            return
+
+        messages = body.get("messages") or []
+        model = body.get("model", "mock")
+        tokens = tokenize(st.answer_for(messages, correct))
+        prompt_tokens = count_prompt_tokens(messages)
+        delay = float(st.config["token_delay"])
+        t0 = time.time()
+        load_s = st.load_model(body.get("keep_alive"))
+        evaluated, prompt_s = st.prompt_eval(messages)
+        ttft += prompt_s
+
+        try:
+            if not body.get("stream"):
+                time.sleep(ttft + delay * (len(tokens) - 1))
+                text = "".join(tokens)
+                if ollama:
+                    self._json(200, self._ollama_final(model, text, evaluated, len(tokens), ttft, load_s, t0))
+                else:
+                    # Parameter n: weitere Antworten mit eigener Richtig/Falsch-Ziehung
+                    texts = [text] + [
+                        "".join(tokenize(st.answer_for(messages, st.draw_correct())))
+                        for _ in range(int(body.get("n") or 1) - 1)
+                    ]
+                    completion_tokens = sum(len(tokenize(t)) for t in texts)
+                    self._json(200, self._openai_full(model, texts, prompt_tokens, completion_tokens))
+                return
+
+            if ollama:
+                self._start_chunked("application/x-ndjson")
+            else:
+                self._start_chunked("text/event-stream")
+            time.sleep(ttft)
+            for i, tok in enumerate(tokens):
+                if i:
+                    time.sleep(delay)
+                if ollama:
+                    chunk = {"model": model, "message": {"role": "assistant", "content": tok}, "done": False}
+                    self._chunk((json.dumps(chunk) + "\n").encode("utf-8"))
+                else:
+                    self._chunk(self._sse(self._openai_chunk(model, {"content": tok}, None)))
+
+            if ollama:
+                final = self._ollama_final(model, "", evaluated, len(tokens), ttft, load_s, t0)
+                self._chunk((json.dumps(final) + "\n").encode("utf-8"))
+            else:
+                self._chunk(self._sse(self._openai_chunk(model, {}, "stop")))
+                opts = body.get("stream_options") or {}
+                if opts.get("include_usage"):
+                    usage_chunk = self._openai_chunk(model, None, None)
+                    usage_chunk["usage"] = self._usage(prompt_tokens, len(tokens))
+                    self._chunk(self._sse(usage_chunk))
+                self._chunk(b"data: [DONE]\n\n")
+            self._end_chunked()
+        except (BrokenPipeError, ConnectionResetError):
+            st.count("aborted")  # Client hat abgebrochen (z. B. Early-Stop)
+
+    # ---------- Antwortformate ----------
+    @staticmethod
+    def _usage(prompt_tokens: int, completion_tokens: int) -> dict:
+        return {
+            "prompt_tokens": prompt_tokens,
+            "completion_tokens": completion_tokens,
+            "total_tokens": prompt_tokens + completion_tokens,
+        }
+
+    def _openai_full(self, model, texts, prompt_tokens, completion_tokens) -> dict:
+        return {
+            "id": "chatcmpl-mock",
+            "object": "chat.completion",
+            "created": int(time.time()),
+            "model": model,
+            "choices": [
+                {"index": i, "message": {"role": "assistant", "content": text}, "finish_reason": "stop"}
+                for i, text in enumerate(texts)
+            ],
+            "usage": self._usage(prompt_tokens, completion_tokens),
+        }
+
+    @staticmethod
+    def _openai_chunk(model, delta, finish_reason) -> dict:
+        return {
+            "id": "chatcmpl-mock",
+            "object": "chat.completion.chunk",
+            "created": int(time.time()),
+            "model": model,
+            "choices": [] if delta is None else [{"index": 0, "delta": delta, "finish_reason": finish_reason}],
+        }
+
+    @staticmethod
+    def _sse(payload: dict) -> bytes:
+        return ("data: " + json.dumps(payload) + "\n\n").encode("utf-8")
+
+    @staticmethod
+    def _ollama_final(model, text, prompt_tokens, eval_count, ttft, load_s, t0) -> dict:
+        ns = 1_000_000_000
+        total = time.time() - t0
+        return {
+            "model": model,
+            "message": {"role": "assistant", "content": text},
+            "done": True,
+            "done_reason": "stop",
+            "total_duration": int(total * ns),
+            "load_duration": int(load_s * ns),
+            "prompt_eval_count": prompt_tokens,  # wie Ollama: nur nicht gecachte Tokens
+            "prompt_eval_duration": int(ttft * ns),
+            "eval_count": eval_count,
+            "eval_duration": int(max(0.0, total - load_s - ttft) * ns),
+        }
+
+
+def make_server(host: str = HOST, port: int = PORT, dataset: str = DATASET, **config) -> MockHTTPServer:
+    """Erzeugt einen Mock-Server (port=0: freier Port, siehe server.server_address)"""
+    state = MockState(config, load_answers(dataset))
+    handler = type("BoundMockHandler", (MockHandler,), {"state": state})
+    server = MockHTTPServer((host, port), handler)
+    server.state = state
+    return server
+
+
+def start_in_thread(**kwargs) -> MockHTTPServer:
+    """Startet den Mock-Server im Hintergrund-Thread (für Benchmarks); Stop via server.shutdown()"""
+    server = make_server(**kwargs)
+    threading.Thread(target=server.serve_forever, name="mock-server", daemon=True).start()
+    return server
+
+
+def free_port() -> int:
+    with socket.socket() as s:
+        s.bind((HOST, 0))
+        return s.getsockname()[1]
+
+
+def start_process(dataset: str = DATASET, port: int = None, **config):
+    """Startet den Mock-Server als Subprozess (konkurriert nicht um den GIL) -> (Prozess, URL)"""
+    port = port or free_port()
+    cmd = [sys.executable, os.path.abspath(__file__), "--port", str(port), "--dataset", dataset]
+    for k, v in config.items():
+        cmd += ["--" + k.replace("_", "-"), str(v)]
+    proc = subprocess.Popen(cmd, stdout=subprocess.DEVNULL)
+    url = f"http://{HOST}:{port}"
+    for _ in range(100):
+        try:
+            urlopen(url + "/health", timeout=1).read()
+            return proc, url
+        except OSError:
+            time.sleep(0.05)
+    proc.kill()
+    raise RuntimeError("Mock-Server startet nicht")
+
+
+def server_stats(url: str) -> dict:
+    """Zähler eines laufenden Mock-Servers (Anfragen, Fehler, 429 ...)"""
+    with urlopen(url + "/health", timeout=5) as r:
+        return json.load(r)["stats"]
+
+
+def main(argv=None):
+    ap = argparse.ArgumentParser(description="OpenAI-/Ollama-kompatibler Mock-Server für Harness-Tests")
+    ap.add_argument("--host", default=HOST)
+    ap.add_argument("--port", type=int, default=PORT)
+    ap.add_argument("--dataset", default=DATASET, help="Quelle für kanonische Antworten (`ideal`)")
+    ap.add_argument("--ttft", default=DEFAULTS["ttft"], help='z. B. "const:0.2", "uniform:0.1,0.5", "exp:1", "lognormal:0,0.5"')
+    ap.add_argument("--token-delay", type=float, default=DEFAULTS["token_delay"], help="Sekunden pro Token")
+    ap.add_argument("--accuracy", type=float, default=DEFAULTS["accuracy"])
+    ap.add_argument("--extra-lines", type=int, default=DEFAULTS["extra_lines"])
+    ap.add_argument("--error-rate", type=float, default=DEFAULTS["error_rate"])
+    ap.add_argument("--rate-limit-rate", type=float, default=DEFAULTS["rate_limit_rate"])
+    ap.add_argument("--retry-after", type=float, default=DEFAULTS["retry_after"])
+    ap.add_argument("--load-time", type=float, default=DEFAULTS["load_time"], help="Modell-Laden bei Kaltstart (Sekunden)")
+    ap.add_argument("--keep-alive", type=float, default=DEFAULTS["keep_alive"], help="Standard-Verweildauer des Modells (Sekunden)")
+    ap.add_argument("--prompt-rate", type=float, default=DEFAULTS["prompt_rate"], help="Prompt-Tokens/s ohne Cache (0 = aus)")
+    ap.add_argument("--seed", type=int, default=DEFAULTS["seed"])
+    args = ap.parse_args(argv)
+
+    config = {k: v for k, v in vars(args).items() if k not in ("host", "port", "dataset")}
+    server = make_server(args.host, args.port, args.dataset, **config)
+    print(f"Mock-Server läuft auf http://{args.host}:{args.port} (OpenAI: /v1, Ollama: /api/chat)")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+        print(f"Statistik: {server.state.stats}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,108 @@
+"""
+Ausgabe-Sink
+Gepufferter Einzel-Schreiber für CSV und JSONL (eigener Writer-Thread statt Öffnen/Schließen pro Aufgabe)
+"""
+
+import csv
+import json
+import queue
+import threading
+import time
+
+_STOP = object()
+
+
+class OutputSink:
+    """
+    Nimmt Ergebnisse von beliebig vielen Workern entgegen (put) und schreibt sie
+    aus einem einzigen Thread in CSV und JSONL. Dateien bleiben während des
+    Laufs geöffnet; geschrieben wird gebündelt, sobald `flush_rows` Ergebnisse
+    vorliegen, spätestens nach `flush_interval` Sekunden und beim Schließen.
+    """
+
+    def __init__(
+        self,
+        csv_path: str,
+        jsonl_path: str,
+        csv_row,
+        flush_rows: int = 64,
+        flush_interval: float = 1.0,
+    ):
+        self.csv_path = csv_path
+        self.jsonl_path = jsonl_path
+        self.csv_row = csv_row  # Funktion: Ergebnis -> CSV-Zeile (Liste)
+        self.flush_rows = flush_rows
+        self.flush_interval = flush_interval
+        self._queue = queue.Queue()
+        self._error = None
+        self._closed = False
+        self._thread = threading.Thread(
+            target=self._run, name="output-sink", daemon=True
+        )
+        self._thread.start()
+
+    def put(self, res: dict):
+        """Reiht ein Ergebnis zum Schreiben ein (nicht blockierend)"""
+        if self._error:
+            raise self._error
+        self._queue.put(res)
+
+    def close(self):
+        """Schreibt alle ausstehenden Ergebnisse und beendet den Writer-Thread"""
+        if not self._closed:
+            self._closed = True
+            self._queue.put(_STOP)
+            self._thread.join()
+        if self._error:
+            raise self._error
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def _run(self):
+        try:
+            with open(self.csv_path, "a", newline="", encoding="utf-8") as fcsv, open(
+                self.jsonl_path, "a", encoding="utf-8"
+            ) as flog:
+                w = csv.writer(fcsv)
+                batch = []
+                batch_start = 0.0
+                stop = False
+                while not stop:
+                    if batch:
+                        timeout = max(
+                            0.0, self.flush_interval - (time.time() - batch_start)
+                        )
+                    else:
+                        timeout = None
+                    try:
+                        item = self._queue.get(timeout=timeout)
+                        if item is _STOP:
+                            stop = True
+                        else:
+                            if not batch:
+                                batch_start = time.time()
+                            batch.append(item)
+                    except queue.Empty:
+                        pass
+
+                    if batch and (
+                        stop
+                        or len(batch) >= self.flush_rows
+                        or time.time() - batch_start >= self.flush_interval
+                    ):
+                        w.writerows(self.csv_row(res) for res in batch)
+                        flog.write(
+                            "".join(
+                                json.dumps(res, ensure_ascii=False) + "\n"
+                                for res in batch
+                            )
+                        )
+                        fcsv.flush()
+                        flog.flush()
+                        batch = []
+        except BaseException as e:
+            self._error = e
@@ -0,0 +1,302 @@
+"""
+Lauf-Planung
+Schätzt vor dem Start Laufzeit, Latenz und Kosten eines Laufs, ohne Anfragen zu senden:
+- Prompt-Tokens: Datensatz lokal tokenisiert (TOKENIZER des Testskripts, ggf. mit Kontext-Budget),
+  kalibriert um den Aufschlag der API (Chat-Template) aus früheren Läufen
+- Latenzmodell aus früheren *_details.jsonl desselben Modells: Latenz = a + b · Input-Tokens
+  + c · Output-Tokens (kleinste Quadrate, nicht-negativ); lokal mit den Server-Zeiten der
+  nativen API (ohne Warteschlange und Modell-Laden), sonst mit der gemessenen Latenz
+- Output-Tokens und Streuung (Verhältnis gemessen / Modell) empirisch aus denselben Läufen
+Die Simulation arbeitet die Anfragen in Datensatz-Reihenfolge mit CONCURRENCY offenen Anfragen
+und `slots` parallel rechnenden Server-Plätzen ab (lokal OLLAMA_NUM_PARALLEL je Host, Cloud
+unbegrenzt) und liefert Wanduhrzeit, Latenz-Perzentile und Kosten (Mittel und p95 über alle
+Simulationen). In der Cloud begrenzen zusätzlich RPM_LIMIT/TPM_LIMIT die Wanduhrzeit.
+
+    python plan_run.py --target local
+    python plan_run.py --target local --concurrency 1,2,4 --slots 2 --set MODEL=qwen2.5-coder:7b-instruct-q8_0
+    python run_cloud_test.py --plan --budget 1024
+"""
+
+import argparse, glob, heapq, json, os, time
+
+import numpy as np
+
+from context_budget import load_tokenizer, trim_record
+from dataset_loader import iter_items, load_index
+from details_store import expand, load_prompts, read_jsonl, store_path_for
+from latency_stats import percentile, summarize
+from telemetry import fmt_duration
+
+# ===================== KONFIGURATION =====================
+HISTORY_GLOBS = ("ergebnisse/*_details.jsonl", "*_details.jsonl", "sweep/*/*_details.jsonl")
+SIMULATIONS = 200      # Monte-Carlo-Durchläufe (Output-Tokens und Streuung neu gezogen)
+SEED = 42
+LOCAL_SLOTS = 1        # Parallel rechnende Plätze je Ollama-Host (OLLAMA_NUM_PARALLEL)
+MIN_HISTORY = 10       # Mindestanzahl Records für das Latenzmodell
+
+
+# ===================== VERLAUF =====================
+def prompt_text(messages) -> str:
+    return "\n".join(str(m.get("content", "")) for m in messages or [])
+
+
+def load_history(paths: list, count, model: str = None, backend: str = None) -> list:
+    """
+    Verwertbare Records früherer Läufe (ohne Fehler und Cache-Treffer; optional nur ein Modell
+    und ein Backend). Mock-Läufe tragen den echten Modellnamen, messen aber nur den Mock-Server
+    und werden immer übersprungen; ältere Records ohne Backend-Feld zählen für jedes Backend.
+    Ohne usage (ältere lokale Läufe) werden Prompt und Antwort lokal gezählt.
+    """
+    out = []
+    for path in paths:
+        prompts = load_prompts(store_path_for(path))
+        for rec in read_jsonl(path):
+            if rec.get("error") or rec.get("cache_hit") or not rec.get("latency_s"):
+                continue
+            if model and rec.get("model") != model:
+                continue
+            if rec.get("backend") == "mock" or (backend and rec.get("backend") not in (None, backend)):
+                continue
+            messages = expand(rec, prompts).get("messages")
+            usage = rec.get("usage") or {}
+            estimated = not usage.get("input_tokens")
+            if estimated:
+                if not messages or rec.get("output_full") is None:
+                    continue
+                usage = {"input_tokens": count(prompt_text(messages)), "output_tokens": count(rec["output_full"])}
+            timings = rec.get("ollama") or {}
+            service = timings.get("total_s", 0) - timings.get("load_s", 0)
+            out.append({
+                "input_tokens": int(usage["input_tokens"]),
+                "output_tokens": int(usage.get("output_tokens") or 0),
+                # Server-Zeit ohne Warteschlange/Laden (native API), sonst gemessene Latenz
+                "service_s": service if service > 0 else float(rec["latency_s"]),
+                "messages": None if estimated else messages,  # nur echte usage kalibriert den Aufschlag
+            })
+    return out
+
+
+def fit_latency(history: list) -> dict:
+    """Latenz = a + b · Input-Tokens + c · Output-Tokens, nicht-negativ (negative Terme entfallen)"""
+    x = np.array([[1.0, h["input_tokens"], h["output_tokens"]] for h in history])
+    y = np.array([h["service_s"] for h in history])
+    active = [0, 1, 2]
+    while True:
+        coef, *_ = np.linalg.lstsq(x[:, active], y, rcond=None)
+        if (coef >= 0).all() or len(active) == 1:
+            break
+        active = [a for a, c in zip(active, coef) if c >= 0] or [0]
+    full = np.zeros(3)
+    full[active] = np.clip(coef, 0, None)
+    pred = x @ full
+    ss_tot = float(((y - y.mean()) ** 2).sum())
+    return {
+        "base_s": round(float(full[0]), 4),
+        "s_per_1k_input_tokens": round(float(full[1]) * 1000, 4),
+        "s_per_output_token": round(float(full[2]), 5),
+        "r2": round(1 - float(((y - pred) ** 2).sum()) / ss_tot, 4) if ss_tot else None,
+        "n": len(history),
+        # Streuung als Verhältnis gemessen / Modell (multiplikativ, lange Anfragen streuen stärker)
+        "ratios": (y / np.maximum(pred, 1e-3)).tolist(),
+    }
+
+
+def predict(model: dict, input_tokens, output_tokens):
+    return model["base_s"] + model["s_per_1k_input_tokens"] / 1000 * input_tokens + model["s_per_output_token"] * output_tokens
+
+
+# ===================== DATENSATZ =====================
+def dataset_tokens(module, count) -> np.ndarray:
+    """Prompt-Tokens je Aufgabe (lokal gezählt, mit Kontext-Budget wie im Lauf)"""
+    offsets = load_index(module.DATASET)
+    out = np.empty(len(offsets))
+    for i, rec in iter_items(module.DATASET, offsets):
+        if module.CONTEXT_BUDGET:
+            rec = trim_record(rec, module.CONTEXT_BUDGET, count)
+        inp = rec.get("input")
+        messages = inp if isinstance(inp, list) else [{"role": "user", "content": str(inp)}]
+        out[i] = count(prompt_text(messages))
+    return out
+
+
+def template_overhead(history: list, count) -> float:
+    """Median (API-Input-Tokens - lokal gezählt) über Records mit bekanntem Prompt"""
+    diffs = [h["input_tokens"] - count(prompt_text(h["messages"])) for h in history if h["messages"]]
+    return float(np.median(diffs)) if diffs else 0.0
+
+
+# ===================== SIMULATION =====================
+def simulate(service: np.ndarray, concurrency: int, slots: int = None) -> tuple:
+    """
+    Anfragen in Reihenfolge, höchstens `concurrency` offen, `slots` Server-Plätze (FIFO).
+    Liefert (Wanduhrzeit, Latenzen inkl. Wartezeit am Server).
+    """
+    servers = [0.0] * min(concurrency, slots or concurrency)
+    in_flight = []  # Endzeiten offener Anfragen
+    latencies = np.empty(len(service))
+    end = 0.0
+    for i, s in enumerate(service):
+        admit = heapq.heappop(in_flight) if i >= concurrency else 0.0
+        start = max(admit, heapq.heappop(servers))
+        end = start + s
+        heapq.heappush(servers, end)
+        heapq.heappush(in_flight, end)
+        latencies[i] = end - admit
+    return (max(in_flight) if in_flight else 0.0), latencies
+
+
+def plan(module, concurrencies=None, slots=None, history_paths=None, any_model=False,
+         sims: int = SIMULATIONS, seed: int = SEED) -> dict:
+    """Plan für die aktuellen Einstellungen des Testskripts `module`"""
+    cloud = hasattr(module, "IN_PRICE_PER_1M")
+    t0 = time.perf_counter()
+    try:
+        count = load_tokenizer(module.TOKENIZER)
+        tokenizer = module.TOKENIZER
+    except (RuntimeError, ImportError, OSError) as e:
+        print(f"⚠️  {e} – zähle näherungsweise (approx)")
+        count, tokenizer = load_tokenizer("approx"), "approx"
+    prompt_tokens = dataset_tokens(module, count)
+
+    paths = history_paths or sorted({p for g in HISTORY_GLOBS for p in glob.glob(g)})
+    history = load_history(paths, count, None if any_model else module.MODEL, "cloud" if cloud else "local")
+    out = {
+        "model": module.MODEL,
+        "dataset": module.DATASET,
+        "items": len(prompt_tokens),
+        "tokenizer": tokenizer,
+        "context_budget": module.CONTEXT_BUDGET,
+        "history": {"files": paths, "records": len(history)},
+        "prompt_tokens_local": summarize(prompt_tokens.tolist()),
+    }
+    if len(history) < MIN_HISTORY:
+        out["error"] = f"Zu wenig frühere Records für {module.MODEL} ({len(history)} < {MIN_HISTORY}); --history oder --any-model"
+        return out
+
+    model = fit_latency(history)
+    overhead = template_overhead(history, count)
+    input_tokens = prompt_tokens + overhead
+    hist_out = np.array([h["output_tokens"] for h in history], dtype=float)
+    if getattr(module, "MAX_TOKENS", None):
+        hist_out = np.minimum(hist_out, module.MAX_TOKENS)
+    ratios = np.array(model.pop("ratios"))
+
+    # Stichproben: cloud mit n eine Anfrage (Output summiert), sonst je Stichprobe eine Anfrage
+    samples = getattr(module, "SAMPLES", 1)
+    n_api = cloud and samples > 1 and module.SAMPLE_N_API and not module.STREAM
+    per_item = 1 if n_api else samples
+    inputs = np.repeat(input_tokens, per_item)
+    out_draws = samples if n_api else 1
+    n_requests = len(inputs)
+
+    concurrencies = concurrencies or [module.CONCURRENCY]
+    if not cloud and slots is None:
+        slots = (1 + len(module.OLLAMA_HOSTS)) * LOCAL_SLOTS
+    rng = np.random.default_rng(seed)
+    runs = {c: {"wall": [], "lat": [], "cost": [], "out": []} for c in concurrencies}
+    for _ in range(sims):
+        outputs = rng.choice(hist_out, size=(n_requests, out_draws)).sum(axis=1)
+        service = predict(model, inputs, outputs) * rng.choice(ratios, size=n_requests)
+        cost = 0.0
+        if cloud:
+            cost = (inputs.sum() * module.IN_PRICE_PER_1M + outputs.sum() * module.OUT_PRICE_PER_1M) / 1e6
+        for c in concurrencies:
+            wall, lat = simulate(service, c, slots)
+            if cloud:
+                # Rate-Limits: Anfragen/min und Tokens/min (Prompt + Antwort) als Untergrenze
+                if module.RPM_LIMIT:
+                    wall = max(wall, n_requests / module.RPM_LIMIT * 60)
+                if module.TPM_LIMIT:
+                    wall = max(wall, (inputs.sum() + outputs.sum()) / module.TPM_LIMIT * 60)
+            runs[c]["wall"].append(wall)
+            runs[c]["lat"].append(percentile(sorted(lat), 95))
+            runs[c]["cost"].append(cost)
+            runs[c]["out"].append(outputs.sum())
+
+    out.update({
+        "latency_model": model,
+        "template_overhead_tokens": round(overhead, 1),
+        "requests": n_requests,
+        "slots": slots,
+        "simulations": sims,
+        "sum_input_tokens": int(inputs.sum()),
+        "plans": [
+            {
+                "concurrency": c,
+                "wall_time_s": {"mean": round(float(np.mean(r["wall"])), 1), "p95": round(percentile(sorted(r["wall"]), 95), 1)},
+                "latency_p95_s": {"mean": round(float(np.mean(r["lat"])), 3), "p95": round(percentile(sorted(r["lat"]), 95), 3)},
+                "sum_output_tokens": {"mean": round(float(np.mean(r["out"]))), "p95": round(percentile(sorted(r["out"]), 95))},
+                "est_cost_usd": {"mean": round(float(np.mean(r["cost"])), 4), "p95": round(percentile(sorted(r["cost"]), 95), 4)} if cloud else None,
+            }
+            for c, r in runs.items()
+        ],
+        "plan_time_s": round(time.perf_counter() - t0, 2),
+    })
+    return out
+
+
+# ===================== AUSGABE =====================
+def print_plan(p: dict):
+    print(f"=== Plan: {p['model']} auf {p['dataset']} ({p['items']} Aufgaben) ===")
+    tok = p["prompt_tokens_local"]
+    print(f"Prompt-Tokens ({p['tokenizer']}{', Budget ' + str(p['context_budget']) if p['context_budget'] else ''}): "
+          f"mean {tok['mean']:.0f}  p50 {tok['p50']:.0f}  p95 {tok['p95']:.0f}  max {tok['max']:.0f}")
+    print(f"Verlauf: {p['history']['records']} Records aus {len(p['history']['files'])} Datei(en)")
+    if "error" in p:
+        print(f"❌ {p['error']}")
+        return
+    m = p["latency_model"]
+    r2 = f"{m['r2']:.2f}" if m["r2"] is not None else "-"
+    print(f"Latenzmodell: {m['base_s']:.3f} s + {m['s_per_1k_input_tokens']:.3f} s / 1k Input-Tokens "
+          f"+ {m['s_per_output_token'] * 1000:.2f} ms / Output-Token  (R² {r2}, n={m['n']})")
+    print(f"API-Aufschlag je Prompt: {p['template_overhead_tokens']:+.0f} Tokens; "
+          f"Input gesamt {p['sum_input_tokens']:,} Tokens in {p['requests']} Anfragen"
+          + (f"; Server-Plätze {p['slots']}" if p["slots"] else ""))
+    print(f"\n{'Parallelität':>12}  {'Laufzeit (Mittel / p95)':>26}  {'Latenz p95':>11}  {'Output-Tokens':>14}  {'Kosten USD':>18}")
+    for row in p["plans"]:
+        wall = f"{fmt_duration(row['wall_time_s']['mean'])} / {fmt_duration(row['wall_time_s']['p95'])}"
+        cost = f"{row['est_cost_usd']['mean']:.2f} (p95 {row['est_cost_usd']['p95']:.2f})" if row["est_cost_usd"] else "-"
+        print(f"{row['concurrency']:>12}  {wall:>26}  {row['latency_p95_s']['mean']:>9.2f} s  "
+              f"{row['sum_output_tokens']['mean']:>14,}  {cost:>18}")
+
+
+def main(argv=None):
+    import run_cloud_test
+    import run_local_test
+
+    targets = {"cloud": run_cloud_test, "local": run_local_test}
+    ap = argparse.ArgumentParser(description="Laufzeit, Latenz und Kosten eines Laufs vorab schätzen")
+    ap.add_argument("--target", choices=sorted(targets), required=True)
+    ap.add_argument("--set", action="append", default=[], metavar="NAME=WERT", help="Konstante des Testskripts überschreiben")
+    ap.add_argument("--budget", type=int, default=None, help="Kontext-Budget wie beim Lauf")
+    ap.add_argument("--concurrency", default=None, help="Kommagetrennte Werte (Standard: CONCURRENCY des Skripts)")
+    ap.add_argument("--slots", type=int, default=None, help=f"Parallele Server-Plätze (lokal Standard: {LOCAL_SLOTS} je Host)")
+    ap.add_argument("--history", nargs="+", default=None, help="Frühere *_details.jsonl (Standard: " + ", ".join(HISTORY_GLOBS) + ")")
+    ap.add_argument("--any-model", action="store_true", help="Verlauf aller Modelle verwenden")
+    ap.add_argument("--sims", type=int, default=SIMULATIONS)
+    ap.add_argument("--seed", type=int, default=SEED)
+    ap.add_argument("--json", default=None, help="Plan zusätzlich als JSON speichern")
+    args = ap.parse_args(argv)
+
+    module = targets[args.target]
+    module.use_settings(args.set)
+    if args.budget:
+        module.CONTEXT_BUDGET = args.budget
+    concurrencies = [int(c) for c in args.concurrency.split(",")] if args.concurrency else None
+    run_plan(module, concurrencies, args.slots, args.history, args.any_model, args.sims, args.seed, args.json)
+
+
+def run_plan(module, concurrencies=None, slots=None, history=None, any_model=False,
+             sims: int = SIMULATIONS, seed: int = SEED, json_path: str = None):
+    """Plan berechnen, ausgeben und optional speichern (auch für --plan der Testskripte)"""
+    p = plan(module, concurrencies, slots, history, any_model, sims, seed)
+    print_plan(p)
+    if json_path:
+        with open(json_path, "w", encoding="utf-8") as f:
+            json.dump(p, f, ensure_ascii=False, indent=2)
+        print("Saved:", json_path)
+    return p
+
+
+if __name__ == "__main__":
+    main()
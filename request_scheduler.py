@@ -0,0 +1,227 @@
+"""
+Request-Scheduler
+Rate-Limit-bewusste Ausführung von API-Aufrufen: Token-Buckets für Anfragen/min und Tokens/min,
+Retry-After-Hinweise des Servers, exponentielles Backoff mit Jitter und Circuit Breaker
+"""
+
+import asyncio
+import random
+import time
+
+# HTTP-Status, bei denen ein erneuter Versuch nichts ändert
+NON_RETRYABLE_STATUS = {400, 401, 403, 404, 422}
+
+
+# ===================== FEHLERKLASSIFIKATION =====================
+def status_of(err) -> int:
+    """HTTP-Status eines API-Fehlers (OpenAI-SDK oder httpx), sonst None"""
+    status = getattr(err, "status_code", None)
+    if status is None:
+        status = getattr(getattr(err, "response", None), "status_code", None)
+    return status
+
+
+def classify_error(err) -> str:
+    """Ordnet einen Fehler ein: rate_limit, timeout, server, client, connection, other"""
+    status = status_of(err)
+    if status == 429:
+        return "rate_limit"
+    if status in NON_RETRYABLE_STATUS:
+        return "client"
+    if status is not None and status >= 500:
+        return "server"
+    name = type(err).__name__.lower()
+    if isinstance(err, asyncio.TimeoutError) or "timeout" in name:
+        return "timeout"
+    if "connect" in name or "transport" in name or isinstance(err, ConnectionError):
+        return "connection"
+    return "other"
+
+
+def retry_after_seconds(err):
+    """Vom Server vorgegebene Wartezeit (retry-after-ms / Retry-After in Sekunden), sonst None"""
+    headers = getattr(getattr(err, "response", None), "headers", None)
+    if not headers:
+        return None
+    try:
+        ms = headers.get("retry-after-ms")
+        if ms is not None:
+            return float(ms) / 1000.0
+        sec = headers.get("retry-after")
+        if sec is not None:
+            return float(sec)
+    except (TypeError, ValueError):
+        pass  # HTTP-Datumsformat wird nicht ausgewertet -> normales Backoff
+    return None
+
+
+# ===================== BAUSTEINE =====================
+class TokenBucket:
+    """Token-Bucket mit Nachfüllrate `per_minute`; Kapazität = eine Minute Budget"""
+
+    def __init__(self, per_minute: float):
+        self.rate = per_minute / 60.0
+        self.capacity = float(per_minute)
+        self.level = float(per_minute)
+        self.updated = time.monotonic()
+        self._lock = asyncio.Lock()
+
+    def _refill(self):
+        now = time.monotonic()
+        self.level = min(self.capacity, self.level + (now - self.updated) * self.rate)
+        self.updated = now
+
+    async def acquire(self, amount: float) -> float:
+        """Entnimmt `amount` (wartet bei Bedarf) und liefert die Wartezeit in Sekunden"""
+        amount = min(amount, self.capacity)
+        waited = 0.0
+        async with self._lock:  # FIFO: keine Anfrage wird dauerhaft überholt
+            while True:
+                self._refill()
+                if self.level >= amount:
+                    self.level -= amount
+                    return waited
+                delay = (amount - self.level) / self.rate
+                await asyncio.sleep(delay)
+                waited += delay
+
+    def adjust(self, delta: float):
+        """Korrigiert nachträglich (z. B. tatsächliche statt geschätzter Tokens; darf negativ werden)"""
+        self._refill()
+        self.level = min(self.capacity, self.level - delta)
+
+
+class CircuitBreaker:
+    """
+    Öffnet nach `threshold` aufeinanderfolgenden Fehlern für `reset_s` Sekunden:
+    alle Aufrufe warten dann, statt den Server weiter zu belasten.
+    """
+
+    def __init__(self, threshold: int = 8, reset_s: float = 30.0):
+        self.threshold = threshold
+        self.reset_s = reset_s
+        self.failures = 0
+        self.open_until = 0.0
+        self.opened = 0  # Anzahl Öffnungen (für Meta)
+
+    async def wait(self) -> float:
+        delay = self.open_until - time.monotonic()
+        if delay > 0:
+            await asyncio.sleep(delay)
+            return delay
+        return 0.0
+
+    def success(self):
+        self.failures = 0
+
+    def failure(self):
+        self.failures += 1
+        if self.threshold and self.failures >= self.threshold:
+            self.open_until = time.monotonic() + self.reset_s
+            self.failures = 0
+            self.opened += 1
+
+
+# ===================== SCHEDULER =====================
+class RequestScheduler:
+    """
+    Gemeinsamer Scheduler für alle parallelen Worker eines Laufs.
+    - rpm / tpm: Limits des Providers (0 = unbegrenzt)
+    - 429 mit Retry-After pausiert alle Worker, nicht nur den betroffenen
+    - Backoff: full jitter, min(max_delay, base_delay * 2^(Versuch-1))
+    """
+
+    def __init__(
+        self,
+        rpm: float = 0,
+        tpm: float = 0,
+        max_tries: int = 5,
+        base_delay: float = 1.0,
+        max_delay: float = 30.0,
+        breaker_threshold: int = 8,
+        breaker_reset_s: float = 30.0,
+    ):
+        self.requests = TokenBucket(rpm) if rpm else None
+        self.tokens = TokenBucket(tpm) if tpm else None
+        self.max_tries = max_tries
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+        self.breaker = CircuitBreaker(breaker_threshold, breaker_reset_s)
+        self.pause_until = 0.0
+        self._rng = random.Random()
+        self.totals = {"retries": 0, "backoff_s": 0.0, "throttle_s": 0.0, "rate_limited": 0}
+
+    def backoff(self, attempt: int, err) -> float:
+        """Wartezeit vor dem nächsten Versuch"""
+        hint = retry_after_seconds(err)
+        if hint is not None:
+            return hint + self._rng.uniform(0, 0.25 * max(hint, 1.0))
+        return self._rng.uniform(0, min(self.max_delay, self.base_delay * 2 ** (attempt - 1)))
+
+    async def _admit(self, est_tokens: int) -> float:
+        """Wartet auf Pause, Circuit Breaker und Token-Buckets; liefert die Wartezeit"""
+        waited = 0.0
+        pause = self.pause_until - time.monotonic()
+        if pause > 0:
+            await asyncio.sleep(pause)
+            waited += pause
+        waited += await self.breaker.wait()
+        if self.requests:
+            waited += await self.requests.acquire(1)
+        if self.tokens:
+            waited += await self.tokens.acquire(est_tokens)
+        return waited
+
+    async def call(self, fn, est_tokens: int = 0):
+        """
+        Führt `await fn()` mit Retries aus. Liefert (Ergebnis, Info) mit
+        retries, backoff_s, throttle_s und error_kinds. Nach dem letzten
+        Fehlversuch wird die Ausnahme mit Attribut `retry_info` weitergereicht.
+        """
+        info = {"retries": 0, "backoff_s": 0.0, "throttle_s": 0.0, "error_kinds": []}
+        for attempt in range(1, self.max_tries + 1):
+            info["throttle_s"] += await self._admit(est_tokens)
+            try:
+                result = await fn()
+            except Exception as e:
+                kind = classify_error(e)
+                info["error_kinds"].append(kind)
+                self.breaker.failure()
+                if kind == "client" or attempt == self.max_tries:
+                    self._finish(info)
+                    e.retry_info = info
+                    raise
+                delay = self.backoff(attempt, e)
+                if kind == "rate_limit":
+                    # Alle Worker pausieren, damit kein Fehlersturm entsteht
+                    self.totals["rate_limited"] += 1
+                    self.pause_until = max(self.pause_until, time.monotonic() + delay)
+                info["retries"] += 1
+                info["backoff_s"] += delay
+                await asyncio.sleep(delay)
+                continue
+
+            self.breaker.success()
+            if self.tokens:
+                usage = (result or {}).get("usage") if isinstance(result, dict) else None
+                if usage and usage.get("total_tokens"):
+                    self.tokens.adjust(usage["total_tokens"] - est_tokens)
+            self._finish(info)
+            return result, info
+
+    def _finish(self, info: dict):
+        info["backoff_s"] = round(info["backoff_s"], 3)
+        info["throttle_s"] = round(info["throttle_s"], 3)
+        self.totals["retries"] += info["retries"]
+        self.totals["backoff_s"] = round(self.totals["backoff_s"] + info["backoff_s"], 3)
+        self.totals["throttle_s"] = round(self.totals["throttle_s"] + info["throttle_s"], 3)
+
+    def summary(self) -> dict:
+        """Kennzahlen für die Meta-Datei"""
+        return {**self.totals, "circuit_breaker_opened": self.breaker.opened}
+
+
+def estimate_tokens(messages, expected_output: int = 0) -> int:
+    """Grobe Token-Schätzung für das TPM-Budget (~4 Zeichen pro Token)"""
+    chars = sum(len(str(m.get("content", ""))) for m in messages)
+    return chars // 4 + expected_output
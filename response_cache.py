@@ -0,0 +1,85 @@
+"""
+Antwort-Cache
+Persistenter, inhaltsadressierter Cache für Modellantworten mit größenbasierter LRU-Verdrängung
+"""
+
+import hashlib
+import json
+import os
+
+
+def cache_key(**params) -> str:
+    """Bildet einen stabilen Hash über Modell, Base-URL, Messages und Sampling-Parameter"""
+    raw = json.dumps(params, sort_keys=True, ensure_ascii=False, separators=(",", ":"))
+    return hashlib.sha256(raw.encode("utf-8")).hexdigest()
+
+
+class ResponseCache:
+    """
+    Speichert eine Antwort pro Schlüssel als JSON-Datei unter <root>/<ab>/<key>.json.
+    Die Änderungszeit einer Datei dient als LRU-Zeitstempel; wird `max_bytes`
+    überschritten, werden die am längsten nicht genutzten Einträge gelöscht.
+    """
+
+    def __init__(self, root: str, max_bytes: int):
+        self.root = root
+        self.max_bytes = int(max_bytes)
+        self.hits = 0
+        self.misses = 0
+        os.makedirs(root, exist_ok=True)
+        self._sizes = {}  # Pfad -> Dateigröße
+        for dirpath, _, filenames in os.walk(root):
+            for name in filenames:
+                if name.endswith(".json"):
+                    path = os.path.join(dirpath, name)
+                    self._sizes[path] = os.path.getsize(path)
+        self._total = sum(self._sizes.values())
+
+    def _path(self, key: str) -> str:
+        return os.path.join(self.root, key[:2], key + ".json")
+
+    def get(self, key: str):
+        """Liefert den gespeicherten Eintrag oder None"""
+        path = self._path(key)
+        try:
+            with open(path, "r", encoding="utf-8") as f:
+                value = json.load(f)
+        except (OSError, ValueError):
+            self.misses += 1
+            return None
+        os.utime(path)  # LRU: als zuletzt genutzt markieren
+        self.hits += 1
+        return value
+
+    def put(self, key: str, value: dict):
+        """Speichert einen Eintrag atomar und verdrängt ggf. alte Einträge"""
+        path = self._path(key)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        tmp = f"{path}.{os.getpid()}.tmp"  # je Prozess eigene Datei (parallele Läufe, gemeinsamer Cache)
+        with open(tmp, "w", encoding="utf-8") as f:
+            json.dump(value, f, ensure_ascii=False)
+        os.replace(tmp, path)
+
+        size = os.path.getsize(path)
+        self._total += size - self._sizes.get(path, 0)
+        self._sizes[path] = size
+        if self._total > self.max_bytes:
+            self._evict()
+
+    def _evict(self):
+        """Löscht die ältesten Einträge, bis der Cache wieder unter dem Limit liegt"""
+        entries = []
+        for path in self._sizes:
+            try:
+                entries.append((os.path.getmtime(path), path))
+            except OSError:
+                entries.append((0.0, path))
+        entries.sort()
+        for _, path in entries:
+            if self._total <= self.max_bytes:
+                break
+            try:
+                os.remove(path)
+            except OSError:
+                pass
+            self._total -= self._sizes.pop(path)
@@ -0,0 +1,89 @@
+"""
+Lauf-Journal
+Append-only Protokoll abgeschlossener Aufgaben (eine Zeile pro Aufgaben-ID) für absturzsichere Fortsetzung
+"""
+
+import json
+import os
+import time
+
+
+class RunJournal:
+    """
+    Jede abgeschlossene Aufgabe wird als JSON-Zeile angehängt, unabhängig von der
+    Reihenfolge. fsync erfolgt gebündelt (alle `fsync_every` Einträge bzw. nach
+    `fsync_interval` Sekunden). Eine beim Absturz abgeschnittene letzte Zeile
+    wird beim Laden ignoriert.
+    """
+
+    def __init__(self, path: str, fsync_every: int = 20, fsync_interval: float = 2.0):
+        self.path = path
+        self.fsync_every = fsync_every
+        self.fsync_interval = fsync_interval
+        self.records = {}  # Aufgaben-ID -> Ergebnis
+        self._load()
+        self._f = open(path, "a", encoding="utf-8")
+        self._unsynced = 0
+        self._last_sync = time.time()
+
+    def _load(self):
+        """Liest vorhandene Einträge; bei Mehrfacheinträgen gilt der letzte"""
+        if not os.path.exists(self.path):
+            return
+        with open(self.path, "rb") as f:
+            data = f.read()
+        for raw in data.split(b"\n"):
+            if not raw.strip():
+                continue
+            try:
+                rec = json.loads(raw)
+            except ValueError:
+                continue  # abgeschnittene Zeile nach Absturz
+            self.records[rec["id"]] = rec
+        if data and not data.endswith(b"\n"):
+            # Abgeschnittene Zeile abschließen, damit neue Einträge sauber beginnen
+            with open(self.path, "ab") as f:
+                f.write(b"\n")
+
+    def seed_from(self, details_path: str):
+        """Übernimmt Ergebnisse eines älteren Laufs ohne Journal (Details-JSONL)"""
+        if self.records or not os.path.exists(details_path):
+            return
+        with open(details_path, "r", encoding="utf-8") as f:
+            for line in f:
+                try:
+                    rec = json.loads(line)
+                except ValueError:
+                    continue
+                self.append(rec)
+        self.sync()
+
+    def is_done(self, item_id: int) -> bool:
+        return item_id in self.records
+
+    def append(self, rec: dict):
+        """Hängt ein Ergebnis an; fsync gebündelt"""
+        self._f.write(json.dumps(rec, ensure_ascii=False) + "\n")
+        self._f.flush()
+        self.records[rec["id"]] = rec
+        self._unsynced += 1
+        if (
+            self._unsynced >= self.fsync_every
+            or time.time() - self._last_sync >= self.fsync_interval
+        ):
+            self.sync()
+
+    def sync(self):
+        """Schreibt gepufferte Einträge dauerhaft auf die Platte"""
+        self._f.flush()
+        os.fsync(self._f.fileno())
+        self._unsynced = 0
+        self._last_sync = time.time()
+
+    def sorted_records(self):
+        """Alle Ergebnisse in Reihenfolge der Aufgaben-ID"""
+        return [self.records[k] for k in sorted(self.records)]
+
+    def close(self):
+        self.sync()
+        self._f.close()
@@ -0,0 +1,216 @@
+"""
+Lasttest-Skript
+Open-Loop-Lastgenerierung: Prompts aus repobench_200.jsonl werden mit vorgegebener Ankunftsrate
+gesendet (konstant oder Poisson), unabhängig davon, wann Antworten eintreffen.
+Ergebnis pro Laststufe: Durchsatz, Warteschlangenzeit und Latenz-Perzentile (Durchsatz-Latenz-Kurve)
+"""
+
+import argparse, asyncio, csv, itertools, json, random, time
+
+import run_cloud_test
+import run_local_test
+from dataset_loader import load_index, read_item
+from harness import snapshot
+from harness.schema import now_iso, prompt_messages
+from latency_stats import summarize
+
+# ===================== KONFIGURATION =====================
+DATASET = "repobench_200.jsonl"
+
+TARGET = "local"  # "local" (Ollama auf NUC) oder "cloud" (OpenAI)
+
+# Ankunftsprozess: "constant" (feste Abstände) oder "poisson" (exponentielle Abstände)
+ARRIVAL = "poisson"
+
+# Laststufen: Ankunftsrate (Anfragen/s) und max. gleichzeitige Anfragen je Stufe
+# (0 = unbegrenzt; Anfragen über dem Limit warten clientseitig -> Warteschlangenzeit)
+RATES = [0.01, 0.02, 0.05, 0.1]
+MAX_IN_FLIGHT = [1, 2, 4, 8]
+STEP_DURATION_S = 900  # Dauer jeder Stufe (Ankünfte), danach wird auf Abschluss gewartet
+
+SEED = 42  # Für reproduzierbare Poisson-Ankünfte
+STREAM = True  # Streaming für TTFT-Messung (Abbruch-Verhalten wie im jeweiligen Testskript)
+
+OUT_PREFIX = "load_{target}"  # -> load_local_curve.csv, load_local_meta.json, ...
+
+
+# ===================== HILFSFUNKTIONEN =====================
+def arrival_times(rate: float, duration: float, mode: str, rng: random.Random) -> list:
+    """Ankunftszeitpunkte (Sekunden ab Stufenbeginn) für eine Laststufe"""
+    times = []
+    t = 0.0
+    while True:
+        t += rng.expovariate(rate) if mode == "poisson" else 1.0 / rate
+        if t >= duration:
+            return times
+        times.append(t)
+
+
+def make_backend(target: str):
+    """Backend des Zielsystems (Konfiguration aus dem Testskript, Streaming wie STREAM)"""
+    if target == "cloud":
+        return run_cloud_test.make_backend(snapshot(run_cloud_test, STREAM=STREAM))
+    return run_local_test.make_backend(snapshot(run_local_test, STREAM=STREAM))
+
+
+# ===================== LASTSTUFE =====================
+async def run_step(step: int, rate: float, max_in_flight: int, args, call, offsets, counter, rng, log):
+    """Führt eine Laststufe aus und liefert deren Kennzahlen"""
+    arrivals = arrival_times(rate, args.step_duration, args.arrival, rng)
+    sem = asyncio.Semaphore(max_in_flight) if max_in_flight > 0 else None
+    results = []
+    t_start = time.monotonic()
+
+    async def one(arrival: float, item_idx: int):
+        messages = prompt_messages(read_item(DATASET, offsets, item_idx))
+        if sem:
+            await sem.acquire()
+        t0 = time.monotonic()
+        res = {
+            "step": step,
+            "item_idx": item_idx,
+            "arrival_s": round(arrival, 3),
+            "queue_delay_s": round(t0 - (t_start + arrival), 3),  # Wartezeit vor dem Senden
+            "ts_utc": now_iso(),
+            "error": "",
+        }
+        try:
+            out = await call(messages)
+            res["ttft_s"] = out["ttft_s"]
+            res["output_tokens"] = (out["usage"] or {}).get("completion_tokens") or out["chunks"]
+            res["finish_reason"] = out["finish_reason"]
+        except Exception as e:
+            res["error"] = str(e)
+        finally:
+            if sem:
+                sem.release()
+        res["latency_s"] = round(time.monotonic() - t0, 3)
+        res["done_s"] = round(time.monotonic() - t_start, 3)
+        results.append(res)
+        log.write(json.dumps(res, ensure_ascii=False) + "\n")
+
+    # Open Loop: Ankünfte nach Fahrplan, unabhängig von offenen Antworten
+    tasks = []
+    for arrival in arrivals:
+        delay = t_start + arrival - time.monotonic()
+        if delay > 0:
+            await asyncio.sleep(delay)
+        tasks.append(asyncio.ensure_future(one(arrival, next(counter) % len(offsets))))
+    await asyncio.gather(*tasks)
+
+    wall = max([r["done_s"] for r in results] + [args.step_duration])
+    ok = [r for r in results if not r["error"]]
+    return {
+        "step": step,
+        "arrival": args.arrival,
+        "offered_rps": rate,
+        "max_in_flight": max_in_flight,
+        "sent": len(results),
+        "ok": len(ok),
+        "errors": len(results) - len(ok),
+        "wall_s": round(wall, 2),
+        "throughput_rps": round(len(ok) / wall, 4) if wall else 0.0,
+        "output_tokens_per_s": round(sum(r["output_tokens"] for r in ok) / wall, 2) if wall else 0.0,
+        "queue_delay_s": summarize(r["queue_delay_s"] for r in results),
+        "latency_s": summarize(r["latency_s"] for r in ok),
+        "ttft_s": summarize(r["ttft_s"] for r in ok),
+    }
+
+
+def expand(values: list, n: int) -> list:
+    """Einzelwert auf n Stufen erweitern"""
+    return values * n if len(values) == 1 else values
+
+
+# ===================== HAUPTFUNKTION =====================
+async def run(args):
+    """Führt alle Laststufen nacheinander aus und schreibt Kurve und Details"""
+    rates = args.rates
+    limits = expand(args.max_in_flight, len(rates))
+    rates = expand(rates, len(limits))
+    if len(rates) != len(limits):
+        raise SystemExit("--rates und --max-in-flight brauchen gleich viele Werte (oder einen)")
+
+    prefix = OUT_PREFIX.format(target=args.target)
+    out_csv, out_meta, out_jsonl = f"{prefix}_curve.csv", f"{prefix}_meta.json", f"{prefix}_requests.jsonl"
+
+    backend = make_backend(args.target)
+    info = {"model": backend.model, **backend.record_fields()}
+    offsets = load_index(DATASET)
+    rng = random.Random(args.seed)
+    counter = itertools.count()  # Prompts zyklisch in Datensatz-Reihenfolge
+    print(f"Lasttest: {info['model']} @ {info['base_url']} ({args.arrival}, {len(rates)} Stufen à {args.step_duration}s)")
+
+    steps = []
+    try:
+        await backend.start()
+        with open(out_jsonl, "w", encoding="utf-8") as log:
+            for step, (rate, limit) in enumerate(zip(rates, limits), start=1):
+                s = await run_step(step, rate, limit, args, backend.request, offsets, counter, rng, log)
+                steps.append(s)
+                print(
+                    f"Stufe {step}: {rate}/s (max {limit or '∞'}) -> {s['throughput_rps']}/s, "
+                    f"p95={s['latency_s'].get('p95')}s, Warteschlange p95={s['queue_delay_s'].get('p95')}s, "
+                    f"Fehler={s['errors']}"
+                )
+    finally:
+        await backend.stop()
+
+    # Durchsatz-Latenz-Kurve (eine Zeile pro Laststufe)
+    with open(out_csv, "w", newline="", encoding="utf-8") as f:
+        w = csv.writer(f)
+        w.writerow([
+            "step", "arrival", "offered_rps", "max_in_flight", "sent", "ok", "errors",
+            "throughput_rps", "output_tokens_per_s", "queue_p50_s", "queue_p95_s",
+            "latency_p50_s", "latency_p95_s", "latency_p99_s", "ttft_p50_s", "ttft_p95_s",
+        ])
+        for s in steps:
+            w.writerow([
+                s["step"], s["arrival"], s["offered_rps"], s["max_in_flight"], s["sent"], s["ok"],
+                s["errors"], s["throughput_rps"], s["output_tokens_per_s"],
+                s["queue_delay_s"].get("p50"), s["queue_delay_s"].get("p95"),
+                s["latency_s"].get("p50"), s["latency_s"].get("p95"), s["latency_s"].get("p99"),
+                s["ttft_s"].get("p50"), s["ttft_s"].get("p95"),
+            ])
+
+    meta = {
+        "target": args.target,
+        **info,
+        "dataset": DATASET,
+        "arrival": args.arrival,
+        "step_duration_s": args.step_duration,
+        "seed": args.seed,
+        "stream": STREAM,
+        "steps": steps,
+    }
+    with open(out_meta, "w", encoding="utf-8") as fmeta:
+        json.dump(meta, fmeta, ensure_ascii=False, indent=2)
+
+    print("\n✅ LOAD TEST FINISHED")
+    print("Saved:")
+    print(" -", out_csv)
+    print(" -", out_jsonl)
+    print(" -", out_meta)
+
+
+def parse_args(argv=None):
+    ap = argparse.ArgumentParser(description="Open-Loop-Lasttest gegen Cloud- oder On-Premise-Endpunkt")
+    ap.add_argument("--target", choices=("local", "cloud"), default=TARGET)
+    ap.add_argument("--arrival", choices=("constant", "poisson"), default=ARRIVAL)
+    ap.add_argument("--rates", default=",".join(map(str, RATES)), help="Anfragen/s je Stufe, kommagetrennt")
+    ap.add_argument("--max-in-flight", default=",".join(map(str, MAX_IN_FLIGHT)), help="Parallelität je Stufe (0 = unbegrenzt)")
+    ap.add_argument("--step-duration", type=float, default=STEP_DURATION_S, help="Sekunden pro Stufe")
+    ap.add_argument("--seed", type=int, default=SEED)
+    args = ap.parse_args(argv)
+    args.rates = [float(x) for x in args.rates.split(",")]
+    args.max_in_flight = [int(x) for x in args.max_in_flight.split(",")]
+    return args
+
+
+def main(argv=None):
+    """Einstiegspunkt: startet den Lasttest"""
+    asyncio.run(run(parse_args(argv)))
+
+
+if __name__ == "__main__":
+    main()
@@ -3,9 +3,11 @@ Lokales Testskript
 Evaluierung von Qwen2.5-Coder 7B (On-Premise) für Code-Vervollständigung
 """
 
-import json, time, csv, os
-from datetime import datetime
-from openai import OpenAI
+import argparse, asyncio, sys
+
+import harness
+from harness import OllamaBackend
+from scoring import DEFAULT_METRICS
 
 # ===================== KONFIGURATION =====================
 DATASET = "repobench_200.jsonl"          # Gleicher Benchmark wie Cloud-Test
@@ -14,217 +16,147 @@ DATASET = "repobench_200.jsonl"          # Gleicher Benchmark wie Cloud-Test
 BASE_URL = "http://nuc-ai:11434/v1"      # Lokaler Ollama-Server
 MODEL = "qwen2.5-coder:7b-instruct-q4_K_M"  # Lokales Code-Modell
 
+# Native Ollama-API (/api/chat) statt OpenAI-kompatibel: liefert zusätzlich
+# Token-Zahlen sowie Prompt-Eval- und Eval-Dauern des Servers
+OLLAMA_NATIVE_API = True
+OLLAMA_URL = "http://nuc-ai:11434"       # Basis-URL der nativen API
+
+# Host-Pool: weitere Inferenz-Hosts mit demselben Modell (zusätzlich zu OLLAMA_URL)
+OLLAMA_HOSTS = []                        # z. B. ["http://nuc-ai-2:11434", "http://nuc-ai-3:11434"]
+ROUTING = "least_outstanding"            # oder "latency" (kleinste erwartete Wartezeit)
+PER_HOST_CONCURRENCY = 0                 # Max. offene Anfragen je Host (0 = unbegrenzt)
+HEALTH_CHECK_S = 30                      # Health-Check-Intervall; gedrainte Hosts kommen so zurück
+HOST_WAIT_S = 120                        # Max. Wartezeit auf einen freien Host, dann Fehler (0 = unbegrenzt)
+
 # Ausgabedateien für On-Premise-Ergebnisse
 OUT_CSV = "local_qwen25coder7b_results.csv"      # Tabellarische Ergebnisse
 OUT_JSONL = "local_qwen25coder7b_details.jsonl"  # Detaillierte Protokolle
 OUT_META = "local_qwen25coder7b_run_meta.json"   # Aggregierte Metriken
-
-# ===================== HILFSFUNKTIONEN =====================
-def now_iso():
-    """Gibt aktuellen UTC-Zeitstempel im ISO-Format zurück"""
-    return datetime.utcnow().isoformat() + "Z"
-
-def normalize_line(s: str) -> str:
-    """Entfernt Zeilenumbrüche am Ende, behält Einrückung bei"""
-    return (s or "").rstrip("\r\n")
-
-def norm_for_eval(s: str) -> str:
-    """Normalisiert Whitespace für fairen Code-Vergleich (RQ1)"""
-    return normalize_line(s).expandtabs(4).strip()
-
-def first_nonempty_line(text: str) -> str:
-    """Findet erste nicht-leere Zeile in Modellantwort"""
-    text = (text or "").replace("\r\n", "\n").replace("\r", "\n")
-    for line in text.split("\n"):
-        if line.strip() != "":
-            return line
-    return ""
-
-def ensure_header(csv_path: str):
-    """Erstellt CSV-Datei mit Kopfzeile für On-Premise-Metriken"""
-    if not os.path.exists(csv_path):
-        with open(csv_path, "w", newline="", encoding="utf-8") as f:
-            w = csv.writer(f)
-            w.writerow([
-                "id",                  # Aufgaben-ID
-                "exact_correct",       # RQ1: Exakte Zeichen-Übereinstimmung
-                "strict_correct",      # RQ1: Exakte Übereinstimmung (normalisiert)
-                "contains_correct",    # RQ1: Inhaltliche Übereinstimmung
-                "latency_s",           # RQ2: Antwortzeit (kritisch für On-Premise)
-                "finish_reason",       # API-Abschlussgrund
-                "error"                # Fehlermeldung
-            ])
-
-def count_done(csv_path: str) -> int:
-    """Zählt bereits verarbeitete Aufgaben für Fortsetzung"""
-    if not os.path.exists(csv_path):
-        return 0
-    with open(csv_path, "r", encoding="utf-8") as f:
-        return max(0, sum(1 for _ in f) - 1)
-
-def call_with_retry(client, messages, max_tries=5):
-    """Retry-Mechanismus für lokale Ollama-API (kürzere Timeouts)"""
-    last_err = None
-    for attempt in range(1, max_tries + 1):
-        try:
-            # temperature=0 für deterministische Ergebnisse (On-Premise-Vorteil)
-            return client.chat.completions.create(
-                model=MODEL,
-                messages=messages,
-                temperature=0 
-            )
-        except Exception as e:
-            last_err = e
-            time.sleep(min(5, 1.2 * attempt))  
-    raise last_err
+OUT_JOURNAL = "local_qwen25coder7b_journal.jsonl"  # Absturzsicheres Lauf-Journal
+OUT_PROMPTS = "local_qwen25coder7b_prompts.jsonl"  # Prompt-Store (Details verweisen per Hash)
+
+# Details-Format: "compact" = Prompt nur als "prompt_hash" (Prompts einmalig in OUT_PROMPTS),
+# "full" = vollständige Messages in jeder Details-Zeile
+DETAILS_FORMAT = "compact"
+
+# Sharding: "k/N" bearbeitet nur jede N-te Aufgabe (IDs k, k+N, ...) in eigene
+# Ausgabedateien (*.shard-k-of-N.*); zusammenführen mit merge_shards.py
+SHARD = None
+
+# Kontext-Budget: Prompts vor dem Senden auf CONTEXT_BUDGET Tokens kürzen (None = ungekürzt);
+# Ausgabedateien erhalten das Suffix .budget-<N> (Vergleich Latenz/Genauigkeit je Budget)
+CONTEXT_BUDGET = None
+TOKENIZER = "hf:Qwen/Qwen2.5-Coder-7B-Instruct"  # Lokale Token-Zählung: approx | tiktoken:<enc> | hf:<modell>
+
+# Parallelität: max. gleichzeitige Anfragen an Ollama (über alle Hosts)
+# (sinnvoll nur bis OLLAMA_NUM_PARALLEL × Anzahl Hosts; 1 = sequenziell wie bisher)
+CONCURRENCY = 4
+
+# Zusätzliche Qualitätsmetriken (scoring.py), pro Aufgabe unter "scores"
+SCORES = DEFAULT_METRICS
+
+# Streaming: Generierung nach erster nicht-leerer Zeile abbrechen (senkt Latenz)
+STREAM = False
+EXTRA_LINES = 0   # Zusätzliche Zeilen nach der ersten (für Contains-Scoring)
+
+# Mehrfach-Stichproben für pass@k: SAMPLES parallele Anfragen je Aufgabe (1 = aus; Ollama
+# unterstützt kein n), jede wie die Hauptantwort bewertet; mit SAMPLE_TEMPERATURE statt 0
+SAMPLES = 1
+PASS_K = (1, 5, 10)
+SAMPLE_TEMPERATURE = 0.8
+
+# Sampling: TEMPERATURE 0 für deterministische Ergebnisse (On-Premise-Vorteil);
+# MAX_TOKENS begrenzt die Antwortlänge (num_predict bzw. max_tokens, None = Server-Standard)
+TEMPERATURE = 0
+MAX_TOKENS = None
+
+# Antwort-Cache: spart bei reinen Scoring-Änderungen den kompletten Neulauf
+USE_CACHE = True
+CACHE_DIR = ".cache/responses"
+CACHE_MAX_MB = 512  # Größenlimit, danach LRU-Verdrängung
+
+# Retry-Verhalten (lokal ohne Rate-Limits; Ollama meldet volle Warteschlange mit 503)
+MAX_TRIES = 5
+BACKOFF_BASE_S = 1.0   # Exponentielles Backoff mit Jitter: bis BASE * 2^(Versuch-1)
+BACKOFF_MAX_S = 10.0
+
+# Hedged Requests: Duplikat senden, wenn eine Anfrage länger als das
+# HEDGE_PERCENTILE-Perzentil der bisherigen Latenzen läuft; erste Antwort gewinnt
+# (sinnvoll mit mehreren Hosts: das Duplikat wird wie jede Anfrage über den Host-Pool
+# geroutet, sonst konkurriert es um dieselbe GPU)
+HEDGE = False
+HEDGE_PERCENTILE = 95
+HEDGE_MAX_RATIO = 0.1   # Höchstens 10 % zusätzliche Anfragen
+
+# Reihenfolge: "file" (Datensatz-Reihenfolge) oder "prefix" (Aufgaben mit gemeinsamem
+# Prompt-Präfix, z. B. gleichem Import-Block, direkt nacheinander -> Ollama kann den
+# KV-Cache des vorherigen Prompts wiederverwenden)
+ORDER = "file"
+
+# Warm-up: ungezählte Anfrage je Host vor dem Lauf (lädt das Modell, füllt den Prompt-Cache)
+WARMUP = True
+KEEP_ALIVE = "30m"      # Modell so lange im Speicher halten (native API, jede Anfrage)
+COLD_LOAD_S = 0.5       # Aufgaben mit längerer Modell-Ladezeit gelten als Kaltstart
+
+# Live-Telemetrie: Prometheus-Endpunkt http://localhost:METRICS_PORT/metrics (None = aus);
+# die Fortschrittszeile zeigt unabhängig davon Durchsatz, Fehlerquote und ETA
+METRICS_PORT = None     # z. B. 9108
+
+# ===================== BACKEND =====================
+def make_backend(cfg=None, cls=OllamaBackend, **kwargs) -> OllamaBackend:
+    """Ollama-Backend aus den Konstanten (cfg: dieses Modul oder eine Kopie, siehe harness.snapshot)"""
+    cfg = cfg or sys.modules[__name__]
+    return cls(model=cfg.MODEL, url=cfg.OLLAMA_URL, hosts=cfg.OLLAMA_HOSTS, native=cfg.OLLAMA_NATIVE_API,
+               base_url=cfg.BASE_URL, stream=cfg.STREAM, extra_lines=cfg.EXTRA_LINES,
+               temperature=cfg.TEMPERATURE, sample_temperature=cfg.SAMPLE_TEMPERATURE,
+               max_tokens=cfg.MAX_TOKENS, keep_alive=cfg.KEEP_ALIVE, routing=cfg.ROUTING,
+               per_host_concurrency=cfg.PER_HOST_CONCURRENCY, health_check_s=cfg.HEALTH_CHECK_S,
+               host_wait_s=cfg.HOST_WAIT_S, **kwargs)
+
+def rebuild_outputs(records: list):
+    """Erzeugt CSV und JSONL neu aus dem Journal (konsistent, nach ID sortiert)"""
+    harness.rebuild_outputs(sys.modules[__name__], records)
+
+def aggregate(records: list) -> dict:
+    """Berechnet aggregierte Metriken aus allen abgeschlossenen Aufgaben"""
+    return harness.aggregate(records, PASS_K)
 
 # ===================== HAUPTFUNKTION =====================
-def main():
-    """Hauptfunktion für On-Premise-KI-Evaluation"""
-    
-    # Ollama-Client initialisieren (kein echter API-Key benötigt)
-    client = OpenAI(base_url=BASE_URL, api_key="ollama")
-    
-    # Vorbereitung: CSV-Header und Fortsetzungslogik
-    ensure_header(OUT_CSV)
-    done = count_done(OUT_CSV)
-    print(f"Lokaler Test: {MODEL} @ {BASE_URL}")
-    print(f"Fortsetzen bei Aufgabe {done+1} (bereits: {done})")
-
-    # Datensatz laden (200 Aufgaben)
-    with open(DATASET, "r", encoding="utf-8") as f:
-        lines = f.readlines()
-
-    total = len(lines)
-    start_epoch = int(time.time())
-    start_total = time.time()
-    
-    # Metriken-Initialisierung für On-Premise
-    exact_ok = 0          # RQ1: Exakte Zeichen-Übereinstimmung (zusätzliche Metrik)
-    strict_ok = 0         # RQ1: Exakte Übereinstimmungen (normalisiert)
-    contains_ok = 0       # RQ1: Inhaltliche Übereinstimmungen
-    sum_latency = 0.0     # RQ2: Latenz-Summe (besonders relevant für On-Premise)
-
-    # Hauptschleife: Verarbeitung aller Aufgaben
-    for i in range(done, total):
-        rec = json.loads(lines[i])
-        item_id = i + 1
-
-        # Prompt vorbereiten
-        inp = rec.get("input")
-        if isinstance(inp, list):
-            messages = inp
-        else:
-            messages = [{"role": "user", "content": str(inp)}]
-
-        # Ground Truth extrahieren und normalisieren
-        ideal_raw = normalize_line(rec.get("ideal", ""))
-        ideal_eval = norm_for_eval(ideal_raw)
-
-        # Lokaler API-Aufruf mit Zeitmessung (RQ2)
-        t0 = time.time()
-        output_text = ""
-        finish_reason = ""
-        error_msg = ""
-
-        try:
-            resp = call_with_retry(client, messages)
-            output_text = (resp.choices[0].message.content or "")
-            finish_reason = getattr(resp.choices[0], "finish_reason", "") or ""
-        except Exception as e:
-            error_msg = str(e)
-
-        # Latenz berechnen (RQ2: kritisch für On-Premise-Performance)
-        latency = round(time.time() - t0, 2)
-        sum_latency += latency
-
-        # ========== EVALUIERUNG (RQ1: QUALITÄT) ==========
-        # Erste nicht-leere Zeile extrahieren
-        out_first_raw = normalize_line(first_nonempty_line(output_text))
-        out_first_eval = norm_for_eval(out_first_raw)
-
-        # Drei Accuracy-Metriken für tiefgehende On-Premise-Analyse:
-        exact_correct = (out_first_raw == ideal_raw)      # Exakte Zeichen-Übereinstimmung
-        strict_correct = (out_first_eval == ideal_eval)   # Normalisierte Übereinstimmung
-        
-        out_lines = (output_text or "").replace("\r\n", "\n").replace("\r", "\n").split("\n")
-        contains_correct = any(
-            norm_for_eval(line) == ideal_eval
-            for line in out_lines
-            if line.strip() != ""
-        )
-
-        # Metriken aktualisieren
-        if exact_correct:
-            exact_ok += 1
-        if strict_correct:
-            strict_ok += 1
-        if contains_correct:
-            contains_ok += 1
-
-        # ========== ERGEBNISSPEICHERUNG ==========
-        # 1. CSV: Tabellarische Metriken pro Aufgabe
-        with open(OUT_CSV, "a", newline="", encoding="utf-8") as fcsv:
-            w = csv.writer(fcsv)
-            w.writerow([
-                item_id,
-                exact_correct,
-                strict_correct,
-                contains_correct,
-                latency,
-                finish_reason,
-                error_msg
-            ])
-
-        # 2. JSONL: Detaillierte Protokolle für On-Premise-Analyse
-        with open(OUT_JSONL, "a", encoding="utf-8") as flog:
-            flog.write(json.dumps({
-                "id": item_id,
-                "ts_utc": now_iso(),
-                "model": MODEL,
-                "base_url": BASE_URL,           # Wichtig: Lokale Infrastruktur
-                "messages": messages,
-                "ideal": ideal_raw,
-                "ideal_norm": ideal_eval,
-                "output_full": output_text,
-                "output_first_line": out_first_raw,
-                "output_first_line_norm": out_first_eval,
-                "exact_correct": exact_correct,      # Zusätzliche On-Premise-Metrik
-                "strict_correct": strict_correct,
-                "contains_correct": contains_correct,
-                "latency_s": latency,                # Besonders wichtig für On-Premise
-                "finish_reason": finish_reason,
-                "error": error_msg
-            }, ensure_ascii=False) + "\n")
-
-        # Fortschrittsausgabe mit allen drei Accuracy-Metriken
-        print(f"{item_id}/{total} exact={exact_correct} strict={strict_correct} contains={contains_correct} time={latency}s")
-
-    end_epoch = int(time.time())
-    total_time = round(time.time() - start_total, 2)
-
-    meta = {
-        "model": MODEL,
-        "base_url": BASE_URL,
-        "dataset": DATASET,
-        "items": total,
-        "start_epoch": start_epoch,
-        "end_epoch": end_epoch,
-        "total_time_s": total_time,
-        "exact_accuracy": exact_ok / total if total else 0.0,
-        "strict_accuracy": strict_ok / total if total else 0.0,
-        "contains_accuracy": contains_ok / total if total else 0.0,
-        "avg_latency_s": (sum_latency / total) if total else 0.0
-    }
-
-    with open(OUT_META, "w", encoding="utf-8") as fmeta:
-        json.dump(meta, fmeta, ensure_ascii=False, indent=2)
-
-    print("\n✅ LOCAL FINISHED")
-    print("Saved:")
-    print(" -", OUT_CSV)
-    print(" -", OUT_JSONL)
-    print(" -", OUT_META)
+async def run():
+    """Hauptfunktion für On-Premise-KI-Evaluation (Ablauf siehe harness/engine.py)"""
+    return await harness.run_benchmark(sys.modules[__name__], make_backend())
+
+def use_shard(spec: str):
+    """Nur Shard k/N bearbeiten; Ausgabedateien erhalten das Suffix .shard-k-of-N"""
+    harness.apply_shard(sys.modules[__name__], spec)
+
+def use_budget(budget: int):
+    """Prompts auf `budget` Tokens kürzen; Ausgabedateien erhalten das Suffix .budget-<N>"""
+    harness.apply_budget(sys.modules[__name__], budget)
+
+def use_settings(specs: list):
+    """Konstanten überschreiben, je "NAME=WERT" (WERT als JSON, sonst als Text), z. B. aus sweep.py"""
+    harness.apply_settings(sys.modules[__name__], specs)
+
+def main(argv=None):
+    """Einstiegspunkt: startet die asynchrone Evaluation"""
+    ap = argparse.ArgumentParser(description="On-Premise-Evaluation (RepoBench Java)")
+    ap.add_argument("--shard", default=SHARD, help="Nur Shard k/N bearbeiten, z. B. 2/4")
+    ap.add_argument("--budget", type=int, default=None, help="Prompt auf N Tokens kürzen")
+    ap.add_argument("--set", action="append", default=[], metavar="NAME=WERT",
+                    help="Konstante überschreiben, z. B. --set MODEL=qwen2.5-coder:7b-instruct-q8_0 --set MAX_TOKENS=64")
+    ap.add_argument("--plan", action="store_true", help="Nur Laufzeit/Latenz schätzen (plan_run.py), nichts senden")
+    args = ap.parse_args(argv)
+    use_settings(args.set)
+    if args.budget or CONTEXT_BUDGET:
+        use_budget(args.budget or CONTEXT_BUDGET)
+    if args.shard or SHARD:
+        use_shard(args.shard or SHARD)
+    if args.plan:
+        import plan_run
+        plan_run.run_plan(sys.modules[__name__])
+        return
+    asyncio.run(run())
 
 if __name__ == "__main__":
     main()
\ No newline at end of file
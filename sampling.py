@@ -0,0 +1,144 @@
+"""
+Mehrfach-Stichproben (pass@k)
+Mehrere Antworten je Aufgabe: eine Anfrage mit n Antworten (wo das Backend `n` unterstützt)
+oder parallele Einzelanfragen. Jede Stichprobe wird wie die Hauptantwort bewertet
+(erste nicht-leere Zeile bzw. irgendeine Zeile nach Normalisierung); pass@k wird mit dem
+erwartungstreuen Schätzer 1 - C(n-c, k) / C(n, k) berechnet (Chen et al., 2021).
+"""
+
+import asyncio
+import math
+import time
+
+from latency_stats import summarize
+from scoring import norm_line, output_lines
+
+JUDGES = ("strict", "contains")
+
+
+def pass_at_k(n: int, c: int, k: int) -> float:
+    """Wahrscheinlichkeit, dass unter k aus n Stichproben (c davon richtig) mindestens eine richtig ist"""
+    if k > n:
+        return None
+    if n - c < k:
+        return 1.0
+    return 1.0 - math.comb(n - c, k) / math.comb(n, k)
+
+
+def judge(ideal: str, text: str) -> dict:
+    """strict/contains wie in den Benchmark-Skripten (gleiche Normalisierung)"""
+    target = norm_line(ideal)
+    lines = output_lines(text)
+    return {
+        "strict_correct": bool(lines) and lines[0] == target,
+        "contains_correct": target in lines,
+    }
+
+
+# ===================== STICHPROBEN ZIEHEN =====================
+def completion_tokens(resp: dict) -> int:
+    return int((resp.get("usage") or {}).get("completion_tokens") or resp.get("chunks") or 0)
+
+
+def from_choices(resp: dict, latency_s: float) -> dict:
+    """Antwort einer n-Anfrage: Stichproben aus resp["choices"], Output-Tokens anteilig nach Textlänge"""
+    choices = resp.get("choices") or [{"text": resp["text"], "finish_reason": resp["finish_reason"]}]
+    out_tok = completion_tokens(resp)
+    chars = sum(len(c["text"]) for c in choices) or 1
+    samples = [
+        {
+            "text": c["text"],
+            "finish_reason": c["finish_reason"],
+            "latency_s": latency_s,  # eine Anfrage: gleiche Latenz für alle Stichproben
+            "output_tokens": round(out_tok * len(c["text"]) / chars),
+        }
+        for c in choices
+    ]
+    return {**resp, "samples": samples}
+
+
+async def gather_samples(call, k: int) -> list:
+    """k parallele Aufrufe von call() -> (Antwort, ...); setzt je Antwort "latency_s" """
+    async def timed():
+        t0 = time.time()
+        out = await call()
+        out[0]["latency_s"] = round(time.time() - t0, 2)
+        return out
+
+    return await asyncio.gather(*(timed() for _ in range(k)))
+
+
+def merge_samples(resps: list) -> dict:
+    """Einzelantworten zu einer Antwort zusammenfassen: erste Antwort, summierte usage, alle Stichproben"""
+    first = resps[0]
+    usages = [r.get("usage") for r in resps]
+    usage = None
+    if all(usages):
+        usage = {k: sum(int(u.get(k) or 0) for u in usages) for k in ("prompt_tokens", "completion_tokens", "total_tokens")}
+    samples = [
+        {
+            "text": r["text"],
+            "finish_reason": r["finish_reason"],
+            "latency_s": r.get("latency_s"),
+            "ttft_s": r.get("ttft_s"),
+            "output_tokens": completion_tokens(r),
+            "host": r.get("host"),
+        }
+        for r in resps
+    ]
+    return {**first, "usage": usage, "chunks": sum(r.get("chunks") or 0 for r in resps), "samples": samples}
+
+
+def merge_retry(infos: list) -> dict:
+    """Retry-Infos paralleler Anfragen addieren (Listen werden verkettet)"""
+    out = {}
+    for info in infos:
+        for k, v in info.items():
+            if isinstance(v, list):
+                out[k] = out.get(k, []) + v
+            elif isinstance(v, (int, float)):
+                out[k] = round(out.get(k, 0) + v, 3)
+    return out
+
+
+# ===================== BEWERTUNG =====================
+def score_samples(ideal: str, samples: list, ks) -> dict:
+    """Bewertet alle Stichproben einer Aufgabe: {"samples": mit Bewertung, "pass_at_k": je Kriterium und k}"""
+    scored = [{**s, **judge(ideal, s["text"])} for s in samples]
+    n = len(scored)
+    result = {}
+    for name in JUDGES:
+        c = sum(s[f"{name}_correct"] for s in scored)
+        result[name] = {str(k): round(pass_at_k(n, c, k), 4) for k in ks if k <= n}
+    return {"samples": scored, "pass_at_k": result}
+
+
+def aggregate_samples(records: list, ks) -> dict:
+    """Meta-Kennzahlen: mittleres pass@k, Genauigkeit je Stichproben-Index (Streuung), Latenz/Tokens je Stichprobe"""
+    records = [r for r in records if r.get("samples")]
+    if not records:
+        return {}
+    out = {"items": len(records), "pass_at_k": {}}
+    for name in JUDGES:
+        per_k = {}
+        for k in ks:
+            vals = [r["pass_at_k"][name].get(str(k)) for r in records]
+            vals = [v for v in vals if v is not None]
+            if vals:
+                per_k[str(k)] = round(sum(vals) / len(vals), 4)
+        out["pass_at_k"][name] = per_k
+
+        # Genauigkeit der j-ten Stichprobe über alle Aufgaben; Streuung über j = Lauf-zu-Lauf-Varianz
+        n = min(len(r["samples"]) for r in records)
+        acc = [sum(r["samples"][j][f"{name}_correct"] for r in records) / len(records) for j in range(n)]
+        mean = sum(acc) / n
+        out[f"{name}_accuracy_per_sample"] = {
+            "mean": round(mean, 4),
+            "std": round(math.sqrt(sum((a - mean) ** 2 for a in acc) / (n - 1)), 4) if n > 1 else 0.0,
+            "min": round(min(acc), 4),
+            "max": round(max(acc), 4),
+        }
+    samples = [s for r in records for s in r["samples"]]
+    out["sample_latency_s"] = summarize(s.get("latency_s") for s in samples)
+    out["sample_output_tokens"] = summarize(s.get("output_tokens") for s in samples)
+    return out
@@ -0,0 +1,217 @@
+"""
+Scoring
+Zusätzliche Qualitätsmetriken neben strict/contains (RQ1), erweiterbar über @register:
+- edit_sim:         Edit-Ähnlichkeit (RepoBench-Stil) der ersten Antwortzeile, 1 - Levenshtein / max. Länge
+- edit_sim_best:    beste Edit-Ähnlichkeit über alle Antwortzeilen (unabhängig von Markdown-Zäunen o. Ä.)
+- token_match:      erste Zeile stimmt Token für Token überein (Leerzeichen egal)
+- identifier_match: gleiche Bezeichner in gleicher Reihenfolge
+- identifier_f1:    F1 der Bezeichner (Multimenge)
+Levenshtein bit-parallel (Myers/Hyyrö), normalisierte Zeilen und Distanzen werden memoisiert.
+Ohne Modellaufruf lassen sich vorhandene *_details.jsonl neu bewerten:
+    python scoring.py ergebnisse/*_details.jsonl
+"""
+
+import argparse, csv, json, re, time
+from functools import lru_cache
+
+METRICS = {}  # Name -> Funktion(ideal, output) -> Wert
+
+JAVA_TOKEN_RE = re.compile(r'"(?:\\.|[^"\\])*"|\'(?:\\.|[^\'\\])*\'|[A-Za-z_$][\w$]*|\d[\w.]*|\S')
+IDENT_RE = re.compile(r"[A-Za-z_$][\w$]*")
+JAVA_KEYWORDS = frozenset("""
+    abstract assert boolean break byte case catch char class const continue default do double else enum
+    extends final finally float for goto if implements import instanceof int interface long native new
+    package private protected public return short static strictfp super switch synchronized this throw
+    throws transient try void volatile while var record yield sealed permits true false null
+""".split())
+
+
+def register(name: str):
+    """Dekorator: Metrik unter `name` registrieren (eigene Metriken: scoring.register("x")(fn))"""
+    def wrap(fn):
+        METRICS[name] = fn
+        return fn
+    return wrap
+
+
+# ===================== NORMALISIERUNG =====================
+@lru_cache(maxsize=65536)
+def norm_line(s: str) -> str:
+    """Wie norm_for_eval der Benchmark-Skripte: Zeilenende entfernen, Tabs zu 4 Leerzeichen, trimmen"""
+    return (s or "").rstrip("\r\n").expandtabs(4).strip()
+
+
+@lru_cache(maxsize=16384)
+def output_lines(text: str) -> tuple:
+    """Normalisierte, nicht-leere Zeilen einer Modellantwort"""
+    text = (text or "").replace("\r\n", "\n").replace("\r", "\n")
+    return tuple(norm_line(line) for line in text.split("\n") if line.strip() != "")
+
+
+@lru_cache(maxsize=65536)
+def tokens(line: str) -> tuple:
+    return tuple(JAVA_TOKEN_RE.findall(line))
+
+
+@lru_cache(maxsize=65536)
+def identifiers(line: str) -> tuple:
+    """Bezeichner einer Zeile ohne Schlüsselwörter und ohne Inhalte von String-Literalen"""
+    return tuple(t for t in tokens(line) if IDENT_RE.fullmatch(t) and t not in JAVA_KEYWORDS)
+
+
+# ===================== LEVENSHTEIN =====================
+@lru_cache(maxsize=262144)
+def levenshtein(a: str, b: str) -> int:
+    """Edit-Distanz, bit-parallel über die kürzere Zeichenkette (Myers 1999, Hyyrö 2001)"""
+    if a == b:
+        return 0
+    # Gemeinsamen Anfang/Ende abschneiden
+    start = 0
+    while start < len(a) and start < len(b) and a[start] == b[start]:
+        start += 1
+    end = 0
+    while end < len(a) - start and end < len(b) - start and a[-1 - end] == b[-1 - end]:
+        end += 1
+    a, b = a[start:len(a) - end], b[start:len(b) - end]
+    if len(a) < len(b):
+        a, b = b, a
+    if not b:
+        return len(a)
+
+    m = len(b)
+    peq = {}
+    for i, c in enumerate(b):
+        peq[c] = peq.get(c, 0) | (1 << i)
+    full = (1 << m) - 1
+    top = 1 << (m - 1)
+    pv, mv, score = full, 0, m
+    for c in a:
+        eq = peq.get(c, 0)
+        xv = eq | mv
+        xh = (((eq & pv) + pv) ^ pv) | eq
+        ph = mv | (~(xh | pv) & full)
+        mh = pv & xh
+        if ph & top:
+            score += 1
+        elif mh & top:
+            score -= 1
+        ph = ((ph << 1) | 1) & full
+        mh = (mh << 1) & full
+        pv = mh | (~(xv | ph) & full)
+        mv = ph & xv
+    return score
+
+
+def edit_similarity(a: str, b: str) -> float:
+    """1 - Levenshtein / max. Länge (1.0 = identisch)"""
+    if not a and not b:
+        return 1.0
+    return 1.0 - levenshtein(a, b) / max(len(a), len(b))
+
+
+# ===================== METRIKEN =====================
+def _first(output: str) -> str:
+    lines = output_lines(output)
+    return lines[0] if lines else ""
+
+
+@register("edit_sim")
+def score_edit_sim(ideal: str, output: str) -> float:
+    return round(edit_similarity(norm_line(ideal), _first(output)), 4)
+
+
+@register("edit_sim_best")
+def score_edit_sim_best(ideal: str, output: str) -> float:
+    target = norm_line(ideal)
+    return round(max((edit_similarity(target, line) for line in output_lines(output)), default=0.0), 4)
+
+
+@register("token_match")
+def score_token_match(ideal: str, output: str) -> bool:
+    return tokens(norm_line(ideal)) == tokens(_first(output))
+
+
+@register("identifier_match")
+def score_identifier_match(ideal: str, output: str) -> bool:
+    return identifiers(norm_line(ideal)) == identifiers(_first(output))
+
+
+@register("identifier_f1")
+def score_identifier_f1(ideal: str, output: str) -> float:
+    want, got = identifiers(norm_line(ideal)), identifiers(_first(output))
+    if not want and not got:
+        return 1.0
+    common = sum(min(want.count(t), got.count(t)) for t in set(want))
+    if not common:
+        return 0.0
+    precision, recall = common / len(got), common / len(want)
+    return round(2 * precision * recall / (precision + recall), 4)
+
+
+DEFAULT_METRICS = tuple(METRICS)
+
+
+def score(ideal: str, output: str, metrics=DEFAULT_METRICS) -> dict:
+    """Alle gewünschten Metriken für eine Aufgabe"""
+    return {name: METRICS[name](ideal or "", output or "") for name in metrics}
+
+
+def mean_scores(records: list) -> dict:
+    """Mittelwerte der Metriken (True/False als 1/0) über alle Records mit "scores" """
+    sums, counts = {}, {}
+    for r in records:
+        for name, v in (r.get("scores") or {}).items():
+            if v is not None:
+                sums[name] = sums.get(name, 0.0) + float(v)
+                counts[name] = counts.get(name, 0) + 1
+    return {name: round(sums[name] / counts[name], 4) for name in sums}
+
+
+# ===================== OFFLINE-NEUBEWERTUNG =====================
+def scores_path(details_path: str) -> str:
+    """cloud_gpt5mini_details.jsonl -> cloud_gpt5mini_scores.csv"""
+    root = details_path[: -len(".jsonl")] if details_path.endswith(".jsonl") else details_path
+    if root.endswith("_details"):
+        root = root[: -len("_details")]
+    return root + "_scores.csv"
+
+
+def rescore_file(path: str, metrics=DEFAULT_METRICS) -> list:
+    """Bewertet alle Records einer Details-JSONL neu; liefert [(id, scores)]"""
+    out = []
+    with open(path, "r", encoding="utf-8") as f:
+        for line in f:
+            try:
+                rec = json.loads(line)
+            except json.JSONDecodeError:
+                continue  # unvollständige letzte Zeile
+            out.append((rec["id"], score(rec.get("ideal"), rec.get("output_full"), metrics)))
+    return out
+
+
+def main(argv=None):
+    ap = argparse.ArgumentParser(description="Details-JSONL ohne Modellaufruf neu bewerten")
+    ap.add_argument("paths", nargs="+", help="*_details.jsonl")
+    ap.add_argument("--metrics", default=",".join(DEFAULT_METRICS), help=f"Kommagetrennt aus: {', '.join(METRICS)}")
+    args = ap.parse_args(argv)
+    metrics = [m.strip() for m in args.metrics.split(",") if m.strip()]
+    unknown = [m for m in metrics if m not in METRICS]
+    if unknown:
+        raise SystemExit(f"Unbekannte Metrik(en): {unknown}")
+
+    for path in args.paths:
+        t0 = time.perf_counter()
+        rows = rescore_file(path, metrics)
+        out_path = scores_path(path)
+        with open(out_path, "w", newline="", encoding="utf-8") as f:
+            w = csv.writer(f)
+            w.writerow(["id"] + metrics)
+            w.writerows([i] + [s[m] for m in metrics] for i, s in rows)
+        means = mean_scores([{"scores": s} for _, s in rows])
+        print(f"{path}: {len(rows)} Aufgaben in {time.perf_counter() - t0:.2f} s -> {out_path}")
+        for name in metrics:
+            print(f"  {name:<17} {means.get(name, 0.0):.4f}")
+
+
+if __name__ == "__main__":
+    main()
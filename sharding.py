@@ -0,0 +1,79 @@
+"""
+Sharding
+Aufteilung eines Laufs auf mehrere Rechner/Prozesse: Shard k von N bearbeitet alle
+Aufgaben-IDs mit (id - 1) % N == k - 1 (verschränkt, damit alle Shards ähnlich schwere
+Aufgaben bekommen) und schreibt in eigene Ausgabedateien.
+"""
+
+import glob
+import json
+import os
+import re
+
+
+def parse_shard(spec: str):
+    """'k/N' (1-basiert) -> (k, N); None/'' -> None"""
+    if not spec:
+        return None
+    m = re.fullmatch(r"\s*(\d+)\s*/\s*(\d+)\s*", spec)
+    if not m:
+        raise ValueError(f"Ungültige Shard-Angabe (erwartet k/N): {spec}")
+    k, n = int(m.group(1)), int(m.group(2))
+    if not 1 <= k <= n:
+        raise ValueError(f"Shard {k} liegt nicht in 1..{n}")
+    return k, n
+
+
+def in_shard(item_id: int, shard) -> bool:
+    """Gehört die Aufgabe (1-basierte ID) zum Shard? Ohne Shard: immer"""
+    if shard is None:
+        return True
+    k, n = shard
+    return (item_id - 1) % n == k - 1
+
+
+def shard_count(total: int, shard) -> int:
+    """Anzahl Aufgaben im Shard bei `total` Aufgaben"""
+    if shard is None:
+        return total
+    k, n = shard
+    return len(range(k - 1, total, n))
+
+
+def tagged_path(path: str, tag: str) -> str:
+    """Ausgabepfad mit Zusatz vor der Endung: results.csv -> results.<tag>.csv"""
+    root, ext = os.path.splitext(path)
+    return f"{root}.{tag}{ext}"
+
+
+def shard_path(path: str, shard) -> str:
+    """Ausgabepfad eines Shards: results.csv -> results.shard-2-of-4.csv"""
+    if shard is None:
+        return path
+    return tagged_path(path, f"shard-{shard[0]}-of-{shard[1]}")
+
+
+def find_shards(path: str, n: int = None) -> list:
+    """Vorhandene Shard-Dateien zu `path` als [(shard, Pfad)], nach k sortiert"""
+    root, ext = os.path.splitext(path)
+    found = []
+    for p in glob.glob(glob.escape(root) + ".shard-*-of-*" + glob.escape(ext)):
+        m = re.search(r"\.shard-(\d+)-of-(\d+)" + re.escape(ext) + "$", p)
+        if m and (n is None or int(m.group(2)) == n):
+            found.append(((int(m.group(1)), int(m.group(2))), p))
+    return sorted(found)
+
+
+def read_records(path: str) -> list:
+    """Liest Detail-Records (JSONL); unvollständige letzte Zeile wird übersprungen"""
+    records = []
+    with open(path, "r", encoding="utf-8") as f:
+        for line in f:
+            line = line.strip()
+            if not line:
+                continue
+            try:
+                records.append(json.loads(line))
+            except json.JSONDecodeError:
+                continue
+    return records
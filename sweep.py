@@ -0,0 +1,284 @@
+"""
+Parameter-Sweep
+Führt eine Matrix aus Backends × Modellen × Parametern aus, z. B. Quantisierungen (q4_K_M vs. q8_0),
+Temperaturen oder Token-Limits. Jede Zelle ist ein eigener Lauf von run_cloud_test.py bzw.
+run_local_test.py (Subprozess, Einstellungen per --set) mit eigenen Ausgabedateien unter
+<OUT_DIR>/<Zelle>/; abgebrochene Zellen setzen beim nächsten Sweep über ihr Journal fort.
+Alle Zellen laufen gleichzeitig, begrenzt durch ein Parallelitäts-Budget je Backend (Summe der
+CONCURRENCY laufender Zellen); identische Anfragen verschiedener Zellen bedient der gemeinsame
+Antwort-Cache. Am Ende entsteht eine Vergleichstabelle (<OUT_DIR>/comparison.csv).
+
+    python sweep.py
+    python sweep.py --config sweep.json --dry-run
+    python sweep.py --report              # nur Vergleichstabelle aus vorhandenen Zellen
+"""
+
+import argparse, asyncio, csv, itertools, json, os, re, sys, time
+
+import run_cloud_test
+import run_local_test
+
+TARGETS = {"cloud": run_cloud_test, "local": run_local_test}
+
+# ===================== KONFIGURATION =====================
+# Backends: Testskript ("cloud"/"local"), Parallelitäts-Budget (max. gleichzeitige Anfragen über
+# alle Zellen des Backends), feste Einstellungen (Konstanten des Skripts) und Umgebungsvariablen
+BACKENDS = {
+    "nuc": {
+        "target": "local",
+        "max_concurrency": 4,
+        "settings": {"OLLAMA_URL": "http://nuc-ai:11434", "BASE_URL": "http://nuc-ai:11434/v1"},
+        "params": {"TEMPERATURE": [0, 0.4]},   # nur für dieses Backend (ergänzt/ersetzt PARAMS)
+    },
+    "openai": {
+        "target": "cloud",
+        "max_concurrency": 32,
+        "settings": {},
+        "env": {},                              # z. B. {"OPENAI_BASE_URL": "..."}
+    },
+}
+
+# Modelle je Backend
+MODELS = {
+    "nuc": ["qwen2.5-coder:7b-instruct-q4_K_M", "qwen2.5-coder:7b-instruct-q8_0"],
+    "openai": ["gpt-5-mini"],
+}
+
+# Parameter aller Backends als Kreuzprodukt (Name einer Konstante -> Werte)
+PARAMS = {
+    "MAX_TOKENS": [None, 64],
+}
+
+OUT_DIR = "sweep"
+COMPARISON = "comparison.csv"
+
+# Spalten der Vergleichstabelle: (Spalte, Pfad in der Meta-Datei)
+COLUMNS = [
+    ("completed_items", ("completed_items",)),
+    ("items", ("items",)),
+    ("strict_accuracy", ("strict_accuracy",)),
+    ("contains_accuracy", ("contains_accuracy",)),
+    ("edit_sim", ("scores", "edit_sim")),
+    ("identifier_f1", ("scores", "identifier_f1")),
+    ("latency_p50_s", ("latency_percentiles_s", "p50")),
+    ("latency_p95_s", ("latency_percentiles_s", "p95")),
+    ("ttft_p50_s", ("ttft_percentiles_s", "p50")),
+    ("sum_input_tokens", ("sum_input_tokens",)),
+    ("sum_output_tokens", ("sum_output_tokens",)),
+    ("est_total_cost_usd", ("est_total_cost_usd",)),
+    ("cache_hits", ("cache_hits",)),
+    ("total_time_s", ("total_time_s",)),
+]
+
+
+# ===================== MATRIX =====================
+def slug(value) -> str:
+    """Dateisystemtauglicher Namensteil ("qwen2.5-coder:7b" -> "qwen2.5-coder-7b")"""
+    return re.sub(r"[^\w.-]+", "-", str(value)).strip("-") or "x"
+
+
+def expand(backends: dict, models: dict, params: dict) -> list:
+    """Alle Zellen der Matrix: je Backend × Modell × Kreuzprodukt der Parameter"""
+    cells = []
+    for backend, cfg in backends.items():
+        grid = {**params, **cfg.get("params", {})}
+        names = sorted(grid)
+        for model in models.get(backend, []):
+            for values in itertools.product(*(grid[n] for n in names)):
+                combo = dict(zip(names, values))
+                name = "_".join([slug(backend), slug(model)] + [f"{slug(n.lower())}-{slug(v)}" for n, v in combo.items()])
+                cells.append({"name": name, "backend": backend, "model": model, "params": combo})
+    return cells
+
+
+def cell_settings(cell: dict, backend: dict, out_dir: str) -> dict:
+    """Konstanten eines Zellen-Laufs: Backend-Einstellungen, Modell, Parameter, eigene Ausgabedateien"""
+    module = TARGETS[backend["target"]]
+    settings = {**backend.get("settings", {}), "MODEL": cell["model"], **cell["params"]}
+    # Zelle darf das Budget des Backends allein nicht überschreiten
+    settings["CONCURRENCY"] = min(settings.get("CONCURRENCY", module.CONCURRENCY), backend["max_concurrency"])
+    folder = os.path.join(out_dir, cell["name"])
+    for name in ("OUT_CSV", "OUT_JSONL", "OUT_META", "OUT_JOURNAL", "OUT_PROMPTS"):
+        settings[name] = os.path.join(folder, os.path.basename(getattr(module, name)))
+    return settings
+
+
+# ===================== AUSFÜHRUNG =====================
+class Budget:
+    """Parallelitäts-Budget eines Backends: Zellen belegen so viele Einheiten wie ihre CONCURRENCY"""
+
+    def __init__(self, limit: int):
+        self.limit = limit
+        self.used = 0
+        self._cond = asyncio.Condition()
+
+    async def acquire(self, n: int):
+        async with self._cond:
+            await self._cond.wait_for(lambda: self.used + n <= self.limit)
+            self.used += n
+
+    async def release(self, n: int):
+        async with self._cond:
+            self.used -= n
+            self._cond.notify_all()
+
+
+async def run_cell(cell: dict, backend: dict, settings: dict, budget: Budget) -> dict:
+    """Startet das Testskript der Zelle als Subprozess, sobald das Backend-Budget es erlaubt"""
+    module = TARGETS[backend["target"]]
+    folder = os.path.dirname(settings["OUT_META"])
+    os.makedirs(folder, exist_ok=True)
+    cmd = [sys.executable, os.path.abspath(module.__file__)]
+    for name, value in settings.items():
+        cmd += ["--set", f"{name}={json.dumps(value)}"]
+
+    await budget.acquire(settings["CONCURRENCY"])
+    print(f"▶ {cell['name']} (Parallelität {settings['CONCURRENCY']})")
+    t0 = time.time()
+    try:
+        with open(os.path.join(folder, "run.log"), "a", encoding="utf-8") as log:
+            proc = await asyncio.create_subprocess_exec(
+                *cmd, stdout=log, stderr=asyncio.subprocess.STDOUT, env={**os.environ, **backend.get("env", {})})
+            code = await proc.wait()
+    finally:
+        await budget.release(settings["CONCURRENCY"])
+    wall = round(time.time() - t0, 2)
+    print(f"{'✅' if code == 0 else '❌'} {cell['name']} in {wall:.1f} s" + (f" (Exit-Code {code}, siehe run.log)" if code else ""))
+    return {"exit_code": code, "wall_s": wall}
+
+
+async def run_sweep(cells: list, backends: dict, out_dir: str) -> dict:
+    """Alle Zellen gleichzeitig; je Backend begrenzt durch dessen max_concurrency"""
+    budgets = {name: Budget(cfg["max_concurrency"]) for name, cfg in backends.items()}
+    # Zellen mit gleichem Modell nacheinander anstoßen (lokal: weniger Modellwechsel im Speicher)
+    ordered = sorted(cells, key=lambda c: (c["backend"], c["model"]))
+    tasks = [
+        run_cell(c, backends[c["backend"]], cell_settings(c, backends[c["backend"]], out_dir), budgets[c["backend"]])
+        for c in ordered
+    ]
+    results = await asyncio.gather(*tasks)
+    return {c["name"]: r for c, r in zip(ordered, results)}
+
+
+# ===================== VERGLEICH =====================
+def lookup(meta: dict, path: tuple):
+    for key in path:
+        if not isinstance(meta, dict):
+            return None
+        meta = meta.get(key)
+    return meta
+
+
+def comparison(cells: list, backends: dict, out_dir: str, status: dict = None) -> list:
+    """Eine Zeile je Zelle aus deren Meta-Datei (fehlende Zellen mit leeren Kennzahlen)"""
+    rows = []
+    for cell in cells:
+        settings = cell_settings(cell, backends[cell["backend"]], out_dir)
+        meta = {}
+        if os.path.exists(settings["OUT_META"]):
+            with open(settings["OUT_META"], "r", encoding="utf-8") as f:
+                meta = json.load(f)
+        row = {"cell": cell["name"], "backend": cell["backend"], "model": cell["model"]}
+        row.update({n.lower(): v for n, v in cell["params"].items()})
+        if status and cell["name"] in status:
+            row["exit_code"] = status[cell["name"]]["exit_code"]
+        row.update({col: lookup(meta, path) for col, path in COLUMNS})
+        for judge, per_k in (lookup(meta, ("sampling", "pass_at_k")) or {}).items():
+            row.update({f"{judge}_pass@{k}": v for k, v in per_k.items()})
+        rows.append(row)
+    return rows
+
+
+def write_comparison(rows: list, path: str):
+    columns = list(dict.fromkeys(k for row in rows for k in row))
+    with open(path, "w", newline="", encoding="utf-8") as f:
+        w = csv.DictWriter(f, fieldnames=columns)
+        w.writeheader()
+        w.writerows(rows)
+
+
+def fmt(v) -> str:
+    if v is None:
+        return "-"
+    if isinstance(v, float):
+        return f"{v:.4f}" if abs(v) < 10 else f"{v:.1f}"
+    return str(v)
+
+
+def print_comparison(rows: list):
+    """Kompakte Konsolentabelle (alle Spalten stehen in der CSV)"""
+    shown = ["cell", "completed_items", "strict_accuracy", "contains_accuracy", "edit_sim",
+             "latency_p50_s", "latency_p95_s", "sum_output_tokens", "est_total_cost_usd", "cache_hits"]
+    shown += [k for k in dict.fromkeys(k for row in rows for k in row) if "_pass@" in k]
+    table = [[fmt(row.get(c)) for c in shown] for row in rows]
+    widths = [max(len(c), *(len(r[i]) for r in table)) for i, c in enumerate(shown)]
+    print("  ".join(c.ljust(w) for c, w in zip(shown, widths)))
+    for r in table:
+        print("  ".join(v.ljust(w) for v, w in zip(r, widths)))
+
+
+def load_config(path: str) -> dict:
+    """Sweep-Konfiguration aus JSON ({"backends", "models", "params", "out_dir"}); fehlende Teile aus den Konstanten"""
+    cfg = {}
+    if path:
+        with open(path, "r", encoding="utf-8") as f:
+            cfg = json.load(f)
+    backends = cfg.get("backends", BACKENDS)
+    for name, b in backends.items():
+        if b.get("target") not in TARGETS:
+            raise SystemExit(f"Backend {name}: target muss einer von {sorted(TARGETS)} sein")
+        b.setdefault("max_concurrency", TARGETS[b["target"]].CONCURRENCY)
+    return {
+        "backends": backends,
+        "models": cfg.get("models", MODELS),
+        "params": cfg.get("params", PARAMS),
+        "out_dir": cfg.get("out_dir", OUT_DIR),
+    }
+
+
+def main(argv=None):
+    ap = argparse.ArgumentParser(description="Sweep über Backends × Modelle × Parameter mit Vergleichstabelle")
+    ap.add_argument("--config", default=None, help="JSON mit backends/models/params/out_dir (Standard: Konstanten)")
+    ap.add_argument("--out", default=None, help="Ausgabeordner (Standard: out_dir bzw. OUT_DIR)")
+    ap.add_argument("--only", default=None, help="Nur Zellen, deren Name diesen regulären Ausdruck enthält")
+    ap.add_argument("--dry-run", action="store_true", help="Nur Zellen und Befehle auflisten")
+    ap.add_argument("--report", action="store_true", help="Nichts ausführen, nur Vergleichstabelle erstellen")
+    args = ap.parse_args(argv)
+
+    cfg = load_config(args.config)
+    out_dir = args.out or cfg["out_dir"]
+    backends = cfg["backends"]
+    cells = expand(backends, cfg["models"], cfg["params"])
+    if args.only:
+        cells = [c for c in cells if re.search(args.only, c["name"])]
+    if not cells:
+        raise SystemExit("Keine Zellen in der Matrix")
+
+    print(f"Sweep: {len(cells)} Zellen -> {out_dir}/")
+    if args.dry_run:
+        for c in cells:
+            s = cell_settings(c, backends[c["backend"]], out_dir)
+            sets = " ".join(f"--set {k}={json.dumps(v)}" for k, v in s.items() if not k.startswith("OUT_"))
+            print(f" - {c['name']}: {backends[c['backend']]['target']} {sets}")
+        return
+
+    os.makedirs(out_dir, exist_ok=True)
+    status = None
+    if not args.report:
+        t0 = time.time()
+        status = asyncio.run(run_sweep(cells, backends, out_dir))
+        print(f"\nSweep beendet in {time.time() - t0:.1f} s")
+
+    rows = comparison(cells, backends, out_dir, status)
+    path = os.path.join(out_dir, COMPARISON)
+    write_comparison(rows, path)
+    print()
+    print_comparison(rows)
+    print(f"\nSaved: {path}")
+    failed = [name for name, s in (status or {}).items() if s["exit_code"]]
+    if failed:
+        raise SystemExit(f"{len(failed)} Zelle(n) fehlgeschlagen: {', '.join(failed)}")
+
+
+if __name__ == "__main__":
+    main()
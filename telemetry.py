@@ -0,0 +1,309 @@
+"""
+Lauf-Telemetrie
+Live-Kennzahlen eines Laufs: erledigte und offene Aufgaben, gleitender Durchsatz (Aufgaben/s,
+Output-Tokens/s) mit ETA, Latenz- und TTFT-Histogramme, Fehler-, Retry- und Cache-Zähler sowie
+Auslastung des Backends (Scheduler bzw. Host-Pool). Die Konsole erhält die ETA je Aufgabe, optional
+gibt ein Endpunkt im Prometheus-Textformat alles zum Abfragen aus (Hintergrund-Thread, stdlib):
+    METRICS_PORT = 9108  ->  curl http://localhost:9108/metrics
+Ein Port wird je Prozess nur einmal gebunden; mehrere Läufe (python -m harness mit mehreren
+Zielen, Sweep, bench_harness) teilen sich den Endpunkt und unterscheiden sich über ihre Labels.
+"""
+
+import collections
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+from latency_stats import HISTOGRAM_BOUNDS
+
+PREFIX = "repobench"
+ROLLING_S = 600          # Zeitfenster für Durchsatz und ETA
+ROLLING_MIN_ITEMS = 5    # so viele Aufgaben bleiben mindestens im Fenster (lange Einzel-Latenzen)
+
+
+def fmt_duration(s: float) -> str:
+    """Sekunden als "2 h 05 min" bzw. "3 min 07 s" """
+    h, rest = divmod(int(round(s)), 3600)
+    m, sec = divmod(rest, 60)
+    return f"{h} h {m:02d} min" if h else f"{m} min {sec:02d} s"
+
+
+def _labels(labels: dict) -> str:
+    if not labels:
+        return ""
+    def escape(v):
+        return str(v).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+    return "{" + ",".join(f'{k}="{escape(v)}"' for k, v in labels.items()) + "}"
+
+
+class Histogram:
+    """Kumulative Buckets wie Prometheus (Grenzen aus latency_stats)"""
+
+    def __init__(self, bounds=HISTOGRAM_BOUNDS):
+        self.bounds = bounds
+        self.counts = [0] * len(bounds)
+        self.sum = 0.0
+        self.count = 0
+
+    def observe(self, value: float):
+        for i, b in enumerate(self.bounds):
+            if value <= b:
+                self.counts[i] += 1
+        self.sum += value
+        self.count += 1
+
+    def lines(self, name: str, labels: dict) -> list:
+        out = [f"{name}_bucket{_labels({**labels, 'le': b})} {c}" for b, c in zip(self.bounds, self.counts)]
+        out.append(f"{name}_bucket{_labels({**labels, 'le': '+Inf'})} {self.count}")
+        out.append(f"{name}_sum{_labels(labels)} {round(self.sum, 4)}")
+        out.append(f"{name}_count{_labels(labels)} {self.count}")
+        return out
+
+
+class RunTelemetry:
+    """
+    Wird aus dem Event-Loop aktualisiert (started/finished je Aufgabe) und aus dem
+    Endpunkt-Thread gelesen; ein Lock hält beide Seiten konsistent.
+    - total/done: Aufgaben des Laufs bzw. bereits erledigte (Fortsetzung)
+    - labels: feste Labels aller Metriken (z. B. Modell, Lauf)
+    - collectors: Funktionen -> [(Name, Typ, Hilfe, Labels, Wert)] für zusätzliche Kennzahlen
+    """
+
+    def __init__(self, total: int, done: int = 0, concurrency: int = 1, labels: dict = None):
+        self.total = total
+        self.done = done
+        self.concurrency = concurrency
+        self.labels = labels or {}
+        self.collectors = []
+        self.in_flight = 0
+        self.completed = 0
+        self.counters = {"errors": 0, "retries": 0, "cache_hits": 0, "input_tokens": 0, "output_tokens": 0}
+        self.latency = Histogram()
+        self.ttft = Histogram()
+        self.start = time.time()
+        self._window = collections.deque()  # (Zeitpunkt, Output-Tokens) je erledigter Aufgabe
+        self._window_start = self.start
+        self._lock = threading.Lock()
+        self._server = None
+
+    # ---------- Aktualisierung (Event-Loop) ----------
+    def started(self):
+        with self._lock:
+            self.in_flight += 1
+
+    def finished(self, res: dict):
+        """Ergebnis einer Aufgabe verbuchen (Felder wie in den Details-Records)"""
+        now = time.time()
+        usage = res.get("usage") or {}
+        out_tok = int(usage.get("output_tokens") or 0)
+        with self._lock:
+            self.in_flight -= 1
+            self.done += 1
+            self.completed += 1
+            self.counters["errors"] += bool(res.get("error"))
+            self.counters["retries"] += int(res.get("retries") or 0)
+            self.counters["input_tokens"] += int(usage.get("input_tokens") or 0)
+            self.counters["output_tokens"] += out_tok
+            if res.get("cache_hit"):
+                self.counters["cache_hits"] += 1
+            else:  # Cache-Treffer würden die Latenzverteilung verzerren
+                if res.get("latency_s") is not None:
+                    self.latency.observe(res["latency_s"])
+                if res.get("ttft_s") is not None:
+                    self.ttft.observe(res["ttft_s"])
+            self._window.append((now, out_tok))
+            while len(self._window) > ROLLING_MIN_ITEMS and now - self._window[0][0] > ROLLING_S:
+                self._window_start = self._window.popleft()[0]
+
+    # ---------- Auswertung ----------
+    def _rates(self, now: float) -> tuple:
+        """(Aufgaben/s, Output-Tokens/s) im gleitenden Fenster"""
+        span = now - self._window_start
+        if not self._window or span <= 0:
+            return 0.0, 0.0
+        return len(self._window) / span, sum(t for _, t in self._window) / span
+
+    def eta_s(self, now: float = None):
+        items_per_s, _ = self._rates(now or time.time())
+        remaining = max(self.total - self.done, 0)
+        if not remaining:
+            return 0.0
+        return remaining / items_per_s if items_per_s else None
+
+    def progress(self) -> str:
+        """Kurzer Zusatz für die Fortschrittszeile: Durchsatz, Fehlerquote, ETA"""
+        now = time.time()
+        with self._lock:
+            items_per_s, _ = self._rates(now)
+            eta = self.eta_s(now)
+            errors = self.counters["errors"] / self.completed if self.completed else 0.0
+        rate = f"{items_per_s * 60:.1f}/min" if items_per_s < 1 else f"{items_per_s:.1f}/s"
+        return (f"[{self.done}/{self.total}, {rate}, Fehler {errors * 100:.1f} %, "
+                f"ETA {fmt_duration(eta) if eta is not None else '?'}]")
+
+    def render(self) -> str:
+        """Alle Kennzahlen im Prometheus-Textformat"""
+        return render_metrics([self])
+
+    def families(self) -> dict:
+        """Kennzahlen je Metrik-Name: [HELP, TYPE, Werte ...] (gemeinsamer Endpunkt fasst zusammen)"""
+        now = time.time()
+        p, lb = PREFIX, self.labels
+        with self._lock:
+            items_per_s, tokens_per_s = self._rates(now)
+            eta = self.eta_s(now)
+            samples = [
+                ("items_total", "gauge", "Aufgaben des Laufs", self.total),
+                ("items_done", "gauge", "Erledigte Aufgaben (inkl. früherer Sitzungen)", self.done),
+                ("items_completed_total", "counter", "In dieser Sitzung erledigte Aufgaben", self.completed),
+                ("in_flight", "gauge", "Laufende Aufgaben", self.in_flight),
+                ("concurrency_limit", "gauge", "Max. gleichzeitige Aufgaben (CONCURRENCY)", self.concurrency),
+                ("items_per_second", "gauge", f"Durchsatz im gleitenden Fenster ({ROLLING_S} s)", round(items_per_s, 5)),
+                ("output_tokens_per_second", "gauge", "Output-Tokens/s im gleitenden Fenster", round(tokens_per_s, 3)),
+                ("eta_seconds", "gauge", "Geschätzte Restlaufzeit (-1 = unbekannt)", round(eta, 1) if eta is not None else -1),
+                ("uptime_seconds", "gauge", "Laufzeit dieser Sitzung", round(now - self.start, 1)),
+                ("errors_total", "counter", "Aufgaben mit Fehler", self.counters["errors"]),
+                ("retries_total", "counter", "Wiederholte Anfragen", self.counters["retries"]),
+                ("cache_hits_total", "counter", "Antworten aus dem Cache", self.counters["cache_hits"]),
+                ("input_tokens_total", "counter", "Input-Tokens", self.counters["input_tokens"]),
+                ("output_tokens_total", "counter", "Output-Tokens", self.counters["output_tokens"]),
+            ]
+            families = {}
+            for name, kind, help_text, value in samples:
+                families[name] = [f"# HELP {p}_{name} {help_text}", f"# TYPE {p}_{name} {kind}", f"{p}_{name}{_labels(lb)} {value}"]
+            for name, hist, help_text in (("latency_seconds", self.latency, "Latenz je Aufgabe (ohne Cache-Treffer)"),
+                                          ("ttft_seconds", self.ttft, "Zeit bis zum ersten Token")):
+                families[name] = [f"# HELP {p}_{name} {help_text}", f"# TYPE {p}_{name} histogram",
+                                  *hist.lines(f"{p}_{name}", lb)]
+        # Zusätzliche Kennzahlen (Scheduler, Host-Pool); Werte gleichen Namens stehen zusammen
+        for collect in self.collectors:
+            for name, kind, help_text, labels, value in collect():
+                family = families.setdefault(name, [f"# HELP {p}_{name} {help_text}", f"# TYPE {p}_{name} {kind}"])
+                family.append(f"{p}_{name}{_labels({**lb, **labels})} {value}")
+        return families
+
+    # ---------- Endpunkt ----------
+    def serve(self, port: int, host: str = "127.0.0.1"):
+        """GET /metrics über den Endpunkt dieses Ports (port=0: eigener freier Port, siehe self.url)"""
+        self._server = MetricsServer.acquire(port, host)
+        self._server.add(self)
+        return self
+
+    @property
+    def url(self) -> str:
+        return self._server.url
+
+    def close(self):
+        if self._server:
+            self._server.remove(self)
+            self._server = None
+
+
+def render_metrics(runs: list) -> str:
+    """Kennzahlen mehrerer Läufe im Prometheus-Textformat; HELP/TYPE je Metrik nur einmal"""
+    families = {}
+    for run in runs:
+        for name, lines in run.families().items():
+            if name in families:
+                families[name] += lines[2:]
+            else:
+                families[name] = list(lines)
+    return "\n".join(line for family in families.values() for line in family) + "\n"
+
+
+class MetricsServer:
+    """
+    Ein /metrics-Endpunkt (Daemon-Thread) je Port und Prozess; liefert alle angemeldeten Läufe
+    und wird mit dem letzten abgemeldeten Lauf beendet.
+    """
+
+    _servers = {}  # (host, port) -> MetricsServer
+    _lock = threading.Lock()
+
+    def __init__(self, port: int, host: str):
+        self.runs = []
+        exporter = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def log_message(self, *args):
+                pass
+
+            def do_GET(self):
+                if self.path.split("?")[0] not in ("/metrics", "/"):
+                    self.send_error(404)
+                    return
+                with MetricsServer._lock:
+                    runs = list(exporter.runs)
+                body = render_metrics(runs).encode("utf-8")
+                self.send_response(200)
+                self.send_header("Content-Type", "text/plain; version=0.0.4; charset=utf-8")
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+        self.httpd = ThreadingHTTPServer((host, port), Handler)
+        self.httpd.daemon_threads = True
+        self.key = (host, self.httpd.server_address[1])
+        threading.Thread(target=self.httpd.serve_forever, daemon=True).start()
+
+    @classmethod
+    def acquire(cls, port: int, host: str = "127.0.0.1") -> "MetricsServer":
+        """Vorhandenen Endpunkt des Ports wiederverwenden, sonst binden (OSError, falls belegt)"""
+        with cls._lock:
+            server = cls._servers.get((host, port)) if port else None
+        if server is None:
+            server = cls(port, host)
+            with cls._lock:
+                cls._servers[server.key] = server
+        return server
+
+    @property
+    def url(self) -> str:
+        host, port = self.key
+        return f"http://{host}:{port}/metrics"
+
+    def add(self, run):
+        with MetricsServer._lock:
+            self.runs.append(run)
+
+    def remove(self, run):
+        with MetricsServer._lock:
+            self.runs.remove(run)
+            last = not self.runs
+            if last:
+                MetricsServer._servers.pop(self.key, None)
+        if last:
+            self.httpd.shutdown()
+            self.httpd.server_close()
+
+
+# ===================== BACKEND-AUSLASTUNG =====================
+def scheduler_collector(scheduler):
+    """Rate-Limit-Wartezeiten, Backoff und Circuit Breaker des RequestSchedulers"""
+    def collect():
+        t = scheduler.totals
+        return [
+            ("throttle_seconds_total", "counter", "Wartezeit durch Rate-Limits (RPM/TPM)", {}, t["throttle_s"]),
+            ("backoff_seconds_total", "counter", "Wartezeit durch Backoff", {}, t["backoff_s"]),
+            ("rate_limited_total", "counter", "Antworten mit HTTP 429", {}, t["rate_limited"]),
+            ("circuit_breaker_opened_total", "counter", "Geöffnete Circuit Breaker", {}, scheduler.breaker.opened),
+        ]
+    return collect
+
+
+def pool_collector(pool):
+    """Offene Anfragen, Gesundheit und geglättete Latenz je Host des Host-Pools"""
+    def collect():
+        out = []
+        for h in pool.hosts:
+            labels = {"host": h.name}
+            out += [
+                ("host_in_flight", "gauge", "Offene Anfragen je Host", labels, h.outstanding),
+                ("host_healthy", "gauge", "Host gesund (1) oder gedraint (0)", labels, int(h.healthy)),
+                ("host_served_total", "counter", "Bediente Anfragen je Host", labels, h.served),
+                ("host_errors_total", "counter", "Fehler je Host", labels, h.errors),
+                ("host_latency_ewma_seconds", "gauge", "Geglättete Latenz je Host", labels, round(h.ewma_s or 0.0, 4)),
+            ]
+        return out
+    return collect